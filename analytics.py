@@ -0,0 +1,150 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import progress_bits
+from cache import cached
+from connection import connect
+
+STREAK_THRESHOLD = 0.8
+WEEKDAY_LABELS = ["월", "화", "수", "목", "금", "토", "일"]
+
+@cached("load_progress_frame")
+def load_progress_frame(username: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+    """Load ``daily_progress`` rows as a compact frame.
+
+    ``date`` is datetime64, ``category``/``item`` are categoricals and
+    ``completed`` is uint8, so a multi-year history stays a few bytes per row.
+    The frame is cached per user and range until a save touches that range.
+    """
+    if progress_bits.bits_enabled():
+        return _frame_from_masks(username, start_date, end_date)
+    sql = "SELECT date, category, item, completed FROM daily_progress WHERE username = ?"
+    params: tuple = (username,)
+    if start_date is not None:
+        sql += " AND date >= ?"
+        params += (start_date,)
+    if end_date is not None:
+        sql += " AND date <= ?"
+        params += (end_date,)
+    with connect(username) as conn:
+        rows = conn.execute(sql + " ORDER BY date", params).fetchall()
+    if not rows:
+        return _empty_frame()
+    dates, categories, items, completed = zip(*rows)
+    # 날짜 문자열은 종류가 적으므로 고유값만 파싱해서 펼친다.
+    date_codes, date_values = pd.factorize(np.asarray(dates, dtype=object))
+    return pd.DataFrame({
+        "date": pd.to_datetime(date_values, format="%Y-%m-%d").values[date_codes],
+        "category": pd.Categorical(categories),
+        "item": pd.Categorical(items),
+        "completed": np.asarray([value or 0 for value in completed], dtype=np.uint8),
+    })
+
+def _empty_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": pd.Series([], dtype="datetime64[ns]"),
+        "category": pd.Categorical([]),
+        "item": pd.Categorical([]),
+        "completed": pd.Series([], dtype=np.uint8),
+    })
+
+def unpack_masks(blobs: List[bytes], width: int) -> np.ndarray:
+    # 길이가 다른 마스크를 같은 폭으로 채워 (날짜, 비트) 모양의 0/1 행렬로 푼다.
+    packed = np.frombuffer(b"".join(blob.ljust(width, b"\0") for blob in blobs), dtype=np.uint8)
+    return np.unpackbits(packed.reshape(len(blobs), width), axis=1, bitorder="little")
+
+def _categorical(values: List[str], codes: np.ndarray) -> pd.Categorical:
+    categories = sorted(set(values))
+    index = {value: n for n, value in enumerate(categories)}
+    lookup = np.asarray([index[value] for value in values], dtype=np.int32)
+    return pd.Categorical.from_codes(lookup[codes], categories=categories).remove_unused_categories()
+
+def _frame_from_masks(username: str, start_date: Optional[str], end_date: Optional[str]) -> pd.DataFrame:
+    """The same frame as the row format, unpacked from ``daily_progress_bits`` with NumPy."""
+    with connect(username) as conn:
+        rows = progress_bits.fetch_masks(conn, username, start_date, end_date)
+        if not rows:
+            return _empty_frame()
+        definition = progress_bits.definition(conn, username, max(row[1] for row in rows))
+    dates, _, saved, completed = zip(*rows)
+    width = max(1, max(len(blob or b"") for blob in saved))
+    saved_bits = unpack_masks([blob or b"" for blob in saved], width)
+    completed_bits = unpack_masks([(blob or b"")[:width] for blob in completed], width)
+    day_index, bit_index = np.nonzero(saved_bits)
+    categories, items = zip(*definition.items)
+    return pd.DataFrame({
+        "date": pd.to_datetime(pd.Index(dates), format="%Y-%m-%d").values[day_index],
+        "category": _categorical(list(categories), bit_index),
+        "item": _categorical(list(items), bit_index),
+        "completed": completed_bits[day_index, bit_index],
+    })
+
+def daily_totals(frame: pd.DataFrame, end_date: Optional[str] = None) -> pd.DataFrame:
+    """Completed and total item counts per calendar day up to ``end_date``; days without rows are zero."""
+    if frame.empty:
+        return pd.DataFrame({"completed": [], "total": []}, index=pd.DatetimeIndex([], name="date"))
+    codes, days = pd.factorize(frame["date"], sort=True)
+    completed = np.bincount(codes, weights=frame["completed"].to_numpy(), minlength=len(days))
+    total = np.bincount(codes, minlength=len(days))
+    totals = pd.DataFrame({"completed": completed, "total": total}, index=pd.DatetimeIndex(days, name="date"))
+    last = max(totals.index[-1], pd.Timestamp(end_date)) if end_date else totals.index[-1]
+    calendar = pd.date_range(totals.index[0], last, freq="D", name="date")
+    return totals.reindex(calendar, fill_value=0)
+
+def rolling_completion(totals: pd.DataFrame, windows=(7, 30)) -> pd.DataFrame:
+    """Daily and rolling completion rates, weighted by the number of items saved each day."""
+    rates = pd.DataFrame(index=totals.index)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates["daily"] = totals["completed"] / totals["total"].replace(0, np.nan)
+        for window in windows:
+            completed = totals["completed"].rolling(window, min_periods=1).sum()
+            total = totals["total"].rolling(window, min_periods=1).sum()
+            rates[f"rolling_{window}d"] = completed / total.replace(0, np.nan)
+    return rates
+
+def streaks(daily_rates: pd.Series, threshold: float = STREAK_THRESHOLD) -> Dict[str, int]:
+    """Current and longest runs of consecutive days at or above ``threshold``.
+
+    The last day may still be in progress, so the current streak also counts a
+    run that ends the day before it.
+    """
+    active = (daily_rates.fillna(0).to_numpy() >= threshold).astype(np.int8)
+    if not active.size:
+        return {"current": 0, "longest": 0}
+    edges = np.diff(np.concatenate(([0], active, [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    lengths = ends - starts
+    return {
+        "current": int(lengths[-1]) if lengths.size and ends[-1] >= active.size - 1 else 0,
+        "longest": int(lengths.max()) if lengths.size else 0,
+    }
+
+def item_adherence(frame: pd.DataFrame) -> pd.DataFrame:
+    grouped = frame.groupby(["category", "item"], observed=True)["completed"]
+    adherence = grouped.agg(days="size", completed="sum").reset_index()
+    adherence["rate"] = adherence["completed"] / adherence["days"]
+    return adherence.sort_values(["rate", "category", "item"], ascending=[False, True, True], ignore_index=True)
+
+def weekday_heatmap(frame: pd.DataFrame) -> pd.DataFrame:
+    """Mean completion per weekday (rows, Monday first) and category (columns)."""
+    weekday = frame["date"].dt.weekday.to_numpy()
+    heatmap = (frame.assign(weekday=weekday)
+               .groupby(["weekday", "category"], observed=True)["completed"].mean()
+               .unstack("category")
+               .reindex(range(7)))
+    heatmap.index = WEEKDAY_LABELS
+    return heatmap
+
+def compute_analytics(frame: pd.DataFrame, end_date: Optional[str] = None,
+                      threshold: float = STREAK_THRESHOLD) -> Dict[str, Any]:
+    totals = daily_totals(frame, end_date)
+    rates = rolling_completion(totals)
+    return {
+        "rates": rates,
+        "streaks": streaks(rates["daily"], threshold),
+        "adherence": item_adherence(frame),
+        "heatmap": weekday_heatmap(frame),
+    }
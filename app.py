@@ -1,13 +1,31 @@
 import streamlit as st
-from database import init_db, get_checklist_items, add_checklist_item, remove_checklist_item, save_daily_progress, get_daily_progress, get_progress_history, save_notification, get_notifications, remove_notification, save_reflection, get_recent_reflection
-from auth import register_user, authenticate_user
-from typing import TypedDict, NotRequired, List, Dict
+from database import init_db, get_checklist_items, get_user_checklist, add_checklist_item, remove_checklist_item, save_daily_progress, get_daily_progress, save_notification, get_notifications, remove_notification, save_reflection, get_recent_reflection, search_reflections
+from auth import register_user, authenticate_user, AuthBusyError
+from backup import get_import_checkpoint, user_export_bytes, import_user_stream
+from sessions import create_session, validate_session, revoke_session, start_session_sweeper
+from write_behind import enable_write_behind
+from metrics import enable_metrics, metrics_enabled, rerun, timed
+from reminders import reminder_inbox, start_reminder_scheduler
+from typing import TypedDict, NotRequired, Dict
 from datetime import datetime, timedelta
-import pandas as pd
-import plotly.express as px
+import os
 
-# 데이터베이스 초기화
-init_db()
+@st.cache_resource(show_spinner=False)
+def startup() -> None:
+    """Process-wide setup. Streamlit reruns this script on every interaction, so it is cached."""
+    # WELLNESS_METRICS=1이면 DB 호출, 쿼리, 화면 구역별 시간을 기록한다.
+    if os.environ.get("WELLNESS_METRICS") == "1":
+        enable_metrics()
+
+    # 데이터베이스 초기화
+    init_db()
+    start_session_sweeper()
+    start_reminder_scheduler()
+    # 저녁 시간대처럼 저장이 몰릴 때는 WELLNESS_WRITE_BEHIND=1로 백그라운드 저장을 켠다.
+    if os.environ.get("WELLNESS_WRITE_BEHIND") == "1":
+        enable_write_behind()
+
+startup()
 
 class ReflectionData(TypedDict):
     date: str
@@ -20,6 +38,7 @@ class ProgressData(TypedDict):
     category: str
     completion_rate: float
 
+@timed("render")
 def login_page():
     st.title("로그인")
     username = st.text_input("사용자 이름")
@@ -27,16 +46,25 @@ def login_page():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("로그인"):
-            if authenticate_user(username, password):
-                st.session_state.username = username
-                st.session_state.page = "main"
-                st.success("로그인 성공!")
+            try:
+                authenticated = authenticate_user(username, password)
+            except AuthBusyError as e:
+                st.warning(str(e))
             else:
-                st.error("잘못된 사용자 이름 또는 비밀번호입니다.")
+                if authenticated:
+                    token = create_session(username)
+                    st.session_state.username = username
+                    # 토큰은 서버 쪽 세션 상태에만 둔다. URL에 넣으면 방문 기록, Referer, 공유한 링크로 새어 나간다.
+                    st.session_state.session_token = token
+                    st.session_state.page = "main"
+                    st.success("로그인 성공!")
+                else:
+                    st.error("잘못된 사용자 이름 또는 비밀번호입니다.")
     with col2:
         if st.button("회원가입"):
             st.session_state.page = "register"
 
+@timed("render")
 def register_page():
     st.title("회원가입")
     username = st.text_input("사용자 이름")
@@ -55,6 +83,7 @@ def register_page():
     if st.button("로그인 페이지로 돌아가기"):
         st.session_state.page = "login"
 
+@timed("render")
 def main_screen():
     st.set_page_config(page_title="50+ 일일 웰니스 대시보드", layout="wide")
     st.title("50+ 일일 웰니스 체크리스트 및 계획")
@@ -67,78 +96,23 @@ def main_screen():
     display_reflection()
     display_quick_links()
 
+@timed("render")
 def display_checklist():
-    checklist_data: Dict[str, List[str]] = {
-        "건강 관리": [
-            "아침 체조 또는 스트레칭 (10-15분)",
-            "30분 이상 중강도 운동 (걷기, 수영, 자전거 등)",
-            "8잔 이상의 물 섭취",
-            "균형 잡힌 식사 3회 (채소, 단백질, 전곡류 포함)",
-            "복용 약물 체크 및 섭취",
-            "혈압/혈당 측정 (해당 시)",
-            "충분한 수면 (7-8시간 목표)"
-        ],
-        "재정 관리": [
-            "일일 지출 기록",
-            "예산 대비 지출 확인",
-            "투자 포트폴리오 점검 (주 1회)",
-            "재정 목표 진행 상황 검토 (월 1회)"
-        ],
-        "관계 유지": [
-            "가족/친구와 연락 (전화, 문자, 이메일 등)",
-            "대면 만남 계획 또는 실행 (주 1-2회)",
-            "새로운 사회적 연결 모색 (동호회, 봉사활동 등)"
-        ],
-        "지속적 학습과 성장": [
-            "새로운 기술/지식 학습 (30분-1시간)",
-            "독서 (30분 이상)",
-            "온라인 강좌 또는 워크샵 참여 (주 1-2회)"
-        ],
-        "취미 및 여가 활동": [
-            "즐거운 취미 활동 (1시간 이상)",
-            "새로운 경험 계획 (월 1회 이상)",
-            "문화 활동 참여 (영화, 전시회 등, 월 1-2회)"
-        ],
-        "사회적 참여와 기여": [
-            "지역 사회 활동 또는 봉사 계획/참여 (주 1회 이상)",
-            "멘토링 또는 지식 공유 활동 (해당 시)"
-        ],
-        "정신적 웰빙": [
-            "명상 또는 마음 챙김 실천 (15-20분)",
-            "감사일기 작성",
-            "스트레스 관리 기법 실천 (심호흡, 점진적 근육 이완 등)"
-        ],
-        "긍정적 마인드셋": [
-            "하루 3가지 긍정적인 일 찾기",
-            "자기 긍정 확언 실천",
-            "개인 성장 목표 점검 및 조정"
-        ],
-        "일과 삶의 균형": [
-            "업무 시간과 개인 시간 구분 짓기",
-            "휴식과 회복 시간 확보",
-            "주간 일정 검토 및 조정"
-        ],
-        "주거 환경 관리": [
-            "간단한 집안 정리정돈 (15-20분)",
-            "환기 및 실내 공기질 관리",
-            "안전 점검 (화재경보기, 잠금장치 등, 월 1회)"
-        ]
-    }
-    
     progress: Dict[str, Dict[str, bool]] = {}
-    
-    for category, items in checklist_data.items():
-        st.subheader(f"{category}")
+    # 기본 템플릿에 사용자 변경분을 적용한 결과가 캐시되어 있어서 다시 그릴 때 조회나 조립을 하지 않는다.
+    checklist = get_user_checklist(st.session_state.username)
+
+    for category, entries in checklist.categories:
+        st.subheader(category)
         progress[category] = {}
-        for item in items:
-            key = f"{category}_{item}"
-            checked = st.checkbox(item, key=key)
-            progress[category][item] = checked
+        for entry in entries:
+            progress[category][entry.item] = st.checkbox(entry.item, key=entry.widget_key)
 
     if st.button("체크리스트 저장"):
         save_daily_progress(st.session_state.username, f"{datetime.now():%Y-%m-%d}", progress)
         st.success("오늘의 체크리스트가 저장되었습니다!")
 
+@timed("render")
 def display_progress_summary():
     st.subheader("진행 상황 요약")
     progress: dict[str, dict[str, bool]] = get_daily_progress(st.session_state.username, f"{datetime.now():%Y-%m-%d}")
@@ -152,19 +126,22 @@ def display_progress_summary():
 
     display_weekly_progress()
 
+@timed("render")
 def display_weekly_progress():
     st.subheader("최근 7일간의 진행 상황")
     end_date: datetime = datetime.now()
     start_date: datetime = end_date - timedelta(days=6)
-    history: List[ProgressData] = get_progress_history(st.session_state.username, f"{start_date:%Y-%m-%d}", f"{end_date:%Y-%m-%d}")
+    # numpy와 plotly는 불러오는 데 0.5초 넘게 걸려서 차트를 처음 그릴 때 불러온다.
+    from charts import progress_figure
+    # 그림은 사용자·기간·데이터 버전별로 저장해 두어서 저장하기 전까지는 다시 그릴 때 조회도 하지 않는다.
+    fig = progress_figure(st.session_state.username, f"{start_date:%Y-%m-%d}", f"{end_date:%Y-%m-%d}")
     
-    if history:
-        df = pd.DataFrame(history)
-        fig = px.line(df, x='date', y='completion_rate', color='category', title='카테고리별 진행 상황')
+    if fig is not None:
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("최근 7일간의 데이터가 없습니다.")
 
+@timed("render")
 def display_reflection():
     st.subheader("오늘의 성찰")
     achievements: str = st.text_area("오늘의 성취:")
@@ -186,6 +163,37 @@ def display_reflection():
     else:
         st.info("최근 성찰 내용이 없습니다.")
 
+    display_reflection_search()
+
+@timed("render")
+def display_reflection_search():
+    st.subheader("성찰 검색")
+    query: str = st.text_input("검색어 (띄어 쓴 단어가 모두 들어간 성찰을 찾습니다)").strip()
+    if not query:
+        return
+    # 페이지마다 앞 페이지가 돌려준 cursor(아직 보여 주지 않은 순위)를 넘긴다. 검색어가 바뀌면 첫 페이지부터 다시 본다.
+    search = st.session_state.get("reflection_search")
+    if search is None or search["query"] != query:
+        search = st.session_state.reflection_search = {"query": query, "cursors": [None]}
+    page = search_reflections(st.session_state.username, query, after=search["cursors"][-1])
+    if not page.hits:
+        st.info("검색 결과가 없습니다.")
+    for hit in page.hits:
+        with st.expander(hit.date):
+            st.write(f"**성취:** {hit.achievements}")
+            st.write(f"**개선점:** {hit.improvements}")
+            st.write(f"**내일의 목표:** {hit.tomorrow_goals}")
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(search["cursors"]) > 1 and st.button("이전 결과"):
+            search["cursors"].pop()
+            st.rerun()
+    with col2:
+        if page.next_cursor is not None and st.button("다음 결과"):
+            search["cursors"].append(page.next_cursor)
+            st.rerun()
+
+@timed("render")
 def display_quick_links():
     st.subheader("빠른 링크")
     col1, col2, col3, col4 = st.columns(4)
@@ -204,56 +212,167 @@ def display_quick_links():
             st.session_state.page = "data_management"
     
     if st.button("로그아웃"):
+        if "session_token" in st.session_state:
+            revoke_session(st.session_state.session_token)
         st.session_state.clear()
         st.session_state.page = "login"
 
+@timed("render")
 def checklist_management():
     st.title("체크리스트 관리")
     # 체크리스트 관리 기능 구현
     if st.button("메인 화면으로 돌아가기"):
         st.session_state.page = "main"
 
+ANALYSIS_RANGES: Dict[str, int] = {"최근 30일": 30, "최근 1년": 365, "전체 기간": 0}
+
+@timed("render")
 def detailed_analysis():
+    from analytics import load_progress_frame, compute_analytics
+    from charts import trend_figure
+    import plotly.express as px
     st.title("상세 분석")
-    # 상세 분석 기능 구현
+    label: str = st.selectbox("기간", list(ANALYSIS_RANGES), index=1)
+    days: int = ANALYSIS_RANGES[label]
+    today: datetime = datetime.now()
+    start_date = f"{today - timedelta(days=days - 1):%Y-%m-%d}" if days else None
+    frame = load_progress_frame(st.session_state.username, start_date, f"{today:%Y-%m-%d}")
+
+    if frame.empty:
+        st.info("분석할 데이터가 없습니다.")
+    else:
+        result = compute_analytics(frame, f"{today:%Y-%m-%d}")
+        col1, col2 = st.columns(2)
+        col1.metric("현재 연속 달성일", f"{result['streaks']['current']}일")
+        col2.metric("최장 연속 달성일", f"{result['streaks']['longest']}일")
+
+        fig = trend_figure(st.session_state.username, start_date, f"{today:%Y-%m-%d}")
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.subheader("항목별 실천율")
+        st.dataframe(result["adherence"], use_container_width=True, hide_index=True)
+
+        st.subheader("요일별 달성률")
+        heatmap = px.imshow(result["heatmap"], zmin=0, zmax=1, color_continuous_scale="Greens", aspect="auto")
+        st.plotly_chart(heatmap, use_container_width=True)
+
     if st.button("메인 화면으로 돌아가기"):
         st.session_state.page = "main"
 
+@timed("render")
 def notification_settings():
     st.title("알림 설정")
-    # 알림 설정 기능 구현
+    username: str = st.session_state.username
+
+    st.subheader("새 알림")
+    item: str = st.text_input("알림 항목")
+    alarm_time = st.time_input("알림 시각", step=300)
+    if st.button("알림 추가"):
+        if item.strip():
+            save_notification(username, item.strip(), f"{alarm_time:%H:%M}")
+            st.success("알림이 추가되었습니다.")
+        else:
+            st.error("알림 항목을 입력해 주세요.")
+
+    st.subheader("등록된 알림")
+    notifications = get_notifications(username)
+    if notifications:
+        for index, notification in enumerate(sorted(notifications, key=lambda n: (n["time"], n["item"]))):
+            col1, col2 = st.columns([4, 1])
+            col1.write(f"{notification['time']} · {notification['item']}")
+            if col2.button("삭제", key=f"remove_notification_{index}"):
+                remove_notification(username, notification["item"])
+                st.rerun()
+    else:
+        st.info("등록된 알림이 없습니다.")
+
     if st.button("메인 화면으로 돌아가기"):
         st.session_state.page = "main"
 
+@timed("render")
 def data_management():
     st.title("데이터 관리")
-    # 데이터 관리 기능 구현
+    username: str = st.session_state.username
+    # 다운로드 버튼을 누를 때에만 내보내기를 만든다.
+    st.download_button("데이터 내보내기 (JSON)", data=lambda: user_export_bytes(username),
+                       file_name=f"wellness_{username}.json", mime="application/json")
+    st.download_button("데이터 내보내기 (NDJSON, gzip)",
+                       data=lambda: user_export_bytes(username, fmt="ndjson", compress=True),
+                       file_name=f"wellness_{username}.ndjson.gz", mime="application/gzip")
+
+    uploaded = st.file_uploader("데이터 가져오기", type=["json", "ndjson", "gz"])
+    restart = finished = False
+    if uploaded is not None:
+        import_id = f"{uploaded.name}:{uploaded.size}"
+        records_done, finished = get_import_checkpoint(username, import_id)
+        if finished:
+            st.info("이 파일은 이미 가져왔습니다.")
+            restart = st.checkbox("처음부터 다시 가져오기")
+        elif records_done:
+            st.info(f"중단된 가져오기가 있습니다. {records_done}번째 레코드 다음부터 이어서 가져옵니다.")
+    if uploaded is not None and st.button("가져오기 실행", disabled=finished and not restart):
+        try:
+            # 같은 파일을 다시 올리면 중단된 지점부터 이어서 가져온다.
+            stats = import_user_stream(username, uploaded, import_id=import_id, restart=restart)
+            imported = sum(int(table["records"]) for table in stats.values())
+            st.success(f"{imported}개의 레코드를 가져왔습니다.")
+        except ValueError as e:
+            st.error(f"가져오기 중 오류가 발생했습니다: {e}")
     if st.button("메인 화면으로 돌아가기"):
         st.session_state.page = "main"
 
-def main():
-    if 'page' not in st.session_state:
-        st.session_state.page = "login"
-
-    # 페이지 전환 로직
+@timed("render")
+def restore_session():
+    # 예전 버전이 URL에 넣던 토큰은 쓰지 않고 주소창에서 지운다.
+    st.query_params.pop("session", None)
+    token = st.session_state.get("session_token")
+    if not token:
+        return
+    username = validate_session(token)
+    if username is None:
+        st.session_state.pop("username", None)
+        st.session_state.pop("session_token", None)
+        if st.session_state.page != "register":
+            st.session_state.page = "login"
+        return
+    st.session_state.username = username
+    st.session_state.session_token = token
     if st.session_state.page == "login":
-        login_page()
-    elif st.session_state.page == "register":
-        register_page()
-    elif st.session_state.page == "main":
-        if 'username' in st.session_state:
-            main_screen()
-        else:
-            st.error("로그인이 필요합니다.")
+        st.session_state.page = "main"
+
+def main():
+    with rerun() as breakdown:
+        if 'page' not in st.session_state:
             st.session_state.page = "login"
-    elif st.session_state.page == "checklist_management":
-        checklist_management()
-    elif st.session_state.page == "detailed_analysis":
-        detailed_analysis()
-    elif st.session_state.page == "notification_settings":
-        notification_settings()
-    elif st.session_state.page == "data_management":
-        data_management()
+        restore_session()
+        if "username" in st.session_state:
+            # 스케줄러가 보낸 알림은 다음 화면 갱신 때 보여 준다.
+            for reminder in reminder_inbox.drain(st.session_state.username):
+                st.toast(f"⏰ {reminder.time} {reminder.item}")
+
+        # 페이지 전환 로직
+        if st.session_state.page == "login":
+            login_page()
+        elif st.session_state.page == "register":
+            register_page()
+        elif st.session_state.page == "main":
+            if 'username' in st.session_state:
+                main_screen()
+            else:
+                st.error("로그인이 필요합니다.")
+                st.session_state.page = "login"
+        elif st.session_state.page == "checklist_management":
+            checklist_management()
+        elif st.session_state.page == "detailed_analysis":
+            detailed_analysis()
+        elif st.session_state.page == "notification_settings":
+            notification_settings()
+        elif st.session_state.page == "data_management":
+            data_management()
+
+    if metrics_enabled() and breakdown:
+        with st.sidebar.expander("성능 측정 (이번 실행)"):
+            st.dataframe(breakdown, hide_index=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,71 +1,198 @@
 import bcrypt
+import os
 import sqlite3
-from typing import Optional, Tuple
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
 
-DB_NAME = 'wellness.db'
+from cache import invalidate_after_commit
+from connection import connect, transaction
+from metrics import timed
+from reminders import reminder_removed
+from sessions import revoke_user_sessions, validate_session
 
+BCRYPT_ROUNDS = int(os.environ.get("WELLNESS_BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.environ.get("WELLNESS_HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_QUEUE_DEPTH = int(os.environ.get("WELLNESS_HASH_QUEUE_DEPTH", "32"))
+HASH_WAIT_SECONDS = 5.0
+
+BUSY_MESSAGE = "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해 주세요."
+
+class AuthBusyError(RuntimeError):
+    pass
+
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded worker pool instead of the Streamlit script threads.
+
+    At most ``workers`` hashes run at once and at most ``max_pending`` more may
+    wait for a worker. Once that queue is full a caller waits up to
+    ``wait_timeout`` seconds for a slot and then gets ``AuthBusyError``.
+    bcrypt releases the GIL, so the default thread pool uses every core;
+    ``use_processes`` switches to a process pool.
+    """
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = HASH_WORKERS,
+                 max_pending: int = HASH_QUEUE_DEPTH, wait_timeout: float = HASH_WAIT_SECONDS,
+                 use_processes: bool = False) -> None:
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait_timeout = wait_timeout
+        self._executor: Executor = (ProcessPoolExecutor(max_workers=workers) if use_processes
+                                    else ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt"))
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            with self._lock:
+                self._rejected += 1
+            raise AuthBusyError(BUSY_MESSAGE)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hashpw, password.encode('utf-8'), self.rounds).decode('utf-8')
+
+    def verify(self, stored_password: str, provided_password: str) -> bool:
+        return self._run(_checkpw, provided_password.encode('utf-8'), stored_password.encode('utf-8'))
+
+    def needs_rehash(self, stored_password: str) -> bool:
+        # "$2b$12$<salt+hash>" 형식에서 비용 인자를 읽는다.
+        parts = stored_password.split("$")
+        return len(parts) < 4 or not parts[2].isdigit() or int(parts[2]) != self.rounds
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+password_hasher = PasswordHasher()
+
+def configure_hasher(**options: Any) -> PasswordHasher:
+    global password_hasher
+    previous, password_hasher = password_hasher, PasswordHasher(**options)
+    previous.shutdown()
+    return password_hasher
+
+@timed("auth")
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return password_hasher.hash(password)
 
+@timed("auth")
 def verify_password(stored_password: str, provided_password: str) -> bool:
-    return bcrypt.checkpw(provided_password.encode('utf-8'), stored_password.encode('utf-8'))
+    return password_hasher.verify(stored_password, provided_password)
 
+@timed("auth")
 def register_user(username: str, password: str) -> Tuple[bool, str]:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
     try:
         hashed_password = hash_password(password)
-        c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password))
         return True, "사용자가 성공적으로 등록되었습니다."
     except sqlite3.IntegrityError:
         return False, "이미 존재하는 사용자명입니다."
-    finally:
-        conn.close()
+    except AuthBusyError:
+        return False, BUSY_MESSAGE
 
+@timed("auth")
 def authenticate_user(username: str, password: str) -> bool:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT password FROM users WHERE username = ?", (username,))
-    result = c.fetchone()
-    conn.close()
-    
-    if result:
-        stored_password = result[0]
-        return verify_password(stored_password, password)
-    return False
-
-def change_password(username: str, old_password: str, new_password: str) -> Tuple[bool, str]:
-    if not authenticate_user(username, old_password):
-        return False, "현재 비밀번호가 일치하지 않습니다."
-    
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("SELECT password FROM users WHERE username = ?", (username,))
+        result = c.fetchone()
+
+    if not result:
+        return False
+    stored_password = result[0]
+    if not verify_password(stored_password, password):
+        return False
+    if password_hasher.needs_rehash(stored_password):
+        # 비용 인자가 바뀌었으면 로그인에 성공한 김에 새 비용으로 다시 해시한다.
+        try:
+            rehashed = hash_password(password)
+        except AuthBusyError:
+            return True
+        with transaction() as conn:
+            conn.execute("UPDATE users SET password = ? WHERE username = ? AND password = ?",
+                         (rehashed, username, stored_password))
+    return True
+
+def _confirm_identity(username: str, password: Optional[str], session_token: Optional[str]) -> bool:
+    # 로그인된 세션이면 bcrypt 검증 없이 토큰 조회만으로 본인 확인을 끝낸다.
+    if session_token is not None and validate_session(session_token) == username:
+        return True
+    return password is not None and authenticate_user(username, password)
+
+@timed("auth")
+def change_password(username: str, old_password: Optional[str], new_password: str,
+                    session_token: Optional[str] = None) -> Tuple[bool, str]:
+    try:
+        if not _confirm_identity(username, old_password, session_token):
+            return False, "현재 비밀번호가 일치하지 않습니다."
+    except AuthBusyError:
+        return False, BUSY_MESSAGE
+
     try:
         hashed_password = hash_password(new_password)
-        c.execute("UPDATE users SET password = ? WHERE username = ?", (hashed_password, username))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute("UPDATE users SET password = ? WHERE username = ?", (hashed_password, username))
+            revoke_user_sessions(username, keep_token=session_token)
         return True, "비밀번호가 성공적으로 변경되었습니다."
     except Exception as e:
         return False, f"비밀번호 변경 중 오류가 발생했습니다: {str(e)}"
-    finally:
-        conn.close()
-
-def delete_user(username: str, password: str) -> Tuple[bool, str]:
-    if not authenticate_user(username, password):
-        return False, "비밀번호가 일치하지 않습니다."
-    
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+
+@timed("auth")
+def delete_user(username: str, password: Optional[str], session_token: Optional[str] = None) -> Tuple[bool, str]:
+    try:
+        if not _confirm_identity(username, password, session_token):
+            return False, "비밀번호가 일치하지 않습니다."
+    except AuthBusyError:
+        return False, BUSY_MESSAGE
+
     try:
-        c.execute("DELETE FROM users WHERE username = ?", (username,))
-        c.execute("DELETE FROM checklist_items WHERE username = ?", (username,))
-        c.execute("DELETE FROM daily_progress WHERE username = ?", (username,))
-        c.execute("DELETE FROM reflections WHERE username = ?", (username,))
-        c.execute("DELETE FROM notifications WHERE username = ?", (username,))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute("DELETE FROM users WHERE username = ?", (username,))
+            revoke_user_sessions(username)
+            conn.execute("DELETE FROM cohort_user_weeks WHERE username = ?", (username,))
+            # 샤드를 쓰지 않으면 같은 연결이라 바깥 트랜잭션에 합류한다.
+            # 샤드를 쓰면 사용자 데이터가 먼저 커밋되고, users 삭제가 실패해도 다시 시도하면 된다.
+            with transaction(username) as user_conn:
+                c = user_conn.cursor()
+                c.execute("DELETE FROM checklist_overrides WHERE username = ?", (username,))
+                c.execute("DELETE FROM daily_progress WHERE username = ?", (username,))
+                c.execute("DELETE FROM daily_category_rollup WHERE username = ?", (username,))
+                c.execute("DELETE FROM daily_progress_bits WHERE username = ?", (username,))
+                c.execute("DELETE FROM reflections WHERE username = ?", (username,))
+                c.execute("DELETE FROM notifications WHERE username = ?", (username,))
+                # 남겨 두면 같은 이름으로 다시 가입한 뒤 같은 파일을 가져올 때 끝난 가져오기로 보고 건너뛴다.
+                c.execute("DELETE FROM import_checkpoints WHERE username = ?", (username,))
+                invalidate_after_commit(username)
+                reminder_removed(username)
         return True, "사용자 계정이 성공적으로 삭제되었습니다."
     except Exception as e:
         return False, f"계정 삭제 중 오류가 발생했습니다: {str(e)}"
-    finally:
-        conn.close()
\ No newline at end of file
@@ -0,0 +1,521 @@
+import gzip
+import io
+import json
+import sqlite3
+import time
+import zlib
+from datetime import date as Date, datetime
+from itertools import groupby
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import progress_bits
+from cache import invalidate_after_commit
+from checklist_templates import add_items, iter_added_items
+from connection import borrow, connect, transaction
+from database import DEFAULT_CHUNK_SIZE, write_progress_rows, write_reflections
+from reminders import reminder_saved
+
+EXPORT_FORMATS = ("json", "ndjson")
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+NDJSON_VERSION = 1
+IMPORT_FORMATS = ("auto", "json", "ndjson")
+IMPORT_BATCH_SIZE = 5000
+IMPORT_READ_SIZE = 64 * 1024
+
+def _fetch_rows(conn: sqlite3.Connection, sql: str, params: tuple, batch_size: int) -> Iterator[tuple]:
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+def _checklist_rows(conn: sqlite3.Connection, username: str, batch_size: int) -> Iterator[tuple]:
+    # 사용자가 직접 추가한 항목만 내보낸다. 기본 템플릿 항목은 가져올 때 다시 붙는다.
+    return iter_added_items(conn, username)
+
+def _progress_rows(conn: sqlite3.Connection, username: str, batch_size: int) -> Iterator[tuple]:
+    if progress_bits.bits_enabled():
+        return progress_bits.iter_rows(conn, username, batch_size)
+    return _fetch_rows(conn, """SELECT date, category, item, completed FROM daily_progress
+                                WHERE username = ? ORDER BY date, category, item""", (username,), batch_size)
+
+def _reflection_rows(conn: sqlite3.Connection, username: str, batch_size: int) -> Iterator[tuple]:
+    return _fetch_rows(conn, """SELECT date, achievements, improvements, tomorrow_goals FROM reflections
+                                WHERE username = ? ORDER BY date""", (username,), batch_size)
+
+def _notification_rows(conn: sqlite3.Connection, username: str, batch_size: int) -> Iterator[tuple]:
+    return _fetch_rows(conn, "SELECT item, time FROM notifications WHERE username = ? ORDER BY id",
+                       (username,), batch_size)
+
+def _reflection_record(row: tuple) -> Dict[str, str]:
+    date, achievements, improvements, tomorrow_goals = row
+    return {
+        "date": date,
+        "achievements": achievements,
+        "improvements": improvements,
+        "tomorrow_goals": tomorrow_goals
+    }
+
+def _indented(value: Any, level: int) -> str:
+    return json.dumps(value, indent=2).replace("\n", "\n" + "  " * level)
+
+def _json_members(members: Iterable[Tuple[Optional[str], Any]], level: int, opening: str, closing: str) -> Iterator[str]:
+    # json.dumps(indent=2)와 같은 모양을 한 멤버씩 만들어 낸다.
+    pad = "\n" + "  " * (level + 1)
+    first = True
+    for key, value in members:
+        prefix = opening + pad if first else "," + pad
+        if key is not None:
+            prefix += json.dumps(key) + ": "
+        yield prefix + _indented(value, level + 1)
+        first = False
+    yield opening + closing if first else "\n" + "  " * level + closing
+
+def _nested_json(conn: sqlite3.Connection, username: str, batch_size: int) -> Iterator[str]:
+    checklist = (
+        (category, [item for _, item in rows])
+        for category, rows in groupby(_checklist_rows(conn, username, batch_size), key=lambda row: row[0])
+    )
+    days = (
+        (date, {
+            category: {item: bool(completed) for _, _, item, completed in items}
+            for category, items in groupby(rows, key=lambda row: row[1])
+        })
+        for date, rows in groupby(_progress_rows(conn, username, batch_size), key=lambda row: row[0])
+    )
+    reflections = ((None, _reflection_record(row)) for row in _reflection_rows(conn, username, batch_size))
+    notifications = (
+        (None, {"item": item, "time": time}) for item, time in _notification_rows(conn, username, batch_size)
+    )
+
+    yield '{\n  "checklist_items": '
+    yield from _json_members(checklist, 1, "{", "}")
+    yield ',\n  "daily_progress": '
+    yield from _json_members(days, 1, "{", "}")
+    yield ',\n  "reflections": '
+    yield from _json_members(reflections, 1, "[", "]")
+    yield ',\n  "notifications": '
+    yield from _json_members(notifications, 1, "[", "]")
+    yield "\n}"
+
+def _ndjson(conn: sqlite3.Connection, username: str, batch_size: int) -> Iterator[str]:
+    def line(record: Dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    yield line({"type": "header", "format": "wellness-export", "version": NDJSON_VERSION})
+    for category, item in _checklist_rows(conn, username, batch_size):
+        yield line({"type": "checklist_item", "category": category, "item": item})
+    for date, category, item, completed in _progress_rows(conn, username, batch_size):
+        yield line({"type": "daily_progress", "date": date, "category": category,
+                    "item": item, "completed": bool(completed)})
+    for row in _reflection_rows(conn, username, batch_size):
+        yield line({"type": "reflection", **_reflection_record(row)})
+    for item, time in _notification_rows(conn, username, batch_size):
+        yield line({"type": "notification", "item": item, "time": time})
+
+def iter_export_text(username: str, fmt: str = "json", batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Yield the user's backup as text pieces, reading rows in ``fetchmany`` batches.
+
+    All sections are read inside one read transaction, so the export is a
+    consistent snapshot even while the user keeps saving.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"지원하지 않는 내보내기 형식입니다: {fmt}")
+    with borrow(username) as conn:
+        conn.execute("BEGIN")
+        try:
+            if fmt == "json":
+                yield from _nested_json(conn, username, batch_size)
+            else:
+                yield from _ndjson(conn, username, batch_size)
+        finally:
+            conn.rollback()
+
+def iter_export_bytes(username: str, fmt: str = "json", compress: bool = False,
+                      batch_size: int = EXPORT_BATCH_SIZE, chunk_bytes: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    """Yield the encoded (and optionally gzip-compressed) backup in chunks of about ``chunk_bytes``."""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = bytearray()
+    for piece in iter_export_text(username, fmt, batch_size):
+        buffer += piece.encode("utf-8")
+        if len(buffer) >= chunk_bytes:
+            data = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+            if data:
+                yield data
+    tail = bytes(buffer)
+    if compressor:
+        tail = compressor.compress(tail) + compressor.flush()
+    if tail:
+        yield tail
+
+def write_user_export(username: str, fileobj: IO[bytes], fmt: str = "json", compress: bool = False,
+                      batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    written = 0
+    for chunk in iter_export_bytes(username, fmt, compress, batch_size):
+        fileobj.write(chunk)
+        written += len(chunk)
+    return written
+
+def user_export_bytes(username: str, fmt: str = "json", compress: bool = False) -> bytes:
+    """The whole backup as bytes, for ``st.download_button``.
+
+    Streamlit seeks and reads the payload into memory before sending it, so a
+    non-seekable stream cannot be handed over; use ``write_user_export`` to
+    stream into a file instead.
+    """
+    return b"".join(iter_export_bytes(username, fmt, compress))
+
+class ImportValidationError(ValueError):
+    def __init__(self, position: int, kind: str, reason: str) -> None:
+        super().__init__(f"{position}번째 레코드({kind})가 올바르지 않습니다: {reason}")
+        self.position = position
+        self.kind = kind
+        self.reason = reason
+
+class _JsonStream:
+    """Incremental reader for one JSON document, decoding one value at a time.
+
+    ``object_keys()``/``array_items()`` walk a container lazily; the caller
+    must consume each member's value (``value()`` or a nested walk) before
+    advancing, so only the current member is ever held in memory.
+    """
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, fileobj: IO[str], initial: str = "") -> None:
+        self._file = fileobj
+        self._buffer = initial
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        chunk = self._file.read(IMPORT_READ_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(f"JSON 구문 오류: {chars!r}가 필요하지만 {char!r}를 만났습니다.")
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # 숫자처럼 버퍼 끝에서 잘렸을 수 있는 값은 더 읽어서 확인한다.
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def object_keys(self) -> Iterator[str]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("JSON 구문 오류: 객체 키는 문자열이어야 합니다.")
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+    def array_items(self) -> Iterator[None]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            if self._expect(",]") == "]":
+                return
+
+Record = Tuple[str, Any]
+
+def _iter_json_records(fileobj: IO[str], initial: str) -> Iterator[Record]:
+    stream = _JsonStream(fileobj, initial)
+    for section in stream.object_keys():
+        if section == "checklist_items":
+            for category in stream.object_keys():
+                items = stream.value()
+                if not isinstance(items, list):
+                    yield "checklist_item", {"category": category, "item": items}
+                    continue
+                for item in items:
+                    yield "checklist_item", {"category": category, "item": item}
+        elif section == "daily_progress":
+            for date in stream.object_keys():
+                categories = stream.value()
+                if not isinstance(categories, dict):
+                    yield "daily_progress", {"date": date, "category": categories}
+                    continue
+                for category, items in categories.items():
+                    if not isinstance(items, dict):
+                        yield "daily_progress", {"date": date, "category": category, "item": items}
+                        continue
+                    for item, completed in items.items():
+                        yield "daily_progress", {"date": date, "category": category,
+                                                 "item": item, "completed": completed}
+        elif section in ("reflections", "notifications"):
+            kind = section[:-1]
+            for _ in stream.array_items():
+                yield kind, stream.value()
+        else:
+            stream.value()
+
+def _iter_ndjson_records(lines: Iterable[str]) -> Iterator[Record]:
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"NDJSON {number}번째 줄을 해석할 수 없습니다: {e}") from e
+        kind = record.pop("type", None) if isinstance(record, dict) else None
+        if kind == "header":
+            version = record.get("version", NDJSON_VERSION)
+            # bool도 int지만 버전 번호로 쓰이지 않는다.
+            if not isinstance(version, int) or isinstance(version, bool) or version > NDJSON_VERSION:
+                raise ValueError(f"지원하지 않는 NDJSON 버전입니다: {version!r}")
+            continue
+        yield str(kind), record
+
+def _require_text(record: Dict[str, Any], field: str) -> str:
+    value = record.get(field)
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"'{field}' 값이 비어 있거나 문자열이 아닙니다.")
+    return value
+
+def _require_date(record: Dict[str, Any]) -> str:
+    value = _require_text(record, "date")
+    try:
+        Date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"날짜 형식(YYYY-MM-DD)이 아닙니다: {value!r}") from None
+    return value
+
+def _checklist_params(record: Dict[str, Any]) -> tuple:
+    return _require_text(record, "category"), _require_text(record, "item")
+
+def _progress_params(record: Dict[str, Any]) -> tuple:
+    completed = record.get("completed")
+    if not isinstance(completed, (bool, int)) or completed not in (0, 1):
+        raise ValueError(f"'completed' 값이 불리언이 아닙니다: {completed!r}")
+    return _require_date(record), _require_text(record, "category"), _require_text(record, "item"), int(completed)
+
+def _reflection_params(record: Dict[str, Any]) -> tuple:
+    fields = ("achievements", "improvements", "tomorrow_goals")
+    for field in fields:
+        if not isinstance(record.get(field), str):
+            raise ValueError(f"'{field}' 값이 문자열이 아닙니다.")
+    return (_require_date(record), *(record[field] for field in fields))
+
+def _notification_params(record: Dict[str, Any]) -> tuple:
+    return _require_text(record, "item"), _require_text(record, "time")
+
+_VALIDATORS: Dict[str, Callable[[Dict[str, Any]], tuple]] = {
+    "checklist_item": _checklist_params,
+    "daily_progress": _progress_params,
+    "reflection": _reflection_params,
+    "notification": _notification_params,
+}
+
+_TABLES = {
+    "checklist_item": "checklist_items",
+    "daily_progress": "daily_progress",
+    "reflection": "reflections",
+    "notification": "notifications",
+}
+
+def _open_text(fileobj: Union[IO[str], IO[bytes]]) -> IO[str]:
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    buffered = fileobj if hasattr(fileobj, "peek") else io.BufferedReader(fileobj)
+    if buffered.peek(2)[:2] == b"\x1f\x8b":
+        buffered = gzip.GzipFile(fileobj=buffered)
+    return io.TextIOWrapper(buffered, encoding="utf-8")
+
+def _detect_format(head: str, complete: bool) -> str:
+    """NDJSON if the first line of ``head`` is a whole object with a ``type``, otherwise JSON.
+
+    ``head`` is only the first read of the file; when it ends before the first
+    line does (``complete`` false), the line is too long to be an NDJSON
+    header and is not decoded.
+    """
+    first_line, newline, _ = head.lstrip().partition("\n")
+    if not newline and not complete:
+        return "json"
+    try:
+        record = json.loads(first_line)
+    except json.JSONDecodeError:
+        return "json"
+    return "ndjson" if isinstance(record, dict) and "type" in record else "json"
+
+def _lines(head: str, text: IO[str]) -> Iterator[str]:
+    """The lines of ``head`` followed by the rest of ``text``, re-joining the line split between them."""
+    # splitlines()는 U+2028 같은 문자에서도 나누므로 줄바꿈으로만 나눈다.
+    *lines, rest = head.split("\n")
+    for line in lines:
+        yield line + "\n"
+    rest += text.readline()
+    if rest:
+        yield rest
+    yield from text
+
+def _iter_records(fileobj: Union[IO[str], IO[bytes]], fmt: str) -> Iterator[Record]:
+    text = _open_text(fileobj)
+    # 한 줄짜리 JSON 백업은 줄 전체가 파일 전체이므로 readline() 대신 한 번 읽은 만큼만 보고 형식을 정한다.
+    head = text.read(IMPORT_READ_SIZE)
+    if fmt == "auto":
+        fmt = _detect_format(head, len(head) < IMPORT_READ_SIZE)
+    if fmt == "ndjson":
+        return _iter_ndjson_records(_lines(head, text))
+    return _iter_json_records(text, head)
+
+def get_import_checkpoint(username: str, import_id: str) -> Tuple[int, bool]:
+    with connect(username) as conn:
+        row = conn.execute("SELECT records_done, finished FROM import_checkpoints WHERE username = ? AND import_id = ?",
+                           (username, import_id)).fetchone()
+    return (row[0], bool(row[1])) if row else (0, False)
+
+def _save_checkpoint(conn: sqlite3.Connection, username: str, import_id: str, records_done: int, finished: bool) -> None:
+    conn.execute("""INSERT OR REPLACE INTO import_checkpoints
+                    (username, import_id, records_done, finished, updated_at)
+                    VALUES (?, ?, ?, ?, ?)""",
+                 (username, import_id, records_done, int(finished), datetime.now().isoformat(timespec="seconds")))
+
+# 진행 상황과 성찰은 write_progress_rows·write_reflections가 무효화한다.
+_CACHED_READS = {
+    "notification": "get_notifications",
+}
+
+_INSERT_SQL = {
+    "notification": "INSERT INTO notifications (username, item, time) VALUES (?, ?, ?)",
+}
+
+def _write_batch(conn: sqlite3.Connection, username: str, batch: Dict[str, List[tuple]], chunk_size: int,
+                 stats: Dict[str, Dict[str, float]]) -> None:
+    for kind, rows in batch.items():
+        if not rows:
+            continue
+        table = stats[_TABLES[kind]]
+        started = time.perf_counter()
+        if kind == "daily_progress":
+            for key, count in write_progress_rows(conn, username, rows, chunk_size).items():
+                table[key] += count
+        elif kind == "checklist_item":
+            add_items(conn, username, rows)
+            invalidate_after_commit(username, "get_checklist_items")
+            invalidate_after_commit(username, "get_user_checklist")
+        elif kind == "reflection":
+            write_reflections(conn, username, rows)
+        else:
+            conn.executemany(_INSERT_SQL[kind], ((username, *params) for params in rows))
+            invalidate_after_commit(username, _CACHED_READS[kind])
+            if kind == "notification":
+                for item, time_of_day in rows:
+                    reminder_saved(username, item, time_of_day)
+        table["seconds"] += time.perf_counter() - started
+
+def import_user_stream(username: str, fileobj: Union[IO[str], IO[bytes]], fmt: str = "auto",
+                       batch_size: int = IMPORT_BATCH_SIZE, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       import_id: Optional[str] = None, skip_invalid: bool = False,
+                       restart: bool = False) -> Dict[str, Dict[str, float]]:
+    """Import a JSON or NDJSON backup (optionally gzipped) without loading it whole.
+
+    Records are validated as they are read and committed every ``batch_size``
+    records. With ``import_id`` the number of committed records is stored in
+    the same transaction, so rerunning an interrupted import with the same id
+    skips what is already in the database; once an import with that id has
+    finished, rerunning it imports nothing unless ``restart`` is set, which
+    ignores the stored checkpoint and imports from the first record. Check
+    ``get_import_checkpoint`` first to tell the user. An invalid record raises
+    ``ImportValidationError`` (earlier batches stay committed) unless
+    ``skip_invalid`` is set, in which case it is counted as rejected.
+    Returns per-table record counts, rejected counts and throughput.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"지원하지 않는 가져오기 형식입니다: {fmt}")
+    stats: Dict[str, Dict[str, float]] = {
+        table: {"records": 0, "rejected": 0, "seconds": 0.0, "records_per_second": 0.0}
+        for table in _TABLES.values()
+    }
+    stats["daily_progress"].update({"inserted": 0, "updated": 0, "skipped": 0})
+    unknown = 0
+    resume_from, finished = get_import_checkpoint(username, import_id) if import_id and not restart else (0, False)
+    if finished:
+        return stats
+
+    batch: Dict[str, List[tuple]] = {kind: [] for kind in _VALIDATORS}
+    pending = 0
+    position = 0
+
+    def flush(done: bool) -> None:
+        nonlocal pending
+        with transaction(username) as conn:
+            _write_batch(conn, username, batch, chunk_size, stats)
+            if import_id:
+                _save_checkpoint(conn, username, import_id, position, done)
+        for rows in batch.values():
+            rows.clear()
+        pending = 0
+
+    for kind, record in _iter_records(fileobj, fmt):
+        position += 1
+        if position <= resume_from:
+            continue
+        try:
+            validate = _VALIDATORS.get(kind)
+            if validate is None:
+                raise ValueError("알 수 없는 레코드 종류입니다.")
+            if not isinstance(record, dict):
+                raise ValueError("레코드가 객체가 아닙니다.")
+            params = validate(record)
+        except ValueError as e:
+            if not skip_invalid:
+                # 앞선 레코드까지는 커밋해 두고, 고친 뒤 같은 import_id로 이어서 가져올 수 있게 한다.
+                position -= 1
+                flush(False)
+                raise ImportValidationError(position + 1, kind, str(e)) from None
+            if kind in _TABLES:
+                stats[_TABLES[kind]]["rejected"] += 1
+            else:
+                unknown += 1
+            continue
+        batch[kind].append(params)
+        stats[_TABLES[kind]]["records"] += 1
+        pending += 1
+        if pending >= batch_size:
+            flush(False)
+    flush(True)
+
+    if unknown:
+        stats["unknown"] = {"records": 0, "rejected": unknown, "seconds": 0.0, "records_per_second": 0.0}
+    for table in stats.values():
+        if table["seconds"]:
+            table["records_per_second"] = table["records"] / table["seconds"]
+    return stats
@@ -0,0 +1,81 @@
+import argparse
+import time
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import print_table, summarize, temp_database
+
+import analytics
+from connection import transaction
+
+CATEGORIES = 10
+ITEMS_PER_CATEGORY = 4
+
+def synthetic_frame(rng: np.random.Generator, years: int, end: date) -> pd.DataFrame:
+    days = years * 365
+    items = CATEGORIES * ITEMS_PER_CATEGORY
+    dates = pd.date_range(end=pd.Timestamp(end), periods=days, freq="D").values.repeat(items)
+    item_codes = np.tile(np.arange(items), days)
+    # 항목마다 성향이 다르도록 완료 확률을 다르게 준다.
+    chance = rng.uniform(0.3, 0.95, size=items)[item_codes]
+    return pd.DataFrame({
+        "date": dates,
+        "category": pd.Categorical.from_codes(item_codes // ITEMS_PER_CATEGORY,
+                                              [f"카테고리{c}" for c in range(CATEGORIES)]),
+        "item": pd.Categorical.from_codes(item_codes, [f"항목{i}" for i in range(items)]),
+        "completed": (rng.random(item_codes.size) < chance).astype(np.uint8),
+    })
+
+def bench_compute(users: int, years: int, seed: int) -> Dict[str, float]:
+    rng = np.random.default_rng(seed)
+    end = date.today()
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for _ in range(users):
+        frame = synthetic_frame(rng, years, end)
+        t0 = time.perf_counter()
+        analytics.compute_analytics(frame, end.isoformat())
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, sum(latencies) or time.perf_counter() - started)
+
+def bench_page(years: int, seed: int, repeats: int) -> Dict[str, float]:
+    """Load the heaviest user from SQLite and compute everything the page shows."""
+    rng = np.random.default_rng(seed)
+    end = date.today()
+    frame = synthetic_frame(rng, years, end)
+    rows = ((d.strftime("%Y-%m-%d"), str(c), str(i), int(v)) for d, c, i, v in
+            zip(pd.DatetimeIndex(frame["date"]), frame["category"], frame["item"], frame["completed"]))
+    with temp_database():
+        with transaction() as conn:
+            conn.executemany("""INSERT INTO daily_progress (username, date, category, item, completed)
+                                VALUES ('heavy', ?, ?, ?, ?)""", rows)
+        latencies = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            loaded = analytics.load_progress_frame("heavy")
+            analytics.compute_analytics(loaded, end.isoformat())
+            latencies.append(time.perf_counter() - t0)
+    result = summarize(latencies, sum(latencies))
+    result["rows"] = len(frame)
+    result["frame_kib"] = loaded.memory_usage(deep=True).sum() / 1024
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="상세 분석 계산 벤치마크")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--heavy-years", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"사용자 {args.users}명 × {args.years}년, 사용자당 계산 시간")
+    print_table([bench_compute(args.users, args.years, args.seed)])
+    print(f"\n가장 무거운 사용자({args.heavy_years}년) 로드 + 계산")
+    print_table([bench_page(args.heavy_years, args.seed, args.repeats)])
+
+if __name__ == "__main__":
+    main()
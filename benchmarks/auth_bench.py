@@ -0,0 +1,68 @@
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.common import print_table, summarize, temp_database
+
+import auth
+
+def run_logins(users: int, logins: int, clients: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    rejected = 0
+    lock = threading.Lock()
+    counter = iter(range(logins))
+
+    def client() -> None:
+        nonlocal rejected
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            started = time.perf_counter()
+            try:
+                ok = auth.authenticate_user(f"user{n % users}", "password")
+                assert ok
+            except auth.AuthBusyError:
+                with lock:
+                    rejected += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = summarize(latencies, time.perf_counter() - started)
+    result["rejected"] = rejected
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="bcrypt 로그인 처리량 벤치마크")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=32, help="동시에 로그인하는 세션 수")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queue-depth", type=int, default=64)
+    parser.add_argument("--processes", action="store_true", help="스레드 대신 프로세스 풀 사용")
+    args = parser.parse_args()
+
+    rows = []
+    with temp_database():
+        auth.configure_hasher(rounds=args.rounds)
+        for n in range(args.users):
+            auth.register_user(f"user{n}", "password")
+        for workers in args.pool_sizes:
+            auth.configure_hasher(rounds=args.rounds, workers=workers, max_pending=args.queue_depth,
+                                  use_processes=args.processes)
+            rows.append({"workers": workers, **run_logins(args.users, args.logins, args.clients)})
+    print_table(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import percentile, print_table, temp_database
+from benchmarks.datagen import DatasetSpec, generate_dataset, username
+
+import charts
+from analytics import daily_totals, load_progress_frame, rolling_completion
+from cache import read_cache
+from database import get_progress_history
+
+RANGES = {"7d": 7, "1y": 365, "5y": 5 * 365}
+
+def px_progress(user: str, start: Optional[str], end: str) -> Any:
+    """The previous main-page chart: a DataFrame of every row and px.line on each rerun."""
+    import pandas as pd
+    import plotly.express as px
+    df = pd.DataFrame(get_progress_history(user, start, end))
+    return px.line(df, x="date", y="completion_rate", color="category", title="카테고리별 진행 상황")
+
+def px_trend(user: str, start: Optional[str], end: str) -> Any:
+    import plotly.express as px
+    rates = rolling_completion(daily_totals(load_progress_frame(user, start, end), end)).reset_index()
+    return px.line(rates, x="date", y=["daily", "rolling_7d", "rolling_30d"], title="달성률 추이")
+
+def serialize(fig: Any) -> str:
+    """What st.plotly_chart does with a figure before sending it to the browser."""
+    import plotly.io
+    import plotly.tools
+    return plotly.io.to_json(plotly.tools.return_figure_from_figure_or_data(fig, validate_figure=True),
+                             validate=False)
+
+def median_ms(repeats: int, fn: Callable[[], Any]) -> float:
+    latencies = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return percentile(sorted(latencies), 0.5) * 1000
+
+def measure(repeats: int, build: Callable[[], Any], before: Callable[[], None]) -> Dict[str, float]:
+    def cold() -> Any:
+        before()
+        return build()
+    fig = cold()
+    payload = serialize(fig)
+    return {
+        "points": sum(len(trace.y) for trace in fig.data),
+        "payload_kib": len(payload.encode("utf-8")) / 1024,
+        "build_ms": median_ms(repeats, cold),
+        "serialize_ms": median_ms(repeats, lambda: serialize(fig)),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="진행 차트: 점 줄이기와 그림 캐시 전후의 전송 크기와 그리는 시간")
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    spec = DatasetSpec(users=1, years=5, categories=args.categories, reflection_ratio=0.0,
+                       notifications_per_user=0, seed=args.seed)
+    end = spec.end_date
+    user = username(0)
+    rows: List[Dict[str, object]] = []
+    with temp_database():
+        generate_dataset(spec, password_hash="x")
+        import plotly.express  # noqa: F401  첫 호출의 import 시간을 재지 않도록 미리 불러 둔다.
+
+        def no_caches() -> None:
+            read_cache.clear()
+            charts.clear_figure_cache()
+
+        for label, days in RANGES.items():
+            start = (date.fromisoformat(end) - timedelta(days=days - 1)).isoformat()
+            methods = {
+                ("progress", "px (before)"): lambda: px_progress(user, start, end),
+                ("progress", "charts"): lambda: charts.progress_figure(user, start, end),
+                ("trend", "px (before)"): lambda: px_trend(user, start, end),
+                ("trend", "charts"): lambda: charts.trend_figure(user, start, end),
+            }
+            for (chart, method), build in methods.items():
+                row: Dict[str, object] = {"range": label, "chart": chart, "method": method,
+                                          **measure(args.repeats, build, no_caches)}
+                # 다시 그릴 때: 읽기 캐시와 그림 캐시가 차 있는 상태
+                build()
+                row["rerun_ms"] = median_ms(args.repeats, build)
+                rows.append(row)
+    print_table(rows)
+    print(f"점 예산: 선 하나에 {charts.CHART_POINT_BUDGET}개 (WELLNESS_CHART_POINTS)")
+
+if __name__ == "__main__":
+    main()
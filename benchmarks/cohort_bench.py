@@ -0,0 +1,82 @@
+import argparse
+import multiprocessing
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+from benchmarks.common import print_table, temp_database
+from benchmarks.datagen import DatasetSpec, checklist, generate_dataset, username
+
+import cohort
+import database
+import progress_bits
+from cache import read_cache
+
+def per_user_loop(users: int, start_date: str, end_date: str) -> Dict[str, float]:
+    """What a report costs today: one get_progress_history call per user, merged in Python."""
+    started = time.perf_counter()
+    sums: Dict[str, List[float]] = {}
+    for n in range(users):
+        for row in database.get_progress_history(username(n), start_date, end_date):
+            total = sums.setdefault(row["category"], [0.0, 0])
+            total[0] += row["completion_rate"]
+            total[1] += 1
+    return {"seconds": time.perf_counter() - started}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="코호트 집계의 작업 프로세스 수별 처리 시간")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--items", type=int, default=2, help="카테고리당 항목 수")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--chunk-users", type=int, default=cohort.CHUNK_USERS // 4)
+    parser.add_argument("--format", choices=progress_bits.FORMATS, default="rows")
+    parser.add_argument("--shards", type=int, default=None)
+    args = parser.parse_args()
+
+    spec = DatasetSpec(users=args.users, years=args.years, categories=args.categories,
+                       items_per_category=args.items, reflection_ratio=0.0, notifications_per_user=0)
+    end = date.fromisoformat(spec.end_date)
+    rows = []
+    with temp_database(shards=args.shards):
+        started = time.perf_counter()
+        generate_dataset(spec, "")
+        if args.format == "bits":
+            progress_bits.convert("bits")
+        progress_bits.set_progress_format(args.format)
+        print(f"데이터 생성: {time.perf_counter() - started:.1f}초")
+        read_cache.configure(maxsize=0)
+
+        loop = per_user_loop(spec.users, (end - timedelta(days=spec.days - 1)).isoformat(), spec.end_date)
+        rows.append({"run": "per-user loop", "workers": 1, "seconds": loop["seconds"], "rows": "-",
+                     "speedup": 1.0, "efficiency": "-"})
+        baseline = None
+        for workers in args.workers:
+            result = cohort.refresh(full=True, workers=workers, chunk_users=args.chunk_users)
+            baseline = baseline or result["seconds"]
+            speedup = baseline / result["seconds"]
+            rows.append({"run": "full refresh", "workers": workers, "seconds": result["seconds"],
+                         "rows": result["rows"], "speedup": speedup, "efficiency": f"{speedup / workers:.2f}"})
+
+        # 다음 날 하루치가 저장된 뒤의 증분 집계
+        next_day = (end + timedelta(days=1)).isoformat()
+        progress: Dict[str, Dict[str, bool]] = {}
+        for category, item in checklist(spec):
+            progress.setdefault(category, {})[item] = True
+        for n in range(0, spec.users, 10):
+            database.save_daily_progress(username(n), next_day, progress)
+        result = cohort.refresh(workers=max(args.workers), chunk_users=args.chunk_users)
+        rows.append({"run": "incremental", "workers": max(args.workers), "seconds": result["seconds"],
+                     "rows": result["rows"], "speedup": "-", "efficiency": "-"})
+
+        started = time.perf_counter()
+        cohort.report(weeks=8)
+        rows.append({"run": "report (8 weeks)", "workers": 1, "seconds": time.perf_counter() - started,
+                     "rows": "-", "speedup": "-", "efficiency": "-"})
+        progress_bits.set_progress_format("rows")
+    print_table(rows)
+    print(f"\nCPU {multiprocessing.cpu_count()}개 (작업 프로세스 수가 CPU 수를 넘으면 속도가 더 오르지 않는다)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# python -m benchmarks.<name> 으로 실행할 때 저장소 루트의 모듈을 찾을 수 있게 한다.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import connection
+from cache import read_cache
+from migrations import migrate
+
+@contextmanager
+def temp_database(name: str = "bench.db", shards: Optional[int] = None) -> Iterator[str]:
+    """Point the shared pool at a fresh, migrated database in a temp directory."""
+    directory = tempfile.mkdtemp(prefix="wellness-bench-")
+    path = os.path.join(directory, name)
+    previous, previous_shards = connection.DB_NAME, connection.SHARD_COUNT
+    connection.configure(path, shards=shards)
+    read_cache.clear()
+    try:
+        migrate()
+        yield path
+    finally:
+        connection.configure(previous, shards=previous_shards)
+        read_cache.clear()
+        shutil.rmtree(directory, ignore_errors=True)
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles (milliseconds) for one measured run."""
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "ops_per_sec": len(values) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+    }
+
+def print_table(rows: List[Dict[str, object]]) -> None:
+    if not rows:
+        return
+    columns = list(rows[0])
+    cells = [[f"{row[column]:.2f}" if isinstance(row[column], float) else str(row[column]) for column in columns]
+             for row in rows]
+    widths = [max(len(column), *(len(cell[i]) for cell in cells)) for i, column in enumerate(columns)]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for cell in cells:
+        print("  ".join(value.rjust(width) for value, width in zip(cell, widths)))
@@ -0,0 +1,111 @@
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from connection import data_pools, get_pool, transaction
+from progress_bits import intern_items
+from reflection_search import owner_token
+from rollup import rebuild_rollup
+
+WORDS = ["산책", "물", "독서", "명상", "스트레칭", "일찍", "잠", "채소", "계단", "가족", "전화", "감사", "일기", "햇빛"]
+NOTIFICATION_TIMES = ["07:00", "08:30", "12:00", "18:30", "21:00", "22:30"]
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    users: int = 20
+    years: int = 1
+    categories: int = 5
+    items_per_category: int = 4
+    reflection_ratio: float = 0.5
+    notifications_per_user: int = 3
+    end_date: str = "2024-12-31"
+    seed: int = 42
+
+    @property
+    def days(self) -> int:
+        return self.years * 365
+
+# 크기별 기본 데이터셋
+PRESETS: Dict[str, DatasetSpec] = {
+    "small": DatasetSpec(users=20, years=1),
+    "medium": DatasetSpec(users=50, years=3),
+    "large": DatasetSpec(users=20, years=10, categories=10),
+}
+
+def username(n: int) -> str:
+    return f"bench{n:05d}"
+
+def checklist(spec: DatasetSpec) -> List[Tuple[str, str]]:
+    return [(f"카테고리{c}", f"항목{c}-{i}")
+            for c in range(spec.categories) for i in range(spec.items_per_category)]
+
+def dates(spec: DatasetSpec) -> List[str]:
+    end = date.fromisoformat(spec.end_date)
+    return [(end - timedelta(days=offset)).isoformat() for offset in range(spec.days - 1, -1, -1)]
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+
+def _user_rows(spec: DatasetSpec, n: int, items: List[Tuple[str, str]],
+               days: List[str]) -> Iterator[Tuple[str, tuple]]:
+    # 사용자마다 시드를 따로 두어 사용자 수를 바꿔도 같은 사용자는 같은 데이터를 받는다.
+    rng = random.Random(f"{spec.seed}:{n}")
+    name = username(n)
+    token = owner_token(name)
+    for position, (category, item) in enumerate(items, 1):
+        yield "checklist", (name, category, item, position)
+    chances = [rng.uniform(0.3, 0.95) for _ in items]
+    for day in days:
+        for (category, item), chance in zip(items, chances):
+            yield "progress", (name, day, category, item, int(rng.random() < chance))
+        if rng.random() < spec.reflection_ratio:
+            yield "reflection", (name, day, _sentence(rng), _sentence(rng), _sentence(rng), token)
+    for category, item in rng.sample(items, min(spec.notifications_per_user, len(items))):
+        yield "notification", (name, item, rng.choice(NOTIFICATION_TIMES))
+
+_INSERT_SQL = {
+    "checklist": "INSERT INTO checklist_overrides (username, item_id, hidden, position) VALUES (?, ?, 0, ?)",
+    "progress": "INSERT INTO daily_progress (username, date, category, item, completed) VALUES (?, ?, ?, ?, ?)",
+    "reflection": """INSERT INTO reflections (username, date, achievements, improvements, tomorrow_goals, owner_token)
+                     VALUES (?, ?, ?, ?, ?, ?)""",
+    "notification": "INSERT INTO notifications (username, item, time) VALUES (?, ?, ?)",
+}
+
+def generate_dataset(spec: DatasetSpec, password_hash: str, batch_size: int = 20000) -> Dict[str, int]:
+    """Fill the configured database with ``spec`` and return the row count per table.
+
+    The same spec always produces the same rows. ``password_hash`` is stored for
+    every user so the generator does not spend minutes in bcrypt.
+    """
+    items = checklist(spec)
+    days = dates(spec)
+    counts = {table: 0 for table in _INSERT_SQL}
+    batches: Dict[str, List[tuple]] = {table: [] for table in _INSERT_SQL}
+
+    def flush(conn, table: str) -> None:
+        conn.executemany(_INSERT_SQL[table], batches[table])
+        counts[table] += len(batches[table])
+        batches[table].clear()
+
+    with transaction() as conn:
+        conn.executemany("INSERT INTO users (username, password) VALUES (?, ?)",
+                         ((username(n), password_hash) for n in range(spec.users)))
+    # 샤드를 쓰면 샤드마다 자기 사용자의 행만 넣는다.
+    for pool in data_pools():
+        with pool.transaction() as conn:
+            item_ids = intern_items(conn, pool.db_name, items).bits
+            for n in range(spec.users):
+                if get_pool(username(n)) is not pool:
+                    continue
+                for table, row in _user_rows(spec, n, items, days):
+                    if table == "checklist":
+                        row = (row[0], item_ids[row[1:3]], row[3])
+                    batches[table].append(row)
+                    if len(batches[table]) >= batch_size:
+                        flush(conn, table)
+            for table in _INSERT_SQL:
+                flush(conn, table)
+    rebuild_rollup()
+    counts["users"] = spec.users
+    return counts
@@ -0,0 +1,50 @@
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.common import print_table, summarize, temp_database
+from benchmarks.datagen import DatasetSpec, dates, generate_dataset, username
+
+import database
+import metrics
+from cache import read_cache
+
+def run(calls: int, fn: Callable[..., Any], args: Callable[[int], tuple]) -> Dict[str, float]:
+    latencies: List[float] = []
+    for i in range(calls):
+        call_args = args(i)
+        t0 = time.perf_counter()
+        fn(*call_args)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, sum(latencies))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="계측을 켰을 때와 껐을 때의 호출 비용 비교")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--years", type=int, default=1)
+    args = parser.parse_args()
+
+    spec = DatasetSpec(users=args.users, years=args.years)
+    days = dates(spec)
+    workloads = {
+        "get_daily_progress": lambda i: (username(i % spec.users), days[i % len(days)]),
+        "get_progress_history": lambda i: (username(i % spec.users), days[max(0, i % len(days) - 6)],
+                                           days[i % len(days)]),
+    }
+    rows = []
+    with temp_database():
+        generate_dataset(spec, "")
+        # 캐시 적중이 섞이면 차이가 묻히므로 매번 SQLite까지 간다.
+        read_cache.configure(maxsize=0)
+        for name, call_args in workloads.items():
+            fn = getattr(database, name)
+            rows.append({"op": name, "mode": "undecorated", **run(args.calls, fn.__wrapped__, call_args)})
+            rows.append({"op": name, "mode": "off", **run(args.calls, fn, call_args)})
+            metrics.enable_metrics(slow_query_ms=float("inf"))
+            rows.append({"op": name, "mode": "on", **run(args.calls, fn, call_args)})
+            metrics.disable_metrics()
+    print_table(rows)
+
+if __name__ == "__main__":
+    main()
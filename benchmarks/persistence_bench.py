@@ -0,0 +1,217 @@
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from benchmarks.common import print_table, summarize, temp_database
+from benchmarks.datagen import PRESETS, WORDS, DatasetSpec, checklist, dates, generate_dataset, username
+
+import auth
+import database
+from cache import read_cache
+
+PASSWORD = "password"
+NEW_PASSWORD = "new-password"
+DEFAULT_THRESHOLD = 0.2
+# 이보다 작은 지연 시간 차이는 측정 잡음으로 보고 회귀로 치지 않는다.
+NOISE_FLOOR_MS = 0.1
+
+class Operation(NamedTuple):
+    name: str
+    fn: Callable[..., Any]
+    args: Callable[[int], tuple]
+    ops: int
+
+def measure(operation: Operation) -> Dict[str, float]:
+    """Time ``operation.ops`` calls, then trace one more call for its peak allocation."""
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for i in range(operation.ops):
+        args = operation.args(i)
+        t0 = time.perf_counter()
+        operation.fn(*args)
+        latencies.append(time.perf_counter() - t0)
+    result = summarize(latencies, time.perf_counter() - started)
+    # tracemalloc은 호출을 크게 느리게 하므로 시간 측정과 따로 한 번만 돈다.
+    args = operation.args(operation.ops)
+    tracemalloc.start()
+    try:
+        operation.fn(*args)
+        result["peak_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+    return result
+
+def operations(spec: DatasetSpec, ops: int, heavy_ops: int, auth_ops: int) -> List[Operation]:
+    rng = random.Random(spec.seed)
+    items = checklist(spec)
+    days = dates(spec)
+    users = [rng.randrange(spec.users) for _ in range(ops + 1)]
+    picked_days = [rng.randrange(len(days)) for _ in range(ops + 1)]
+    progress = [{category: {} for category, _ in items} for _ in range(ops + 1)]
+    for day_progress in progress:
+        for category, item in items:
+            day_progress[category][item] = rng.random() < 0.7
+    exported = database.export_user_data(username(0))
+
+    def user(i: int) -> str:
+        return username(users[i % len(users)])
+
+    def day(i: int) -> str:
+        return days[picked_days[i % len(picked_days)]]
+
+    def month(i: int) -> tuple:
+        start = max(0, picked_days[i % len(picked_days)] - 29)
+        return user(i), days[start], day(i)
+
+    def roundtrip(i: int) -> None:
+        database.import_user_data(f"import{i:05d}", database.export_user_data(user(i)))
+
+    # 삭제는 데이터가 있는 사용자를 뒤에서부터 지운다. 앞쪽 사용자는 다른 측정에서 쓴다.
+    deletable = max(0, min(heavy_ops, spec.users // 2 - 1))
+    stored_hash = auth.hash_password(PASSWORD)
+
+    return [
+        Operation("get_checklist_items", database.get_checklist_items, lambda i: (user(i),), ops),
+        Operation("get_user_checklist", database.get_user_checklist, lambda i: (user(i),), ops),
+        Operation("add_checklist_item", database.add_checklist_item, lambda i: (user(0), "벤치", f"추가{i}"), ops),
+        Operation("remove_checklist_item", database.remove_checklist_item,
+                  lambda i: (user(0), "벤치", f"추가{i}"), ops),
+        Operation("save_daily_progress", database.save_daily_progress,
+                  lambda i: (user(i), day(i), progress[i % len(progress)]), ops),
+        Operation("get_daily_progress", database.get_daily_progress, lambda i: (user(i), day(i)), ops),
+        Operation("get_progress_history", database.get_progress_history, month, ops),
+        Operation("save_reflection", database.save_reflection,
+                  lambda i: (user(i), day(i), "성취", "개선점", "내일 목표"), ops),
+        Operation("get_recent_reflection", database.get_recent_reflection, lambda i: (user(i),), ops),
+        Operation("search_reflections", database.search_reflections,
+                  lambda i: (user(i), WORDS[i % len(WORDS)]), ops),
+        Operation("save_notification", database.save_notification, lambda i: (user(0), f"알림{i}", "09:00"), ops),
+        Operation("get_notifications", database.get_notifications, lambda i: (user(i),), ops),
+        Operation("remove_notification", database.remove_notification, lambda i: (user(0), f"알림{i}"), ops),
+        Operation("export_user_data", database.export_user_data, lambda i: (user(i),), heavy_ops),
+        Operation("import_user_data", database.import_user_data,
+                  lambda i: (f"copy{i:05d}", exported), heavy_ops),
+        Operation("export_import_roundtrip", roundtrip, lambda i: (i,), heavy_ops),
+        Operation("hash_password", auth.hash_password, lambda i: (PASSWORD,), auth_ops),
+        Operation("verify_password", auth.verify_password, lambda i: (stored_hash, PASSWORD), auth_ops),
+        Operation("register_user", auth.register_user, lambda i: (f"new{i:05d}", PASSWORD), auth_ops),
+        Operation("authenticate_user", auth.authenticate_user, lambda i: (user(i), PASSWORD), auth_ops),
+        Operation("change_password", auth.change_password,
+                  lambda i: (f"new{i:05d}", PASSWORD, NEW_PASSWORD), auth_ops),
+        Operation("delete_user", auth.delete_user,
+                  lambda i: (username(spec.users - 1 - i), PASSWORD), deletable),
+    ]
+
+def run_size(size: str, spec: DatasetSpec, ops: int, heavy_ops: int, auth_ops: int) -> Dict[str, Any]:
+    with temp_database():
+        started = time.perf_counter()
+        rows = generate_dataset(spec, auth.hash_password(PASSWORD))
+        print(f"[{size}] 데이터 생성 {time.perf_counter() - started:.1f}초: {rows}", file=sys.stderr)
+        results = {}
+        for operation in operations(spec, ops, heavy_ops, auth_ops):
+            if operation.ops > 0:
+                results[operation.name] = measure(operation)
+    return {"spec": asdict(spec), "rows": rows, "results": results}
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, object]]:
+    """Compare every (size, operation) present in both runs and mark regressions beyond ``threshold``."""
+    rows = []
+    for size, run in current["sizes"].items():
+        base_run = baseline["sizes"].get(size)
+        if base_run is None:
+            continue
+        for name, result in run["results"].items():
+            base = base_run["results"].get(name)
+            if base is None:
+                continue
+            reasons = []
+            mean_ms, base_mean_ms = (1000 / max(r["ops_per_sec"], 1e-9) for r in (result, base))
+            if (result["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold)
+                    and mean_ms - base_mean_ms > NOISE_FLOOR_MS):
+                reasons.append("ops/sec")
+            if (result["p95_ms"] > base["p95_ms"] * (1 + threshold)
+                    and result["p95_ms"] - base["p95_ms"] > NOISE_FLOOR_MS):
+                reasons.append("p95")
+            if result["peak_kib"] > base["peak_kib"] * (1 + threshold) and result["peak_kib"] - base["peak_kib"] > 64:
+                reasons.append("memory")
+            rows.append({
+                "size": size,
+                "op": name,
+                "ops_per_sec": result["ops_per_sec"],
+                "base_ops_per_sec": base["ops_per_sec"],
+                "p95_ms": result["p95_ms"],
+                "base_p95_ms": base["p95_ms"],
+                "peak_kib": result["peak_kib"],
+                "base_peak_kib": base["peak_kib"],
+                "status": "REGRESSION(" + ",".join(reasons) + ")" if reasons else "ok",
+            })
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="database.py / auth.py 성능 벤치마크")
+    parser.add_argument("--sizes", nargs="+", choices=sorted(PRESETS), default=["small", "medium"])
+    parser.add_argument("--users", type=int, help="프리셋의 사용자 수 대신 사용")
+    parser.add_argument("--years", type=int, help="프리셋의 기간(년) 대신 사용")
+    parser.add_argument("--categories", type=int, help="프리셋의 카테고리 수 대신 사용")
+    parser.add_argument("--items", type=int, help="프리셋의 카테고리당 항목 수 대신 사용")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ops", type=int, default=200, help="가벼운 함수의 호출 횟수")
+    parser.add_argument("--heavy-ops", type=int, default=5, help="내보내기/가져오기/삭제 호출 횟수")
+    parser.add_argument("--auth-ops", type=int, default=20, help="bcrypt를 쓰는 함수의 호출 횟수")
+    parser.add_argument("--rounds", type=int, default=8, help="bcrypt 비용 인자")
+    parser.add_argument("--cache", action="store_true", help="읽기 캐시를 켠 채로 측정")
+    parser.add_argument("--save", help="결과를 JSON 기준선으로 저장할 경로")
+    parser.add_argument("--compare", help="비교할 기준선 JSON 경로")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="회귀로 볼 변화 비율")
+    args = parser.parse_args(argv)
+
+    overrides = {key: value for key, value in (("users", args.users), ("years", args.years),
+                                               ("categories", args.categories),
+                                               ("items_per_category", args.items))
+                 if value is not None}
+    auth.configure_hasher(rounds=args.rounds)
+    if not args.cache:
+        read_cache.configure(maxsize=0)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "bcrypt_rounds": args.rounds,
+            "cache": args.cache,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "sizes": {},
+    }
+    rows = []
+    for size in args.sizes:
+        spec = DatasetSpec(**{**asdict(PRESETS[size]), **overrides, "seed": args.seed})
+        run = run_size(size, spec, args.ops, args.heavy_ops, args.auth_ops)
+        report["sizes"][size] = run
+        rows.extend({"size": size, "op": name, **result} for name, result in run["results"].items())
+    print_table(rows)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison = compare(report, baseline, args.threshold)
+        print()
+        print_table(comparison)
+        regressions = [row for row in comparison if row["status"] != "ok"]
+        print(f"\n회귀 {len(regressions)}건 (기준 ±{args.threshold:.0%})")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
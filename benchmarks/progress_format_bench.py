@@ -0,0 +1,110 @@
+import argparse
+import os
+import random
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import print_table, summarize, temp_database
+from benchmarks.datagen import DatasetSpec, checklist, dates, generate_dataset, username
+
+import analytics
+import database
+import progress_bits
+from cache import read_cache
+from connection import connect
+
+# 형식별로 진행 기록이 차지하는 테이블과 인덱스
+TABLES = {
+    "rows": ("daily_progress", "idx_daily_progress_key", "daily_category_rollup"),
+    "bits": ("daily_progress_bits", "progress_items", "sqlite_autoindex_progress_items_1"),
+}
+
+def table_bytes(names: tuple) -> Optional[int]:
+    """Bytes used by ``names`` according to dbstat, or None when SQLite was built without it."""
+    with connect() as conn:
+        try:
+            placeholders = ", ".join("?" * len(names))
+            return conn.execute(f"SELECT SUM(pgsize) FROM dbstat WHERE name IN ({placeholders})", names).fetchone()[0]
+        except sqlite3.OperationalError:
+            return None
+
+def vacuum(path: str) -> int:
+    with connect() as conn:
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(path)
+
+def run(calls: int, fn: Callable[..., Any], args: Callable[[int], tuple]) -> Dict[str, float]:
+    latencies: List[float] = []
+    for i in range(calls):
+        call_args = args(i)
+        t0 = time.perf_counter()
+        fn(*call_args)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, sum(latencies))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="일일 진행 기록의 행 형식과 비트마스크 형식 비교")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--items", type=int, default=4, help="카테고리당 항목 수")
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--heavy-calls", type=int, default=20, help="분석 프레임·내보내기 호출 횟수")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    spec = DatasetSpec(users=args.users, years=args.years, categories=args.categories,
+                       items_per_category=args.items, reflection_ratio=0.0, notifications_per_user=0,
+                       seed=args.seed)
+    rng = random.Random(args.seed)
+    days = dates(spec)
+    items = checklist(spec)
+    users = [username(rng.randrange(spec.users)) for _ in range(args.calls)]
+    picked = [rng.randrange(30, len(days)) for _ in range(args.calls)]
+    # 두 번째 형식에서는 값을 뒤집어 저장해서 두 형식 모두 실제로 바뀌는 쓰기를 잰다.
+    progress: Dict[str, List[Dict[str, Dict[str, bool]]]] = {fmt: [] for fmt in progress_bits.FORMATS}
+    for _ in range(args.calls):
+        values = [rng.random() < 0.7 for _ in items]
+        for flip, fmt in enumerate(progress_bits.FORMATS):
+            day: Dict[str, Dict[str, bool]] = {}
+            for (category, item), value in zip(items, values):
+                day.setdefault(category, {})[item] = value != bool(flip)
+            progress[fmt].append(day)
+    current = {"format": "rows"}
+    workloads = [
+        ("get_daily_progress", database.get_daily_progress, lambda i: (users[i], days[picked[i]]), args.calls),
+        ("get_progress_history_30d", database.get_progress_history,
+         lambda i: (users[i], days[picked[i] - 29], days[picked[i]]), args.calls),
+        ("save_daily_progress", database.save_daily_progress,
+         lambda i: (users[i], days[picked[i]], progress[current["format"]][i]), args.calls),
+        ("load_progress_frame_1y", analytics.load_progress_frame,
+         lambda i: (users[i], days[max(0, picked[i] - 364)], days[picked[i]]), args.heavy_calls),
+        ("export_user_data", database.export_user_data, lambda i: (users[i],), args.heavy_calls),
+    ]
+
+    sizes = []
+    rows = []
+    with temp_database() as path:
+        generate_dataset(spec, "")
+        read_cache.configure(maxsize=0)
+        for fmt in progress_bits.FORMATS:
+            if fmt == "bits":
+                started = time.perf_counter()
+                moved = progress_bits.convert("bits")
+                print(f"변환: {moved['users']}명, {moved['rows']}개 항목, {time.perf_counter() - started:.1f}초")
+            progress_bits.set_progress_format(fmt)
+            current["format"] = fmt
+            file_bytes = vacuum(path)
+            sizes.append({"format": fmt, "progress_kib": (table_bytes(TABLES[fmt]) or 0) / 1024,
+                          "file_kib": file_bytes / 1024})
+            for name, fn, call_args, calls in workloads:
+                rows.append({"format": fmt, "op": name, **run(calls, fn, call_args)})
+        progress_bits.set_progress_format("rows")
+    print_table(sizes)
+    print()
+    print_table(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.common import print_table, summarize, temp_database
+from benchmarks.datagen import username
+
+import database
+from cache import read_cache
+from connection import connect, transaction
+from reflection_search import SEARCH_FIELDS, SEARCH_PAGE_SIZE
+
+SYLLABLES = "가나다라마바사아자차카타파하고노도로모보소오조초코토포호구누두루무부수우주추쿠투푸후기니디리미비시이지치키티피히"
+
+def vocabulary(rng: random.Random, size: int) -> List[str]:
+    words = {"".join(rng.choice(SYLLABLES) for _ in range(rng.choice((2, 2, 3, 3, 4)))) for _ in range(size * 2)}
+    return sorted(words)[:size]
+
+def build_corpus(users: int, days: int, words: List[str], seed: int) -> float:
+    """Insert one reflection per user and day; word frequencies follow Zipf's law like real text."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    end = date(2024, 12, 31)
+
+    def sentence() -> str:
+        return " ".join(rng.choices(words, weights, k=rng.randint(5, 25)))
+
+    started = time.perf_counter()
+    for n in range(users):
+        name = username(n)
+        rows = [((end - timedelta(days=offset)).isoformat(), sentence(), sentence(), sentence())
+                for offset in range(days)]
+        with transaction(name) as conn:
+            database.write_reflections(conn, name, rows)
+    return time.perf_counter() - started
+
+def like_search(user: str, terms: List[str], limit: Optional[int]) -> int:
+    """The baseline: every term with LIKE '%term%' over the user's rows, newest first."""
+    where = " AND ".join("(" + " OR ".join(f"{field} LIKE ?" for field in SEARCH_FIELDS) + ")" for _ in terms)
+    sql = f"SELECT date FROM reflections WHERE username = ? AND {where} ORDER BY date DESC"
+    params: list = [user] + [f"%{term}%" for term in terms for _ in SEARCH_FIELDS]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with connect(user) as conn:
+        return len(conn.execute(sql, params).fetchall())
+
+def fts_search(user: str, query: str, all_pages: bool) -> int:
+    hits, cursor = 0, None
+    while True:
+        page = database.search_reflections(user, query, SEARCH_PAGE_SIZE, cursor)
+        hits += len(page.hits)
+        if not all_pages or page.next_cursor is None:
+            return hits
+        cursor = page.next_cursor
+
+def measure(calls: int, fn: Callable[[int], int]) -> Dict[str, float]:
+    latencies = []
+    hits = 0
+    for i in range(calls):
+        t0 = time.perf_counter()
+        hits += fn(i)
+        latencies.append(time.perf_counter() - t0)
+    result = summarize(latencies, sum(latencies))
+    del result["count"], result["ops_per_sec"]
+    return {**result, "hits_per_call": hits / calls}
+
+def index_bytes() -> Dict[str, float]:
+    with connect() as conn:
+        try:
+            rows = dict(conn.execute("""SELECT CASE WHEN name LIKE 'reflections_fts%' THEN 'fts' ELSE 'text' END,
+                                               SUM(pgsize) FROM dbstat
+                                        WHERE name LIKE 'reflections%' OR name = 'idx_reflections_key'
+                                        GROUP BY 1""").fetchall())
+        except sqlite3.OperationalError:
+            return {}
+    return {"reflections_mib": rows.get("text", 0) / 2 ** 20, "fts_index_mib": rows.get("fts", 0) / 2 ** 20}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="성찰 검색: trigram 전문 색인과 LIKE 비교")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = vocabulary(rng, args.vocabulary)
+    # Zipf 순위별로 자주·가끔·드물게 나오는 단어를 고른다. 두 글자 단어는 색인 대신 LIKE로 찾는다.
+    long_words = [(rank, word) for rank, word in enumerate(words) if len(word) >= 3]
+    short_words = [word for word in words if len(word) < 3]
+    queries = {
+        "common": [word for rank, word in long_words if rank < 20],
+        "medium": [word for rank, word in long_words if 200 <= rank < 400],
+        "rare": [word for rank, word in long_words if rank >= 3000],
+        "two_terms": [f"{a} {b}" for (_, a), (_, b) in zip(long_words[:20], long_words[20:40])],
+        "short(2자)": short_words[:20],
+    }
+    rows = []
+    with temp_database():
+        seconds = build_corpus(args.users, args.years * 365, words, args.seed)
+        documents = args.users * args.years * 365
+        print(f"성찰 {documents}개 저장(트리거로 색인 포함): {seconds:.1f}초, {documents / seconds:.0f}개/초")
+        sizes = index_bytes()
+        if sizes:
+            print(", ".join(f"{key}={value:.1f}" for key, value in sizes.items()))
+        read_cache.configure(maxsize=0)
+        for kind, terms in queries.items():
+            pick = [(username(rng.randrange(args.users)), rng.choice(terms)) for _ in range(args.calls)]
+            methods = {
+                "LIKE first page": lambda i: like_search(pick[i][0], pick[i][1].split(), SEARCH_PAGE_SIZE),
+                "FTS first page": lambda i: fts_search(pick[i][0], pick[i][1], False),
+                "LIKE all": lambda i: like_search(pick[i][0], pick[i][1].split(), None),
+                "FTS all pages": lambda i: fts_search(pick[i][0], pick[i][1], True),
+            }
+            for method, fn in methods.items():
+                rows.append({"query": kind, "method": method, **measure(args.calls, fn)})
+    print_table(rows)
+
+if __name__ == "__main__":
+    main()
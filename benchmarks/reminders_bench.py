@@ -0,0 +1,125 @@
+import argparse
+import random
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from benchmarks.common import print_table, summarize, temp_database
+
+import reminders
+from connection import connect, transaction
+
+FIRST_HOUR = 6
+LAST_HOUR = 22
+
+def insert_reminders(count: int, users: int, burst: int, seed: int) -> Dict[str, int]:
+    """Insert ``count`` reminders between 06:00 and 22:59 plus ``burst`` more at exactly 06:00.
+
+    Returns how many reminders fall on each time.
+    """
+    rng = random.Random(seed)
+    per_time: Dict[str, int] = {}
+    rows = []
+    for n in range(count):
+        time_of_day = f"{rng.randint(FIRST_HOUR, LAST_HOUR):02d}:{rng.randrange(60):02d}"
+        per_time[time_of_day] = per_time.get(time_of_day, 0) + 1
+        rows.append((f"user{n % users:06d}", f"항목{n // users}", time_of_day))
+    burst_time = f"{FIRST_HOUR:02d}:00"
+    per_time[burst_time] = per_time.get(burst_time, 0) + burst
+    rows.extend((f"user{n % users:06d}", f"아침 알림{n // users}", burst_time) for n in range(burst))
+    with transaction() as conn:
+        conn.executemany("INSERT INTO notifications (username, item, time) VALUES (?, ?, ?)", rows)
+    return per_time
+
+def offset_clock(target: datetime) -> Callable[[], float]:
+    """A clock that reads ``target`` now and then advances in real time."""
+    offset = target.timestamp() - time.time()
+    return lambda: time.time() + offset
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="알림 스케줄러 벤치마크")
+    parser.add_argument("--reminders", type=int, default=300000)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--burst", type=int, default=50000, help="06:00에 한꺼번에 울릴 추가 알림 수")
+    parser.add_argument("--updates", type=int, default=10000, help="추가/삭제를 각각 몇 번 할지")
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows: List[Dict[str, object]] = []
+    with temp_database():
+        per_time = insert_reminders(args.reminders, args.users, args.burst, args.seed)
+
+        # 알림이 없는 새벽 시각에 시작해 다음 알림까지 몇 시간 동안 잠들어 있게 한다.
+        quiet = today + timedelta(hours=3)
+        scheduler = reminders.ReminderScheduler(lambda reminder: None, clock=offset_clock(quiet))
+        started = time.perf_counter()
+        scheduled = scheduler.load()
+        load_seconds = time.perf_counter() - started
+        tracemalloc.start()
+        reminders.ReminderScheduler(lambda reminder: None, clock=offset_clock(quiet)).load()
+        load_peak_mib = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        rows.append({"phase": "load", "reminders": scheduled, "seconds": load_seconds, "peak_mib": load_peak_mib})
+
+        with connect() as conn:
+            started = time.perf_counter()
+            conn.execute("SELECT username, item FROM notifications WHERE time = ?", ("12:00",)).fetchall()
+            indexed_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            conn.execute("SELECT username, item, time FROM notifications").fetchall()
+            scan_ms = (time.perf_counter() - started) * 1000
+        print(f"분당 폴링 비용: 시각 인덱스 조회 {indexed_ms:.2f}ms, 전체 스캔 {scan_ms:.2f}ms")
+
+        scheduler.start()
+        wakeups = scheduler.stats()["wakeups"]
+        cpu = time.process_time()
+        time.sleep(args.idle_seconds)
+        idle_cpu = time.process_time() - cpu
+        rows.append({"phase": "idle", "reminders": scheduled, "seconds": args.idle_seconds,
+                     "cpu_seconds": idle_cpu, "wakeups": scheduler.stats()["wakeups"] - wakeups})
+
+        for phase, apply in (("add", scheduler.add), ("remove", lambda u, i, t: scheduler.remove(u, i))):
+            latencies = []
+            started = time.perf_counter()
+            for n in range(args.updates):
+                t0 = time.perf_counter()
+                apply(f"bench{n:06d}", "추가 항목", "12:00")
+                latencies.append(time.perf_counter() - t0)
+            rows.append({"phase": phase, **summarize(latencies, time.perf_counter() - started)})
+        scheduler.stop()
+
+        # 06:00 2초 전부터 돌려 같은 분에 몰린 알림을 한꺼번에 보낸다.
+        expected = per_time[f"{FIRST_HOUR:02d}:00"]
+        delivered = 0
+        done = threading.Event()
+        lock = threading.Lock()
+
+        def sink(reminder: reminders.Reminder) -> None:
+            nonlocal delivered
+            with lock:
+                delivered += 1
+                if delivered >= expected:
+                    done.set()
+
+        start_at = today + timedelta(hours=FIRST_HOUR) - timedelta(seconds=2)
+        burst = reminders.ReminderScheduler(sink, clock=lambda: start_at.timestamp())
+        burst.load()
+        # 적재가 끝난 뒤부터 시계가 흐르게 해서 적재 시간이 대기 시간에 섞이지 않게 한다.
+        burst.clock = offset_clock(start_at)
+        wait_started = time.perf_counter()
+        burst.start()
+        done.wait(timeout=60)
+        dispatch_seconds = time.perf_counter() - wait_started - 2
+        burst.stop()
+        rows.append({"phase": "burst", "reminders": delivered, "seconds": dispatch_seconds,
+                     "per_second": delivered / dispatch_seconds if dispatch_seconds > 0 else 0.0})
+    for row in rows:
+        print_table([row])
+        print()
+
+if __name__ == "__main__":
+    main()
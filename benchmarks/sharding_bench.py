@@ -0,0 +1,62 @@
+import argparse
+import multiprocessing
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.common import print_table, summarize, temp_database
+from benchmarks.datagen import DatasetSpec, checklist, generate_dataset, username
+
+import connection
+import database
+from cache import read_cache
+
+def _worker(args: Tuple[str, int, int, int, int, List[Tuple[str, str]], multiprocessing.Barrier]) -> List[float]:
+    path, shards, worker, workers, ops, items, barrier = args
+    connection.configure(path, shards=shards)
+    read_cache.configure(maxsize=0)
+    progress = {}
+    for category, item in items:
+        progress.setdefault(category, {})[item] = worker % 2 == 0
+    # 워커마다 서로 다른 사용자에게 쓰므로 샤드가 다르면 잠금을 두고 다투지 않는다.
+    users = [username(n) for n in range(worker, worker + 64 * workers, workers)]
+    latencies = []
+    barrier.wait()
+    for i in range(ops):
+        t0 = time.perf_counter()
+        database.save_daily_progress(users[i % len(users)], f"2025-01-{i % 28 + 1:02d}", progress)
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+def run(shards: int, workers: int, ops: int, spec: DatasetSpec) -> Dict[str, float]:
+    with temp_database(shards=shards) as path:
+        generate_dataset(spec, "")
+        items = checklist(spec)
+        with multiprocessing.Manager() as manager:
+            barrier = manager.Barrier(workers + 1)
+            with multiprocessing.Pool(workers) as pool:
+                result = pool.map_async(_worker, [(path, shards, w, workers, ops, items, barrier)
+                                                  for w in range(workers)])
+                barrier.wait()
+                started = time.perf_counter()
+                latencies = [latency for worker in result.get() for latency in worker]
+                elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="샤드 수와 작업 프로세스 수에 따른 쓰기 처리량")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--ops", type=int, default=300, help="프로세스마다 저장할 횟수")
+    parser.add_argument("--users", type=int, default=1024)
+    args = parser.parse_args()
+
+    spec = DatasetSpec(users=args.users, years=0, categories=3, items_per_category=5)
+    rows = []
+    for shards in args.shards:
+        for workers in args.workers:
+            rows.append({"shards": shards, "workers": workers, **run(shards, workers, args.ops, spec)})
+    print_table(rows)
+    print(f"\nCPU {multiprocessing.cpu_count()}개")
+
+if __name__ == "__main__":
+    main()
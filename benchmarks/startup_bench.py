@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Any, Dict, List
+
+from benchmarks.common import print_table, temp_database
+from benchmarks.datagen import DatasetSpec, generate_dataset, username
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ("login", "main", "detailed_analysis")
+HEAVY_MODULES = ("pandas", "plotly.express")
+
+def child(app_path: str, db_path: str, page: str, reruns: int) -> Dict[str, Any]:
+    """Measure one cold process: importing the app, then its first and later renders of ``page``."""
+    from streamlit.testing.v1 import AppTest
+
+    import connection
+    connection.configure(db_path)
+
+    at = AppTest.from_file(app_path, default_timeout=120)
+    if page != "login":
+        at.session_state["username"] = username(0)
+    at.session_state["page"] = page
+    # 첫 실행에는 스크립트가 불러오는 모듈과 시작 작업이 모두 들어간다.
+    started = time.perf_counter()
+    at.run()
+    first_ms = (time.perf_counter() - started) * 1000
+    rerun_ms = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        rerun_ms.append((time.perf_counter() - started) * 1000)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return {
+        "first_render_ms": first_ms,
+        "rerun_ms": sorted(rerun_ms)[len(rerun_ms) // 2] if rerun_ms else 0.0,
+        "heavy_loaded": ",".join(name for name in HEAVY_MODULES if name in sys.modules) or "-",
+    }
+
+def import_time(app_path: str, db_path: str) -> float:
+    """Milliseconds to import the app module in a fresh interpreter (streamlit itself excluded)."""
+    code = (f"import sys, time; sys.path.insert(0, {ROOT!r}); import streamlit, connection; "
+            f"connection.configure({db_path!r}); import importlib.util as u; "
+            f"spec = u.spec_from_file_location('app_under_test', {app_path!r}); m = u.module_from_spec(spec); "
+            "t = time.perf_counter(); spec.loader.exec_module(m); print((time.perf_counter() - t) * 1000)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def measure(label: str, app_path: str, db_path: str, repeat: int, reruns: int) -> List[Dict[str, Any]]:
+    rows = []
+    imports = sorted(import_time(app_path, db_path) for _ in range(repeat))
+    rows.append({"app": label, "page": "(import)", "first_render_ms": imports[len(imports) // 2],
+                 "rerun_ms": 0.0, "heavy_loaded": "-"})
+    for page in PAGES:
+        results = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-m", "benchmarks.startup_bench", "--child", app_path, db_path,
+                                  page, str(reruns)], capture_output=True, text=True, check=True, cwd=ROOT)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        results.sort(key=lambda result: result["first_render_ms"])
+        median = results[len(results) // 2]
+        rows.append({"app": label, "page": page, "first_render_ms": median["first_render_ms"],
+                     "rerun_ms": median["rerun_ms"], "heavy_loaded": median["heavy_loaded"]})
+    return rows
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="app.py의 import 시간과 페이지별 첫 렌더링 시간")
+    parser.add_argument("--baseline", help="비교할 app.py의 git 리비전 (예: HEAD~1)")
+    parser.add_argument("--repeat", type=int, default=3, help="페이지마다 새 프로세스로 잴 횟수 (중앙값을 쓴다)")
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--child", nargs=4, metavar=("APP", "DB", "PAGE", "RERUNS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        app_path, db_path, page, reruns = args.child
+        print(json.dumps(child(app_path, db_path, page, int(reruns))))
+        return
+
+    apps = [("current", os.path.join(ROOT, "app.py"))]
+    with tempfile.TemporaryDirectory(prefix="wellness-app-") as directory:
+        if args.baseline:
+            source = subprocess.run(["git", "show", f"{args.baseline}:app.py"], capture_output=True,
+                                    check=True, cwd=ROOT).stdout
+            path = os.path.join(directory, "app.py")
+            with open(path, "wb") as f:
+                f.write(source)
+            apps.insert(0, (args.baseline, path))
+        with temp_database() as db_path:
+            # 메인 화면의 7일 차트와 분석 화면이 실제로 그려지도록 오늘까지의 기록을 만든다.
+            generate_dataset(DatasetSpec(users=2, years=1, end_date=date.today().isoformat()), "")
+            rows = []
+            for label, app_path in apps:
+                rows.extend(measure(label, app_path, db_path, args.repeat, args.reruns))
+    print_table(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple, TypeVar
+
+from connection import after_commit
+
+DEFAULT_MAXSIZE = 2048
+DEFAULT_TTL_SECONDS = 300.0
+
+F = TypeVar("F", bound=Callable[..., Any])
+CacheKey = Tuple[str, str, Tuple[Hashable, ...]]
+
+class ReadCache:
+    """LRU + TTL cache for per-user read results.
+
+    Entries are keyed by ``(namespace, username, args)``. Every invalidation
+    bumps the user's generation, and a load only stores its result if the
+    generation it started under is still current, so a read that raced with a
+    write can never put stale data back into the cache. Cached values are
+    shared between callers and must not be mutated.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL_SECONDS) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._by_user: Dict[str, Set[CacheKey]] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _drop(self, key: CacheKey) -> None:
+        del self._entries[key]
+        keys = self._by_user.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[1]]
+
+    def get_or_load(self, namespace: str, username: str, args: Tuple[Hashable, ...], load: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return load()
+        key = (namespace, username, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[1]
+                self._drop(key)
+                self._expirations += 1
+            self._misses += 1
+            generation = (self._epoch, self._generations.get(username, 0))
+
+        value = load()
+
+        with self._lock:
+            if (self._epoch, self._generations.get(username, 0)) == generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                self._by_user.setdefault(username, set()).add(key)
+                while len(self._entries) > self.maxsize:
+                    self._drop(next(iter(self._entries)))
+                    self._evictions += 1
+        return value
+
+    def invalidate(self, username: str, namespace: Optional[str] = None,
+                   match: Optional[Callable[[Tuple[Hashable, ...]], bool]] = None) -> int:
+        """Drop the user's entries, optionally only one namespace and only args for which ``match`` is true."""
+        with self._lock:
+            self._generations[username] = self._generations.get(username, 0) + 1
+            doomed = [
+                key for key in self._by_user.get(username, ())
+                if (namespace is None or key[0] == namespace) and (match is None or match(key[2]))
+            ]
+            for key in doomed:
+                self._drop(key)
+            self._invalidations += len(doomed)
+            return len(doomed)
+
+    def generation(self, username: str) -> Tuple[int, int]:
+        """Version of the user's cached data; changes whenever it may have been written."""
+        with self._lock:
+            return self._epoch, self._generations.get(username, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._by_user.clear()
+
+    def configure(self, maxsize: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        self.clear()
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+                "size": len(self._entries),
+            }
+
+read_cache = ReadCache()
+
+def cached(namespace: str) -> Callable[[F], F]:
+    """Cache a ``fn(username, *args)`` read in ``read_cache`` under ``namespace``.
+
+    Calls are bound to ``fn``'s signature with defaults applied, so the key is
+    always the full positional argument tuple after ``username`` however the
+    caller spelled it, and invalidation predicates can index it by position.
+    """
+    def decorator(fn: F) -> F:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args: Hashable, **kwargs: Hashable) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            username, *rest = bound.args
+            key = tuple(rest)
+            return read_cache.get_or_load(namespace, username, key, lambda: fn(username, *key))
+        wrapper.uncached = fn  # type: ignore[attr-defined]
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+def invalidate_after_commit(username: str, namespace: Optional[str] = None,
+                            match: Optional[Callable[[Tuple[Hashable, ...]], bool]] = None) -> None:
+    """Invalidate once the surrounding transaction commits, so readers cannot re-cache the old rows."""
+    after_commit(lambda: read_cache.invalidate(username, namespace, match))
+
+def get_cache_stats() -> Dict[str, int]:
+    return read_cache.stats()
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cache import read_cache
+from database import get_progress_history
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import plotly.graph_objects as go
+
+# 선 하나에 그리는 최대 점 수. 차트 폭이 1000픽셀 안팎이라 이보다 많으면 화면에서 구분되지 않는다.
+CHART_POINT_BUDGET = int(os.environ.get("WELLNESS_CHART_POINTS", "400"))
+FIGURE_CACHE_SIZE = 256
+TREND_COLUMNS = ("daily", "rolling_7d", "rolling_30d")
+
+# (종류, 사용자, 시작일, 종료일, 점 예산, 데이터 버전) -> (만료 시각, 그림). 버전이 바뀌면 옛 항목은 다시 쓰이지 않고 밀려난다.
+FigureKey = Tuple[str, str, Optional[str], str, int, Tuple[int, int]]
+_figures: "OrderedDict[FigureKey, Tuple[float, Optional[go.Figure]]]" = OrderedDict()
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of ``threshold`` points picked by Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept; the rest are split into equal buckets
+    and each keeps the point forming the largest triangle with the previously
+    kept point and the next bucket's mean, so peaks and dips survive where
+    plain averaging would flatten them.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.append(np.linspace(1, n - 1, threshold - 1).astype(np.int64), n)
+    # 다음 구간의 평균. 마지막 구간의 "다음"은 끝점 하나다.
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x, edges[:-1]) / counts
+    mean_y = np.add.reduceat(y, edges[:-1]) / counts
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - mean_x[bucket + 1]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (mean_y[bucket + 1] - ay))
+        previous = lo + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+def _line(name: str, days: np.ndarray, values: np.ndarray, budget: int) -> "go.Scatter":
+    import plotly.graph_objects as go
+    if len(values) > budget:
+        # 값이 없는 날(NaN)은 빼고 고른다. 수백 점으로 줄인 선에서 하루짜리 끊김은 보이지 않는다.
+        present = np.flatnonzero(~np.isnan(values))
+        keep = present[lttb(days[present].astype(np.int64), values[present], budget)]
+        days, values = days[keep], values[keep]
+    # 날짜는 시각 없는 문자열로, 값은 float32 이진 배열로 보내 JSON을 줄인다.
+    return go.Scatter(x=np.datetime_as_string(days, unit="D"), y=values.astype(np.float32),
+                      mode="lines", name=name)
+
+def _figure(traces: List["go.Scatter"], title: str, y_title: str, legend_title: str) -> "go.Figure":
+    import plotly.graph_objects as go
+    fig = go.Figure(traces)
+    fig.update_layout(title=title, xaxis_title="date", yaxis_title=y_title, legend_title=legend_title)
+    return fig
+
+def history_frame(history: List[Dict[str, object]]) -> "pd.DataFrame":
+    """``get_progress_history`` rows as a plotting frame: datetime64 dates, categorical categories, float32 rates."""
+    import pandas as pd
+    dates, categories, rates = zip(*((row["date"], row["category"], row["completion_rate"]) for row in history))
+    return pd.DataFrame({
+        "date": np.asarray(dates, dtype="datetime64[D]"),
+        "category": pd.Categorical(categories),
+        "completion_rate": np.asarray(rates, dtype=np.float32),
+    })
+
+def trend_frame(rates: "pd.DataFrame") -> "pd.DataFrame":
+    """``rolling_completion`` output as a plotting frame with float32 rate columns."""
+    return rates[list(TREND_COLUMNS)].astype(np.float32)
+
+def _progress_figure(username: str, start_date: str, end_date: str, budget: int) -> Optional["go.Figure"]:
+    history = get_progress_history(username, start_date, end_date)
+    if not history:
+        return None
+    frame = history_frame(history)
+    days = frame["date"].to_numpy().astype("datetime64[D]")
+    codes = frame["category"].cat.codes.to_numpy()
+    rates = frame["completion_rate"].to_numpy()
+    traces = [_line(category, days[codes == code], rates[codes == code], budget)
+              for code, category in enumerate(frame["category"].cat.categories)]
+    return _figure(traces, "카테고리별 진행 상황", "completion_rate", "category")
+
+def _trend_figure(username: str, start_date: Optional[str], end_date: str, budget: int) -> Optional["go.Figure"]:
+    from analytics import daily_totals, load_progress_frame, rolling_completion
+    frame = load_progress_frame(username, start_date, end_date)
+    if frame.empty:
+        return None
+    rates = trend_frame(rolling_completion(daily_totals(frame, end_date)))
+    days = rates.index.to_numpy().astype("datetime64[D]")
+    traces = [_line(column, days, rates[column].to_numpy(), budget) for column in TREND_COLUMNS]
+    return _figure(traces, "달성률 추이", "value", "variable")
+
+def _memoized(kind: str, username: str, start_date: Optional[str], end_date: str,
+              build: Callable[[str, Optional[str], str, int], Optional["go.Figure"]]) -> Optional["go.Figure"]:
+    global _hits, _misses
+    # 버전은 데이터를 읽기 전에 잡는다. 그리는 동안 저장이 끝나면 버전이 바뀌어 이 그림은 다시 쓰이지 않는다.
+    key: FigureKey = (kind, username, start_date, end_date, CHART_POINT_BUDGET, read_cache.generation(username))
+    with _lock:
+        entry = _figures.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                _figures.move_to_end(key)
+                _hits += 1
+                return entry[1]
+            del _figures[key]
+        _misses += 1
+    fig = build(username, start_date, end_date, CHART_POINT_BUDGET)
+    with _lock:
+        # 다른 프로세스(다른 서버 프로세스, 샤드 작업, 명령줄 가져오기)의 저장은 이 프로세스의 버전을 바꾸지 못한다.
+        # 그래서 읽기 캐시와 같은 TTL이 지나면 다시 그린다. 다시 그릴 때 쓰는 읽기도 그만큼만 오래된다.
+        _figures[key] = (time.monotonic() + read_cache.ttl, fig)
+        while len(_figures) > FIGURE_CACHE_SIZE:
+            _figures.popitem(last=False)
+    return fig
+
+def progress_figure(username: str, start_date: str, end_date: str) -> Optional["go.Figure"]:
+    """Completion rate per category and day, or None without data.
+
+    Figures are memoized per user, range and ``read_cache.generation`` for at
+    most ``read_cache.ttl`` seconds, so a rerun reuses the figure until a save
+    in this process invalidates the user's reads, and a save made by another
+    process shows up once the TTL runs out, as with the cached reads. Each
+    line is downsampled to ``CHART_POINT_BUDGET`` points. The returned figure
+    is shared and must not be mutated.
+    """
+    return _memoized("progress", username, start_date, end_date, _progress_figure)
+
+def trend_figure(username: str, start_date: Optional[str], end_date: str) -> Optional["go.Figure"]:
+    """Daily and rolling 7/30-day completion rates, memoized and downsampled like ``progress_figure``."""
+    return _memoized("trend", username, start_date, end_date, _trend_figure)
+
+def clear_figure_cache() -> None:
+    with _lock:
+        _figures.clear()
+
+def get_chart_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {"size": len(_figures), "hits": _hits, "misses": _misses, "point_budget": CHART_POINT_BUDGET}
@@ -0,0 +1,226 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from cache import read_cache
+from connection import after_commit, data_pools, get_pool
+from progress_bits import ChecklistDefinition, definition_for, intern_items
+
+DEFAULT_TEMPLATE = "기본"
+RESOLVED_CACHE_SIZE = 4096
+
+LATEST_TEMPLATE_SQL = "SELECT id, version FROM checklist_templates WHERE name = ? ORDER BY version DESC LIMIT 1"
+OVERRIDES_SQL = "SELECT item_id, hidden FROM checklist_overrides WHERE username = ? ORDER BY position"
+ADDED_ITEMS_SQL = "SELECT item_id FROM checklist_overrides WHERE username = ? AND hidden = 0 ORDER BY position"
+
+# 코드에서 이 목록을 바꾸면 init_db()가 기본 템플릿의 새 버전을 만든다.
+DEFAULT_CHECKLIST: Dict[str, List[str]] = {
+    "건강 관리": [
+        "아침 체조 또는 스트레칭 (10-15분)",
+        "30분 이상 중강도 운동 (걷기, 수영, 자전거 등)",
+        "8잔 이상의 물 섭취",
+        "균형 잡힌 식사 3회 (채소, 단백질, 전곡류 포함)",
+        "복용 약물 체크 및 섭취",
+        "혈압/혈당 측정 (해당 시)",
+        "충분한 수면 (7-8시간 목표)"
+    ],
+    "재정 관리": [
+        "일일 지출 기록",
+        "예산 대비 지출 확인",
+        "투자 포트폴리오 점검 (주 1회)",
+        "재정 목표 진행 상황 검토 (월 1회)"
+    ],
+    "관계 유지": [
+        "가족/친구와 연락 (전화, 문자, 이메일 등)",
+        "대면 만남 계획 또는 실행 (주 1-2회)",
+        "새로운 사회적 연결 모색 (동호회, 봉사활동 등)"
+    ],
+    "지속적 학습과 성장": [
+        "새로운 기술/지식 학습 (30분-1시간)",
+        "독서 (30분 이상)",
+        "온라인 강좌 또는 워크샵 참여 (주 1-2회)"
+    ],
+    "취미 및 여가 활동": [
+        "즐거운 취미 활동 (1시간 이상)",
+        "새로운 경험 계획 (월 1회 이상)",
+        "문화 활동 참여 (영화, 전시회 등, 월 1-2회)"
+    ],
+    "사회적 참여와 기여": [
+        "지역 사회 활동 또는 봉사 계획/참여 (주 1회 이상)",
+        "멘토링 또는 지식 공유 활동 (해당 시)"
+    ],
+    "정신적 웰빙": [
+        "명상 또는 마음 챙김 실천 (15-20분)",
+        "감사일기 작성",
+        "스트레스 관리 기법 실천 (심호흡, 점진적 근육 이완 등)"
+    ],
+    "긍정적 마인드셋": [
+        "하루 3가지 긍정적인 일 찾기",
+        "자기 긍정 확언 실천",
+        "개인 성장 목표 점검 및 조정"
+    ],
+    "일과 삶의 균형": [
+        "업무 시간과 개인 시간 구분 짓기",
+        "휴식과 회복 시간 확보",
+        "주간 일정 검토 및 조정"
+    ],
+    "주거 환경 관리": [
+        "간단한 집안 정리정돈 (15-20분)",
+        "환기 및 실내 공기질 관리",
+        "안전 점검 (화재경보기, 잠금장치 등, 월 1회)"
+    ]
+}
+
+class ChecklistEntry(NamedTuple):
+    item_id: int
+    category: str
+    item: str
+    widget_key: str
+
+class ResolvedChecklist(NamedTuple):
+    """A template with one user's overrides applied. Shared between users; do not mutate."""
+    template_id: int
+    template_version: int
+    categories: Tuple[Tuple[str, Tuple[ChecklistEntry, ...]], ...]
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        return {category: [entry.item for entry in entries] for category, entries in self.categories}
+
+# (파일, 템플릿 id) -> (버전, 항목 번호들). 발행된 템플릿은 바뀌지 않는다.
+_templates: Dict[Tuple[str, int], Tuple[int, Tuple[int, ...]]] = {}
+# (파일, 템플릿 id, 변경분 해시) -> 조립된 체크리스트. 변경분이 같은 사용자끼리 한 객체를 같이 쓴다.
+_resolved: "OrderedDict[Tuple[str, int, str], ResolvedChecklist]" = OrderedDict()
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+def _names(conn: sqlite3.Connection, key: str, item_ids: Iterable[int]) -> ChecklistDefinition:
+    current = definition_for(conn, key)
+    if max(item_ids, default=-1) >= len(current.items):
+        current = definition_for(conn, key, current.version + 1)
+    return current
+
+def latest_template(conn: sqlite3.Connection, name: str = DEFAULT_TEMPLATE) -> Optional[Tuple[int, int]]:
+    """``(id, version)`` of the newest version of ``name``, or None before it is published."""
+    return conn.execute(LATEST_TEMPLATE_SQL, (name,)).fetchone()
+
+def _template(conn: sqlite3.Connection, key: str, template_id: int) -> Tuple[int, Tuple[int, ...]]:
+    template = _templates.get((key, template_id))
+    if template is None:
+        version = conn.execute("SELECT version FROM checklist_templates WHERE id = ?", (template_id,)).fetchone()[0]
+        item_ids = tuple(row[0] for row in conn.execute(
+            "SELECT item_id FROM checklist_template_items WHERE template_id = ? ORDER BY position", (template_id,)))
+        template = _templates[(key, template_id)] = (version, item_ids)
+    return template
+
+def publish_template(conn: sqlite3.Connection, key: str, name: str, checklist: Dict[str, List[str]]) -> int:
+    """Store ``checklist`` as a new version of ``name`` unless the newest version is identical; returns its id."""
+    keys = [(category, item) for category, items in checklist.items() for item in items]
+    current = intern_items(conn, key, keys)
+    item_ids = tuple(current.bits[pair] for pair in keys)
+    latest = latest_template(conn, name)
+    if latest is not None and _template(conn, key, latest[0])[1] == item_ids:
+        return latest[0]
+    version = latest[1] + 1 if latest else 1
+    template_id = conn.execute("INSERT INTO checklist_templates (name, version) VALUES (?, ?)",
+                               (name, version)).lastrowid
+    conn.executemany("INSERT INTO checklist_template_items (template_id, position, item_id) VALUES (?, ?, ?)",
+                     [(template_id, position, item_id) for position, item_id in enumerate(item_ids)])
+    # 기본 템플릿을 따르는 모든 사용자의 캐시된 체크리스트가 바뀐다.
+    after_commit(read_cache.clear)
+    return template_id
+
+def sync_default_template() -> None:
+    for pool in data_pools():
+        with pool.transaction() as conn:
+            publish_template(conn, pool.db_name, DEFAULT_TEMPLATE, DEFAULT_CHECKLIST)
+
+def _overrides(conn: sqlite3.Connection, username: str) -> Tuple[Tuple[int, int], ...]:
+    return tuple(conn.execute(OVERRIDES_SQL, (username,)))
+
+def override_hash(overrides: Tuple[Tuple[int, int], ...]) -> str:
+    if not overrides:
+        return ""
+    return hashlib.blake2b(repr(overrides).encode("ascii"), digest_size=8).hexdigest()
+
+def _build(conn: sqlite3.Connection, key: str, template_id: int,
+           overrides: Tuple[Tuple[int, int], ...]) -> ResolvedChecklist:
+    version, template_items = _template(conn, key, template_id)
+    hidden = {item_id for item_id, is_hidden in overrides if is_hidden}
+    added = [item_id for item_id, is_hidden in overrides if not is_hidden]
+    names = _names(conn, key, (*template_items, *added))
+    categories: Dict[str, List[ChecklistEntry]] = {}
+    seen = set()
+    for item_id in (*template_items, *added):
+        if item_id in hidden or item_id in seen:
+            continue
+        seen.add(item_id)
+        category, item = names.items[item_id]
+        categories.setdefault(category, []).append(ChecklistEntry(item_id, category, item, f"{category}_{item}"))
+    return ResolvedChecklist(template_id, version,
+                             tuple((category, tuple(entries)) for category, entries in categories.items()))
+
+def resolve(conn: sqlite3.Connection, username: str, name: str = DEFAULT_TEMPLATE) -> ResolvedChecklist:
+    """The user's checklist: the newest ``name`` template plus the user's added and hidden items."""
+    global _hits, _misses
+    key = get_pool(username).db_name
+    latest = latest_template(conn, name)
+    if latest is None:
+        return ResolvedChecklist(0, 0, ())
+    overrides = _overrides(conn, username)
+    cache_key = (key, latest[0], override_hash(overrides))
+    with _lock:
+        resolved = _resolved.get(cache_key)
+        if resolved is not None:
+            _resolved.move_to_end(cache_key)
+            _hits += 1
+            return resolved
+        _misses += 1
+    resolved = _build(conn, key, latest[0], overrides)
+    with _lock:
+        _resolved[cache_key] = resolved
+        while len(_resolved) > RESOLVED_CACHE_SIZE:
+            _resolved.popitem(last=False)
+    return resolved
+
+def added_items(conn: sqlite3.Connection, username: str) -> Dict[str, List[str]]:
+    """The user's own items by category, as ``checklist_items`` used to store them."""
+    checklist: Dict[str, List[str]] = {}
+    for category, item in iter_added_items(conn, username):
+        checklist.setdefault(category, []).append(item)
+    return checklist
+
+def iter_added_items(conn: sqlite3.Connection, username: str) -> Iterator[Tuple[str, str]]:
+    rows = conn.execute(ADDED_ITEMS_SQL, (username,)).fetchall()
+    names = _names(conn, get_pool(username).db_name, (row[0] for row in rows))
+    return iter(sorted((names.items[row[0]] for row in rows), key=lambda pair: pair[0]))
+
+def add_items(conn: sqlite3.Connection, username: str, items: Iterable[Tuple[str, str]]) -> None:
+    """Add ``(category, item)`` pairs for the user, un-hiding template items; the caller owns the transaction."""
+    items = list(items)
+    current = intern_items(conn, get_pool(username).db_name, items)
+    position = conn.execute("SELECT COALESCE(MAX(position), 0) FROM checklist_overrides WHERE username = ?",
+                            (username,)).fetchone()[0]
+    conn.executemany("""INSERT INTO checklist_overrides (username, item_id, hidden, position) VALUES (?, ?, 0, ?)
+                        ON CONFLICT (username, item_id) DO UPDATE SET hidden = 0, position = excluded.position
+                        WHERE hidden = 1""",
+                     [(username, current.bits[pair], position + n) for n, pair in enumerate(items, 1)])
+
+def remove_item(conn: sqlite3.Connection, username: str, category: str, item: str) -> None:
+    """Drop a user's own item and hide it if the template has it; the caller owns the transaction."""
+    row = conn.execute("SELECT bit FROM progress_items WHERE category = ? AND item = ?", (category, item)).fetchone()
+    if row is None:
+        return
+    item_id = row[0]
+    conn.execute("DELETE FROM checklist_overrides WHERE username = ? AND item_id = ?", (username, item_id))
+    template = latest_template(conn)
+    if template and item_id in _template(conn, get_pool(username).db_name, template[0])[1]:
+        conn.execute("""INSERT INTO checklist_overrides (username, item_id, hidden, position)
+                        SELECT ?, ?, 1, COALESCE(MAX(position), 0) + 1 FROM checklist_overrides WHERE username = ?""",
+                     (username, item_id, username))
+
+def get_template_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {"resolved": len(_resolved), "templates": len(_templates), "hits": _hits, "misses": _misses}
@@ -0,0 +1,291 @@
+import argparse
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import connection
+import progress_bits
+from analytics import unpack_masks
+from connection import configure, connect, get_pool, transaction
+from migrations import migrate
+
+COHORT_WORKERS = int(os.environ.get("WELLNESS_COHORT_WORKERS", str(os.cpu_count() or 2)))
+CHUNK_USERS = 500
+# 최고 수위 이전 날짜라도 이만큼은 늦게 저장된 체크를 반영하려고 다시 읽는다.
+REFRESH_LOOKBACK_DAYS = 7
+ADHERENCE_BINS = 10
+
+# (date, category, completed, total, users)
+CategoryDay = Tuple[str, str, int, int, int]
+# (week, username, completed, total, days)
+UserWeek = Tuple[str, str, int, int, int]
+
+class ChunkTask(NamedTuple):
+    path: str
+    progress_format: str
+    users: Tuple[str, ...]
+    start_date: Optional[str]
+
+class Partial(NamedTuple):
+    """Aggregates of one chunk of users; chunks never share a user, so user weeks just concatenate."""
+    category_days: List[CategoryDay]
+    user_weeks: List[UserWeek]
+    rows: int
+    high_water: Optional[str]
+
+def week_start(day: str) -> str:
+    """The Monday on or before ``day``; weeks are keyed by it."""
+    parsed = date.fromisoformat(day)
+    return (parsed - timedelta(days=parsed.weekday())).isoformat()
+
+def _open_readonly(path: str) -> sqlite3.Connection:
+    # 작업 프로세스는 풀을 쓰지 않고 읽기 전용으로 직접 연다. 실수로라도 쓰기 잠금을 잡지 않는다.
+    uri = pathlib.Path(path).absolute().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=connection.BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout={connection.BUSY_TIMEOUT_MS}")
+    return conn
+
+def _filter(task: ChunkTask) -> Tuple[str, tuple]:
+    placeholders = ", ".join("?" * len(task.users))
+    where, params = f"username IN ({placeholders})", tuple(task.users)
+    if task.start_date is not None:
+        where += " AND date >= ?"
+        params += (task.start_date,)
+    return where, params
+
+def _rollup_partial(conn: sqlite3.Connection, task: ChunkTask) -> Partial:
+    """Aggregate the chunk from ``daily_category_rollup`` in SQL; only the sums cross into Python."""
+    where, params = _filter(task)
+    category_days = conn.execute(f"""SELECT date, category, SUM(completed_count), SUM(total_count), COUNT(*)
+                                     FROM daily_category_rollup WHERE {where}
+                                     GROUP BY date, category""", params).fetchall()
+    # 안쪽 집계는 기본 키 순서대로 읽혀 정렬이 필요 없고, 바깥쪽은 사용자·날짜당 한 행만 다룬다.
+    user_weeks = conn.execute(f"""SELECT date(date, '-6 days', 'weekday 1') AS week, username,
+                                         SUM(completed), SUM(total), COUNT(*)
+                                  FROM (SELECT username, date, SUM(completed_count) AS completed,
+                                               SUM(total_count) AS total
+                                        FROM daily_category_rollup WHERE {where} GROUP BY username, date)
+                                  GROUP BY username, week""", params).fetchall()
+    high_water = max((row[0] for row in category_days), default=None)
+    return Partial(category_days, user_weeks, sum(row[4] for row in category_days), high_water)
+
+def _bits_partial(conn: sqlite3.Connection, task: ChunkTask) -> Partial:
+    """Aggregate the chunk from ``daily_progress_bits`` by unpacking every mask into one NumPy matrix."""
+    where, params = _filter(task)
+    rows = conn.execute(f"SELECT username, date, version, saved, completed FROM daily_progress_bits WHERE {where}",
+                        params).fetchall()
+    if not rows:
+        return Partial([], [], 0, None)
+    definition = progress_bits.definition_for(conn, task.path, max(row[2] for row in rows))
+    users, days, _, saved, completed = zip(*rows)
+    width = max(1, (len(definition.items) + 7) // 8)
+    saved_bits = unpack_masks([(blob or b"")[:width] for blob in saved], width)
+    completed_bits = unpack_masks([(blob or b"")[:width] for blob in completed], width) & saved_bits
+    # 비트 → 카테고리 소속 행렬을 곱하면 (날짜 행, 카테고리)별 저장·완료 항목 수가 한 번에 나온다.
+    categories = sorted(definition.category_masks)
+    membership = np.zeros((width * 8, len(categories)), dtype=np.int32)
+    for bit, (category, _) in enumerate(definition.items):
+        membership[bit, categories.index(category)] = 1
+    totals = saved_bits.astype(np.int32) @ membership
+    done = completed_bits.astype(np.int32) @ membership
+
+    day_values, day_codes = np.unique(np.asarray(days), return_inverse=True)
+    cells = day_codes[:, None] * len(categories) + np.arange(len(categories))
+    size = len(day_values) * len(categories)
+    cell_completed = np.bincount(cells.ravel(), weights=done.ravel(), minlength=size)
+    cell_total = np.bincount(cells.ravel(), weights=totals.ravel(), minlength=size)
+    cell_users = np.bincount(cells.ravel(), weights=(totals > 0).ravel(), minlength=size)
+    category_days = [(str(day_values[cell // len(categories)]), categories[cell % len(categories)],
+                      int(cell_completed[cell]), int(cell_total[cell]), int(cell_users[cell]))
+                     for cell in np.flatnonzero(cell_total)]
+
+    week_values, week_codes = np.unique([week_start(day) for day in day_values], return_inverse=True)
+    user_values, user_codes = np.unique(np.asarray(users), return_inverse=True)
+    keys = user_codes * len(week_values) + week_codes[day_codes]
+    size = len(user_values) * len(week_values)
+    key_completed = np.bincount(keys, weights=done.sum(axis=1), minlength=size)
+    key_total = np.bincount(keys, weights=totals.sum(axis=1), minlength=size)
+    key_days = np.bincount(keys, weights=totals.sum(axis=1) > 0, minlength=size)
+    user_weeks = [(str(week_values[key % len(week_values)]), str(user_values[key // len(week_values)]),
+                   int(key_completed[key]), int(key_total[key]), int(key_days[key]))
+                  for key in np.flatnonzero(key_total)]
+    return Partial(category_days, user_weeks, len(rows), str(day_values[-1]))
+
+def aggregate_chunk(task: ChunkTask) -> Partial:
+    """Runs in a worker process: aggregate one chunk of users over a read-only connection."""
+    conn = _open_readonly(task.path)
+    try:
+        # 두 쿼리가 같은 스냅샷을 보도록 읽기 트랜잭션 하나로 묶는다.
+        conn.execute("BEGIN")
+        if task.progress_format == "bits":
+            return _bits_partial(conn, task)
+        return _rollup_partial(conn, task)
+    finally:
+        conn.close()
+
+def _tasks(start_date: Optional[str], chunk_users: int) -> List[ChunkTask]:
+    with connect() as conn:
+        users = [row[0] for row in conn.execute("SELECT username FROM users ORDER BY username")]
+    by_file: Dict[str, List[str]] = {}
+    for username in users:
+        by_file.setdefault(get_pool(username).db_name, []).append(username)
+    fmt = progress_bits.PROGRESS_FORMAT
+    return [ChunkTask(path, fmt, tuple(names[i:i + chunk_users]), start_date)
+            for path, names in by_file.items() for i in range(0, len(names), chunk_users)]
+
+def _merge(partials: Iterable[Partial]) -> Partial:
+    category_days: Dict[Tuple[str, str], List[int]] = {}
+    user_weeks: List[UserWeek] = []
+    rows = 0
+    high_water: Optional[str] = None
+    for partial in partials:
+        for day, category, completed, total, users in partial.category_days:
+            sums = category_days.setdefault((day, category), [0, 0, 0])
+            sums[0] += completed
+            sums[1] += total
+            sums[2] += users
+        user_weeks.extend(partial.user_weeks)
+        rows += partial.rows
+        if partial.high_water is not None and (high_water is None or partial.high_water > high_water):
+            high_water = partial.high_water
+    return Partial([(day, category, *sums) for (day, category), sums in category_days.items()],
+                   user_weeks, rows, high_water)
+
+def run_chunks(tasks: List[ChunkTask], workers: int = COHORT_WORKERS) -> Partial:
+    """Aggregate ``tasks`` on ``workers`` processes (in this process when 1) and merge the partials."""
+    if workers <= 1 or len(tasks) <= 1:
+        return _merge(map(aggregate_chunk, tasks))
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        return _merge(executor.map(aggregate_chunk, tasks))
+
+def high_water_mark() -> Optional[Dict[str, str]]:
+    with connect() as conn:
+        row = conn.execute("SELECT high_water, progress_format, refreshed_at FROM cohort_refresh WHERE id = 1").fetchone()
+    return None if row is None else {"high_water": row[0], "progress_format": row[1], "refreshed_at": row[2]}
+
+def refresh(full: bool = False, workers: int = COHORT_WORKERS, chunk_users: int = CHUNK_USERS,
+            lookback_days: int = REFRESH_LOOKBACK_DAYS) -> Dict[str, Any]:
+    """Bring the cohort tables up to date and return what was read.
+
+    Without ``full`` only dates from the week containing ``high_water -
+    lookback_days`` onward are re-aggregated; whole weeks are redone so every
+    stored user week stays complete. Edits to days older than that need a
+    full refresh. A change of storage format always forces one.
+    """
+    started = time.perf_counter()
+    state = high_water_mark()
+    if (state is None or state["high_water"] is None or state["progress_format"] != progress_bits.PROGRESS_FORMAT):
+        full = True
+    start_date = None
+    if not full:
+        start_date = week_start((date.fromisoformat(state["high_water"]) - timedelta(days=lookback_days)).isoformat())
+    tasks = _tasks(start_date, max(1, chunk_users))
+    merged = run_chunks(tasks, workers)
+    high_water = max(filter(None, (merged.high_water, None if full else state["high_water"])), default=None)
+    with transaction() as conn:
+        if start_date is None:
+            conn.execute("DELETE FROM cohort_category_days")
+            conn.execute("DELETE FROM cohort_user_weeks")
+        else:
+            conn.execute("DELETE FROM cohort_category_days WHERE date >= ?", (start_date,))
+            conn.execute("DELETE FROM cohort_user_weeks WHERE week >= ?", (start_date,))
+        conn.executemany("INSERT INTO cohort_category_days VALUES (?, ?, ?, ?, ?)", merged.category_days)
+        conn.executemany("INSERT INTO cohort_user_weeks VALUES (?, ?, ?, ?, ?)", merged.user_weeks)
+        conn.execute("INSERT OR REPLACE INTO cohort_refresh VALUES (1, ?, ?, ?)",
+                     (high_water, progress_bits.PROGRESS_FORMAT, datetime.now().isoformat(timespec="seconds")))
+    return {
+        "mode": "full" if start_date is None else "incremental",
+        "from": start_date or "-",
+        "chunks": len(tasks),
+        "rows": merged.rows,
+        "high_water": high_water or "-",
+        "seconds": time.perf_counter() - started,
+    }
+
+def _range(start_date: Optional[str], end_date: Optional[str]) -> Tuple[str, str]:
+    return start_date or "0000-01-01", end_date or "9999-12-31"
+
+def category_completion(start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Completion rate per category over every user's saved items."""
+    with connect() as conn:
+        rows = conn.execute("""SELECT category, SUM(completed), SUM(total) FROM cohort_category_days
+                               WHERE date BETWEEN ? AND ? GROUP BY category ORDER BY category""",
+                            _range(start_date, end_date)).fetchall()
+    return [{"category": category, "completed": completed, "total": total, "rate": completed / total}
+            for category, completed, total in rows if total]
+
+def adherence_distribution(start_week: Optional[str] = None, end_week: Optional[str] = None,
+                           bins: int = ADHERENCE_BINS) -> List[Dict[str, Any]]:
+    """How many users fall in each completion-rate bucket over the given weeks."""
+    with connect() as conn:
+        counts = dict(conn.execute("""SELECT MIN(completed * ? / total, ? - 1) AS bucket, COUNT(*)
+                                      FROM (SELECT SUM(completed) AS completed, SUM(total) AS total
+                                            FROM cohort_user_weeks WHERE week BETWEEN ? AND ?
+                                            GROUP BY username HAVING SUM(total) > 0)
+                                      GROUP BY bucket""", (bins, bins, *_range(start_week, end_week))).fetchall())
+    return [{"range": f"{100 * n // bins}-{100 * (n + 1) // bins}%", "users": counts.get(n, 0)} for n in range(bins)]
+
+def weekly_trend(start_week: Optional[str] = None, end_week: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Population completion per week and its change from the previous week in percentage points."""
+    with connect() as conn:
+        rows = conn.execute("""SELECT week, SUM(completed), SUM(total), COUNT(*) FROM cohort_user_weeks
+                               WHERE week BETWEEN ? AND ? GROUP BY week ORDER BY week""",
+                            _range(start_week, end_week)).fetchall()
+    trend: List[Dict[str, Any]] = []
+    for week, completed, total, users in rows:
+        rate = completed / total if total else 0.0
+        change = (rate - trend[-1]["rate"]) * 100 if trend else None
+        trend.append({"week": week, "active_users": users, "rate": rate, "change_pp": change})
+    return trend
+
+def report(weeks: int = 8, end_date: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """All three reports over the ``weeks`` weeks ending at ``end_date`` (default: the high-water mark)."""
+    if end_date is None:
+        state = high_water_mark()
+        end_date = state["high_water"] if state and state["high_water"] else date.today().isoformat()
+    first_week = (date.fromisoformat(week_start(end_date)) - timedelta(weeks=max(1, weeks) - 1)).isoformat()
+    return {
+        "category_completion": category_completion(first_week, end_date),
+        "adherence_distribution": adherence_distribution(first_week, end_date),
+        "weekly_trend": weekly_trend(first_week, end_date),
+    }
+
+def _print_rows(rows: List[Dict[str, Any]]) -> None:
+    for row in rows:
+        print(", ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in row.items()))
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="전체 사용자 대상 코호트 집계와 보고서")
+    parser.add_argument("command", choices=["refresh", "report"])
+    parser.add_argument("--full", action="store_true", help="최고 수위를 무시하고 전부 다시 집계")
+    parser.add_argument("--workers", type=int, default=COHORT_WORKERS, help="집계 프로세스 수")
+    parser.add_argument("--chunk-users", type=int, default=CHUNK_USERS, help="작업 하나가 맡을 사용자 수")
+    parser.add_argument("--weeks", type=int, default=8, help="보고서에 넣을 주 수")
+    parser.add_argument("--end", help="보고서의 마지막 날짜 (기본값: 최고 수위)")
+    parser.add_argument("--db", help="데이터베이스 파일 (기본값: wellness.db)")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        configure(args.db)
+    migrate()
+
+    if args.command == "refresh":
+        result = refresh(args.full, args.workers, args.chunk_users)
+        print(f"{result['mode']} 집계: {result['from']}부터 {result['chunks']}개 작업, {result['rows']}개 행, "
+              f"최고 수위 {result['high_water']}, {result['seconds']:.1f}초")
+        return 0
+    for title, rows in report(args.weeks, args.end).items():
+        print(f"[{title}]")
+        _print_rows(rows)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional
+
+DB_NAME = 'wellness.db'
+
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 16384
+MAX_IDLE_CONNECTIONS = 8
+# 2 이상이면 사용자별 데이터를 이 수만큼의 샤드 파일에 나눠 담는다. DB_NAME에는 users와 sessions만 남는다.
+SHARD_COUNT = int(os.environ.get("WELLNESS_SHARDS", "0"))
+
+# metrics.enable_metrics()가 설정한다. _on_wait가 None이면 계측 비용이 들지 않는다.
+_connection_factory: type = sqlite3.Connection
+_on_wait: Optional[Callable[[str, float], None]] = None
+
+
+class ConnectionPool:
+    """A pool of SQLite connections for one database file.
+
+    A thread checks a connection out for the duration of a ``connect()`` block
+    and keeps it for any nested blocks, so a connection is only ever used by one
+    thread at a time. Released connections stay open and are handed to the next
+    caller, which lets Streamlit script runs reuse them across reruns.
+    """
+
+    def __init__(self, db_name: str, max_idle: int = MAX_IDLE_CONNECTIONS,
+                 busy_timeout_ms: int = BUSY_TIMEOUT_MS, cache_size_kib: int = CACHE_SIZE_KIB) -> None:
+        self.db_name = db_name
+        self.max_idle = max_idle
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._opened = 0
+        self._reused = 0
+        self._closed = 0
+        self._callback_errors = 0
+
+    def _open(self) -> sqlite3.Connection:
+        # 트랜잭션은 transaction()에서 직접 관리한다.
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout_ms / 1000,
+                               isolation_level=None, check_same_thread=False, factory=_connection_factory)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size={-int(self.cache_size_kib)}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                self._reused += 1
+                return self._idle.pop()
+            self._opened += 1
+        return self._open()
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            # 계측을 켜고 끈 뒤에는 예전 종류의 연결을 돌려 쓰지 않는다.
+            if len(self._idle) < self.max_idle and type(conn) is _connection_factory:
+                self._idle.append(conn)
+                return
+            self._closed += 1
+        conn.close()
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        held: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        on_wait = _on_wait
+        if on_wait is None:
+            conn = self._acquire()
+        else:
+            started = time.perf_counter()
+            conn = self._acquire()
+            on_wait("acquire", time.perf_counter() - started)
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    @contextmanager
+    def borrow(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection without binding it to the current thread.
+
+        Meant for generators that may be resumed on another thread; the caller
+        must not use the connection from two threads at once.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.connect() as conn:
+            if conn.in_transaction:
+                # 바깥쪽 트랜잭션에 합류한다.
+                yield conn
+                return
+            on_wait = _on_wait
+            if on_wait is None:
+                conn.execute("BEGIN IMMEDIATE")
+            else:
+                # 쓰기 잠금을 기다린 시간이 여기서 드러난다.
+                started = time.perf_counter()
+                conn.execute("BEGIN IMMEDIATE")
+                on_wait("begin", time.perf_counter() - started)
+            callbacks: List[Callable[[], None]] = []
+            stack = _pending_callbacks()
+            stack.append(callbacks)
+            try:
+                try:
+                    yield conn
+                except BaseException:
+                    conn.rollback()
+                    raise
+                conn.commit()
+            finally:
+                stack.pop()
+            # 이미 커밋되었으므로 콜백 하나가 실패해도 나머지 무효화와 알림은 모두 돌린다.
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception:
+                    with self._lock:
+                        self._callback_errors += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "opened": self._opened,
+                "reused": self._reused,
+                "closed": self._closed,
+                "callback_errors": self._callback_errors,
+                "idle": len(self._idle),
+            }
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._closed += len(idle)
+        for conn in idle:
+            conn.close()
+
+
+_pool_lock = threading.Lock()
+_pool: Optional[ConnectionPool] = None
+_shards: List[ConnectionPool] = []
+# 스레드마다 열려 있는 트랜잭션들의 커밋 후 콜백 목록. 맨 뒤가 가장 안쪽 트랜잭션이다.
+_callbacks_local = threading.local()
+
+
+def _pending_callbacks() -> List[List[Callable[[], None]]]:
+    stack = getattr(_callbacks_local, "stack", None)
+    if stack is None:
+        stack = _callbacks_local.stack = []
+    return stack
+
+
+def shard_path(db_name: str, index: int) -> str:
+    base, ext = os.path.splitext(db_name)
+    return f"{base}-shard{index:02d}{ext or '.db'}"
+
+
+def shard_index(username: str, shard_count: int) -> int:
+    """Stable shard number of ``username``; unlike ``hash()`` it is the same in every process."""
+    digest = hashlib.blake2b(username.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+def get_pool(username: Optional[str] = None) -> ConnectionPool:
+    """The pool holding ``username``'s data, or the directory pool (users, sessions) for ``None``."""
+    global _pool, _shards
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _shards = [ConnectionPool(shard_path(DB_NAME, i)) for i in range(SHARD_COUNT)] if SHARD_COUNT > 1 else []
+                _pool = ConnectionPool(DB_NAME)
+    if username is None or not _shards:
+        return _pool
+    return _shards[shard_index(username, len(_shards))]
+
+
+def all_pools() -> List[ConnectionPool]:
+    get_pool()
+    return [_pool, *_shards]
+
+
+def data_pools() -> List[ConnectionPool]:
+    """Pools that hold per-user tables: the shards, or the single database when not sharded."""
+    get_pool()
+    return list(_shards) or [_pool]
+
+
+def configure(db_name: str, shards: Optional[int] = None, **options) -> ConnectionPool:
+    """Point the shared pools at ``db_name`` (and its shard files), closing any idle connections."""
+    global _pool, _shards, DB_NAME, SHARD_COUNT
+    with _pool_lock:
+        for pool in ([_pool] if _pool is not None else []) + _shards:
+            pool.close_all()
+        DB_NAME = db_name
+        if shards is not None:
+            SHARD_COUNT = shards
+        _shards = ([ConnectionPool(shard_path(db_name, i), **options) for i in range(SHARD_COUNT)]
+                   if SHARD_COUNT > 1 else [])
+        _pool = ConnectionPool(db_name, **options)
+    return _pool
+
+
+def connect(username: Optional[str] = None) -> ContextManager[sqlite3.Connection]:
+    return get_pool(username).connect()
+
+
+def borrow(username: Optional[str] = None) -> ContextManager[sqlite3.Connection]:
+    return get_pool(username).borrow()
+
+
+def transaction(username: Optional[str] = None) -> ContextManager[sqlite3.Connection]:
+    return get_pool(username).transaction()
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the innermost open transaction on this thread commits, or now if there is none.
+
+    A callback that raises after the commit is counted in the pool's
+    ``callback_errors`` and does not stop the callbacks queued after it.
+    """
+    stack = _pending_callbacks()
+    if stack:
+        stack[-1].append(callback)
+    else:
+        callback()
+
+
+def get_connection_stats() -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for pool in all_pools():
+        for key, value in pool.stats().items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def instrument(factory: Optional[type], on_wait: Optional[Callable[[str, float], None]]) -> None:
+    """Open new connections with ``factory`` and report pool/lock waits to ``on_wait``; ``None`` resets."""
+    global _connection_factory, _on_wait
+    _connection_factory = factory or sqlite3.Connection
+    _on_wait = on_wait
+    for pool in all_pools():
+        pool.close_all()
@@ -1,78 +1,182 @@
+import io
 import sqlite3
-import json
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Iterable, Iterator, Tuple, TypedDict, TypeVar
 
-DB_NAME = 'wellness.db'
+import progress_bits
+import reflection_search
+from cache import cached, invalidate_after_commit
+from checklist_templates import (ADDED_ITEMS_SQL, LATEST_TEMPLATE_SQL, OVERRIDES_SQL, ResolvedChecklist, add_items,
+                                 added_items, remove_item, resolve, sync_default_template)
+from connection import connect, transaction
+from metrics import timed
+from migrations import explain_query_plan, migrate
+from reminders import reminder_removed, reminder_saved
+from rollup import refresh_rollup
 
+if TYPE_CHECKING:
+    from write_behind import WriteBehindQueue
+
+DEFAULT_CHUNK_SIZE = 500
+
+T = TypeVar("T")
+
+DAILY_PROGRESS_SQL = "SELECT category, item, completed FROM daily_progress WHERE username = ? AND date = ?"
+PROGRESS_HISTORY_SQL = """SELECT date, category, CAST(completed_count AS REAL) / total_count as completion_rate
+                          FROM daily_category_rollup
+                          WHERE username = ? AND date BETWEEN ? AND ?
+                          ORDER BY date, category"""
+RECENT_REFLECTION_SQL = """SELECT date, achievements, improvements, tomorrow_goals FROM reflections
+                           WHERE username = ? ORDER BY date DESC LIMIT 1"""
+NOTIFICATIONS_SQL = "SELECT item, time FROM notifications WHERE username = ?"
+REMOVE_NOTIFICATION_SQL = "DELETE FROM notifications WHERE username = ? AND item = ?"
+ProgressRow = Tuple[str, str, str, int]
+
+class WriteStats(TypedDict):
+    inserted: int
+    updated: int
+    skipped: int
+
+# write_behind.enable_write_behind()가 설정하면 진행 상황·성찰 저장이 큐를 거친다.
+_write_behind: Optional["WriteBehindQueue"] = None
+
+def set_write_behind(queue: Optional["WriteBehindQueue"]) -> None:
+    global _write_behind
+    _write_behind = queue
+
+@timed("db")
 def init_db() -> None:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS checklist_items
-                 (id INTEGER PRIMARY KEY, username TEXT, category TEXT, item TEXT, 
-                 UNIQUE(username, category, item))''')
-    c.execute('''CREATE TABLE IF NOT EXISTS daily_progress
-                 (id INTEGER PRIMARY KEY, username TEXT, date TEXT, category TEXT, 
-                 item TEXT, completed INTEGER)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS reflections
-                 (id INTEGER PRIMARY KEY, username TEXT, date TEXT, achievements TEXT, 
-                 improvements TEXT, tomorrow_goals TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS notifications
-                 (id INTEGER PRIMARY KEY, username TEXT, item TEXT, time TEXT)''')
-    conn.commit()
-    conn.close()
+    migrate()
+    sync_default_template()
 
+@timed("db")
+@cached("get_checklist_items")
 def get_checklist_items(username: str) -> Dict[str, List[str]]:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT category, item FROM checklist_items WHERE username = ?", (username,))
-    items = c.fetchall()
-    conn.close()
-    checklist: Dict[str, List[str]] = {}
-    for category, item in items:
-        if category not in checklist:
-            checklist[category] = []
-        checklist[category].append(item)
-    return checklist
+    with connect(username) as conn:
+        return added_items(conn, username)
+
+@timed("db")
+@cached("get_user_checklist")
+def get_user_checklist(username: str) -> ResolvedChecklist:
+    """The default template with the user's own and hidden items applied."""
+    with connect(username) as conn:
+        return resolve(conn, username)
 
+def _invalidate_checklist(username: str) -> None:
+    invalidate_after_commit(username, "get_checklist_items")
+    invalidate_after_commit(username, "get_user_checklist")
+
+@timed("db")
 def add_checklist_item(username: str, category: str, item: str) -> None:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("INSERT OR IGNORE INTO checklist_items (username, category, item) VALUES (?, ?, ?)",
-              (username, category, item))
-    conn.commit()
-    conn.close()
+    with transaction(username) as conn:
+        add_items(conn, username, [(category, item)])
+        _invalidate_checklist(username)
 
+@timed("db")
 def remove_checklist_item(username: str, category: str, item: str) -> None:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM checklist_items WHERE username = ? AND category = ? AND item = ?",
-              (username, category, item))
-    conn.commit()
-    conn.close()
-
-def save_daily_progress(username: str, date: str, progress: Dict[str, Dict[str, bool]]) -> None:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+    with transaction(username) as conn:
+        remove_item(conn, username, category, item)
+        _invalidate_checklist(username)
+
+def _chunked(rows: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def iter_progress_rows(date: str, progress: Dict[str, Dict[str, bool]]) -> Iterator[ProgressRow]:
     for category, items in progress.items():
         for item, completed in items.items():
-            c.execute("""INSERT OR REPLACE INTO daily_progress 
-                         (username, date, category, item, completed) 
-                         VALUES (?, ?, ?, ?, ?)""", 
-                      (username, date, category, item, int(completed)))
-    conn.commit()
-    conn.close()
+            yield date, category, item, int(completed)
 
-def get_daily_progress(username: str, date: str) -> Dict[str, Dict[str, bool]]:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("""SELECT category, item, completed 
-                 FROM daily_progress 
-                 WHERE username = ? AND date = ?""", (username, date))
-    progress = c.fetchall()
-    conn.close()
+def write_progress_rows(conn: sqlite3.Connection, username: str, rows: Iterable[ProgressRow],
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> WriteStats:
+    """Upsert ``(date, category, item, completed)`` rows for one user, chunk by chunk.
+
+    Rows whose stored ``completed`` value is unchanged are skipped; for the
+    dates that did change, the rollup is refreshed and the cached reads are
+    invalidated. The caller owns the transaction.
+    """
+    stats: WriteStats = {"inserted": 0, "updated": 0, "skipped": 0}
+    if progress_bits.bits_enabled():
+        for chunk in _chunked(rows, chunk_size):
+            chunk_stats, changed = progress_bits.write_chunk(conn, username, chunk)
+            if changed:
+                _invalidate_progress(username, changed)
+            for key in stats:
+                stats[key] += chunk_stats[key]
+        return stats
+    for chunk in _chunked(rows, chunk_size):
+        dates = sorted({row[0] for row in chunk})
+        placeholders = ", ".join("?" * len(dates))
+        existing = {
+            (date, category, item): completed
+            for date, category, item, completed in conn.execute(
+                f"""SELECT date, category, item, completed FROM daily_progress
+                    WHERE username = ? AND date IN ({placeholders})""", (username, *dates))
+        }
+        inserts: List[Tuple[str, str, str, str, int]] = []
+        updates: List[Tuple[int, str, str, str, str]] = []
+        for date, category, item, completed in chunk:
+            key = (date, category, item)
+            previous = existing.get(key)
+            if previous == completed:
+                stats["skipped"] += 1
+                continue
+            if previous is None and key not in existing:
+                inserts.append((username, date, category, item, completed))
+            else:
+                updates.append((completed, username, date, category, item))
+            existing[key] = completed
+        if inserts:
+            conn.executemany("""INSERT INTO daily_progress
+                                (username, date, category, item, completed)
+                                VALUES (?, ?, ?, ?, ?)""", inserts)
+        if updates:
+            conn.executemany("""UPDATE daily_progress SET completed = ?
+                                WHERE username = ? AND date = ? AND category = ? AND item = ?""", updates)
+        if inserts or updates:
+            changed = {row[1] for row in inserts} | {row[2] for row in updates}
+            refresh_rollup(conn, username, changed)
+            _invalidate_progress(username, changed)
+        stats["inserted"] += len(inserts)
+        stats["updated"] += len(updates)
+    return stats
+
+def _invalidate_progress(username: str, dates: Iterable[str]) -> None:
+    dates = frozenset(dates)
+    first, last = min(dates), max(dates)
+    invalidate_after_commit(username, "get_daily_progress", lambda args: args[0] in dates)
+    invalidate_after_commit(username, "get_progress_history",
+                            lambda args: args[0] <= last and first <= args[1]
+                            and any(args[0] <= date <= args[1] for date in dates))
+
+    def frame_overlaps(args: tuple) -> bool:
+        start, end = (args + (None, None))[:2]
+        return any((start is None or start <= date) and (end is None or date <= end) for date in dates)
+    invalidate_after_commit(username, "load_progress_frame", frame_overlaps)
+
+@timed("db")
+def save_daily_progress(username: str, date: str, progress: Dict[str, Dict[str, bool]],
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Optional[WriteStats]:
+    """Save one day's checklist; returns ``None`` when the write was queued for write-behind."""
+    if _write_behind is not None:
+        _write_behind.enqueue_progress(username, date, progress)
+        return None
+    with transaction(username) as conn:
+        return write_progress_rows(conn, username, iter_progress_rows(date, progress), chunk_size)
+
+@cached("get_daily_progress")
+def _load_daily_progress(username: str, date: str) -> Dict[str, Dict[str, bool]]:
+    if progress_bits.bits_enabled():
+        with connect(username) as conn:
+            return progress_bits.load_day(conn, username, date)
+    with connect(username) as conn:
+        c = conn.cursor()
+        c.execute(DAILY_PROGRESS_SQL, (username, date))
+        progress = c.fetchall()
     result: Dict[str, Dict[str, bool]] = {}
     for category, item, completed in progress:
         if category not in result:
@@ -80,37 +184,64 @@ def get_daily_progress(username: str, date: str) -> Dict[str, Dict[str, bool]]:
         result[category][item] = bool(completed)
     return result
 
+@timed("db")
+def get_daily_progress(username: str, date: str) -> Dict[str, Dict[str, bool]]:
+    if _write_behind is None:
+        return _load_daily_progress(username, date)
+    # 큐를 먼저 본다. 그 사이 플러시됐다면 캐시가 이미 무효화되어 DB에서 새 값을 읽는다.
+    queued = _write_behind.queued_progress(username, date)
+    stored = _load_daily_progress(username, date)
+    if not queued:
+        return stored
+    result = {category: dict(items) for category, items in stored.items()}
+    for (category, item), completed in queued.items():
+        result.setdefault(category, {})[item] = bool(completed)
+    return result
+
+@timed("db")
+@cached("get_progress_history")
 def get_progress_history(username: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("""SELECT date, category, AVG(completed) as completion_rate
-                 FROM daily_progress 
-                 WHERE username = ? AND date BETWEEN ? AND ?
-                 GROUP BY date, category""", 
-              (username, start_date, end_date))
-    history = c.fetchall()
-    conn.close()
+    with connect(username) as conn:
+        if progress_bits.bits_enabled():
+            history = progress_bits.category_rates(conn, username, start_date, end_date)
+            return [{"date": date, "category": category, "completion_rate": rate} for date, category, rate in history]
+        c = conn.cursor()
+        c.execute(PROGRESS_HISTORY_SQL, (username, start_date, end_date))
+        history = c.fetchall()
     return [{"date": date, "category": category, "completion_rate": rate} for date, category, rate in history]
 
+def write_reflections(conn: sqlite3.Connection, username: str, rows: Iterable[Tuple[str, str, str, str]]) -> None:
+    """Upsert ``(date, achievements, improvements, tomorrow_goals)`` rows; the caller owns the transaction."""
+    token = reflection_search.owner_token(username)
+    # 전문 색인 트리거가 옛 내용을 지울 수 있도록 REPLACE(삭제 후 삽입) 대신 UPDATE로 덮어쓴다.
+    conn.executemany("""INSERT INTO reflections
+                        (username, date, achievements, improvements, tomorrow_goals, owner_token)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (username, date) DO UPDATE SET
+                        achievements = excluded.achievements, improvements = excluded.improvements,
+                        tomorrow_goals = excluded.tomorrow_goals, owner_token = excluded.owner_token""",
+                     ((username, *row, token) for row in rows))
+    invalidate_after_commit(username, "get_recent_reflection")
+    invalidate_after_commit(username, "search_reflections")
+
+def write_reflection(conn: sqlite3.Connection, username: str, date: str, achievements: str,
+                     improvements: str, tomorrow_goals: str) -> None:
+    write_reflections(conn, username, [(date, achievements, improvements, tomorrow_goals)])
+
+@timed("db")
 def save_reflection(username: str, date: str, achievements: str, improvements: str, tomorrow_goals: str) -> None:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("""INSERT OR REPLACE INTO reflections 
-                 (username, date, achievements, improvements, tomorrow_goals) 
-                 VALUES (?, ?, ?, ?, ?)""", 
-              (username, date, achievements, improvements, tomorrow_goals))
-    conn.commit()
-    conn.close()
+    if _write_behind is not None:
+        _write_behind.enqueue_reflection(username, date, achievements, improvements, tomorrow_goals)
+        return
+    with transaction(username) as conn:
+        write_reflection(conn, username, date, achievements, improvements, tomorrow_goals)
 
-def get_recent_reflection(username: str) -> Optional[Dict[str, str]]:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("""SELECT date, achievements, improvements, tomorrow_goals 
-                 FROM reflections 
-                 WHERE username = ? 
-                 ORDER BY date DESC LIMIT 1""", (username,))
-    reflection = c.fetchone()
-    conn.close()
+@cached("get_recent_reflection")
+def _load_recent_reflection(username: str) -> Optional[Dict[str, str]]:
+    with connect(username) as conn:
+        c = conn.cursor()
+        c.execute(RECENT_REFLECTION_SQL, (username,))
+        reflection = c.fetchone()
     if reflection:
         return {
             "date": reflection[0],
@@ -120,97 +251,79 @@ def get_recent_reflection(username: str) -> Optional[Dict[str, str]]:
         }
     return None
 
+@timed("db")
+def get_recent_reflection(username: str) -> Optional[Dict[str, str]]:
+    if _write_behind is None:
+        return _load_recent_reflection(username)
+    queued = _write_behind.queued_reflection(username)
+    stored = _load_recent_reflection(username)
+    if queued is not None and (stored is None or queued["date"] >= stored["date"]):
+        return queued
+    return stored
+
+@timed("db")
+@cached("search_reflections")
+def search_reflections(username: str, query: str, limit: int = reflection_search.SEARCH_PAGE_SIZE,
+                       after: Optional[reflection_search.SearchCursor] = None) -> reflection_search.SearchPage:
+    """One page of the user's reflections matching ``query``; pass ``next_cursor`` back as ``after``."""
+    with connect(username) as conn:
+        return reflection_search.search(conn, username, query, limit, after)
+
+@timed("db")
 def save_notification(username: str, item: str, time: str) -> None:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("INSERT INTO notifications (username, item, time) VALUES (?, ?, ?)",
-              (username, item, time))
-    conn.commit()
-    conn.close()
+    with transaction(username) as conn:
+        conn.execute("INSERT INTO notifications (username, item, time) VALUES (?, ?, ?)",
+                     (username, item, time))
+        invalidate_after_commit(username, "get_notifications")
+        reminder_saved(username, item, time)
 
+@timed("db")
+@cached("get_notifications")
 def get_notifications(username: str) -> List[Dict[str, str]]:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT item, time FROM notifications WHERE username = ?", (username,))
-    notifications = c.fetchall()
-    conn.close()
+    with connect(username) as conn:
+        c = conn.cursor()
+        c.execute(NOTIFICATIONS_SQL, (username,))
+        notifications = c.fetchall()
     return [{"item": item, "time": time} for item, time in notifications]
 
+@timed("db")
 def remove_notification(username: str, item: str) -> None:
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM notifications WHERE username = ? AND item = ?", (username, item))
-    conn.commit()
-    conn.close()
+    with transaction(username) as conn:
+        conn.execute(REMOVE_NOTIFICATION_SQL, (username, item))
+        invalidate_after_commit(username, "get_notifications")
+        reminder_removed(username, item)
 
+@timed("db")
 def export_user_data(username: str) -> str:
-    data = {
-        "checklist_items": get_checklist_items(username),
-        "daily_progress": {},
-        "reflections": [],
-        "notifications": get_notifications(username)
-    }
-    
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # 일일 진행 상황 내보내기
-    c.execute("SELECT date, category, item, completed FROM daily_progress WHERE username = ?", (username,))
-    for date, category, item, completed in c.fetchall():
-        if date not in data["daily_progress"]:
-            data["daily_progress"][date] = {}
-        if category not in data["daily_progress"][date]:
-            data["daily_progress"][date][category] = {}
-        data["daily_progress"][date][category][item] = bool(completed)
-    
-    # 성찰 내보내기
-    c.execute("SELECT date, achievements, improvements, tomorrow_goals FROM reflections WHERE username = ?", (username,))
-    data["reflections"] = [
-        {
-            "date": date,
-            "achievements": achievements,
-            "improvements": improvements,
-            "tomorrow_goals": tomorrow_goals
-        }
-        for date, achievements, improvements, tomorrow_goals in c.fetchall()
-    ]
-    
-    conn.close()
-    return json.dumps(data, indent=2)
-
-def import_user_data(username: str, data: str) -> None:
-    parsed_data = json.loads(data)
-    
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # 체크리스트 항목 가져오기
-    for category, items in parsed_data["checklist_items"].items():
-        for item in items:
-            c.execute("INSERT OR IGNORE INTO checklist_items (username, category, item) VALUES (?, ?, ?)",
-                      (username, category, item))
-    
-    # 일일 진행 상황 가져오기
-    for date, categories in parsed_data["daily_progress"].items():
-        for category, items in categories.items():
-            for item, completed in items.items():
-                c.execute("""INSERT OR REPLACE INTO daily_progress 
-                             (username, date, category, item, completed) 
-                             VALUES (?, ?, ?, ?, ?)""", 
-                          (username, date, category, item, int(completed)))
-    
-    # 성찰 가져오기
-    for reflection in parsed_data["reflections"]:
-        c.execute("""INSERT OR REPLACE INTO reflections 
-                     (username, date, achievements, improvements, tomorrow_goals) 
-                     VALUES (?, ?, ?, ?, ?)""", 
-                  (username, reflection["date"], reflection["achievements"],
-                   reflection["improvements"], reflection["tomorrow_goals"]))
-    
-    # 알림 가져오기
-    for notification in parsed_data["notifications"]:
-        c.execute("INSERT INTO notifications (username, item, time) VALUES (?, ?, ?)",
-                  (username, notification["item"], notification["time"]))
-    
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    # backup이 이 모듈의 쓰기 함수를 쓰므로 순환 import를 피해 여기서 불러온다.
+    from backup import iter_export_text
+    return "".join(iter_export_text(username))
+
+@timed("db")
+def import_user_data(username: str, data: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Dict[str, float]]:
+    from backup import import_user_stream
+    return import_user_stream(username, io.StringIO(data), fmt="json", chunk_size=chunk_size)
+
+# 화면 렌더링마다 실행되는 조회들. 모두 인덱스를 타야 한다. 각 읽기 함수가 실제로 쓰는 SQL을 그대로 가져온다.
+HOT_QUERIES: Dict[str, str] = {
+    "get_checklist_items": ADDED_ITEMS_SQL,
+    "get_user_checklist": OVERRIDES_SQL,
+    "latest_template": LATEST_TEMPLATE_SQL,
+    "get_daily_progress": DAILY_PROGRESS_SQL,
+    "get_progress_history": PROGRESS_HISTORY_SQL,
+    "get_recent_reflection": RECENT_REFLECTION_SQL,
+    "get_daily_progress_bits": progress_bits.DAY_MASK_SQL,
+    "get_progress_history_bits": progress_bits.masks_sql(start_date=True, end_date=True),
+    "get_notifications": NOTIFICATIONS_SQL,
+    "remove_notification": REMOVE_NOTIFICATION_SQL,
+}
+
+def find_unindexed_queries() -> Dict[str, List[str]]:
+    """Return the plan of every hot query that scans a table or sorts in a temp b-tree."""
+    problems: Dict[str, List[str]] = {}
+    with connect() as conn:
+        for name, sql in HOT_QUERIES.items():
+            plan = explain_query_plan(conn, sql, ("",) * sql.count("?"))
+            if any(step.startswith("SCAN") or "TEMP B-TREE" in step for step in plan):
+                problems[name] = plan
+    return problems
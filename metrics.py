@@ -0,0 +1,372 @@
+import functools
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+import connection
+
+F = TypeVar("F", bound=Callable[..., Any])
+Labels = Tuple[Tuple[str, str], ...]
+
+# 히스토그램 버킷 상한(초)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SLOW_QUERY_MS = float(os.environ.get("WELLNESS_SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG = os.environ.get("WELLNESS_SLOW_QUERY_LOG")
+METRICS_FILE = os.environ.get("WELLNESS_METRICS_FILE")
+SLOW_QUERIES_KEPT = 100
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        running = 0
+        result = []
+        for bound, count in zip([*map(str, BUCKETS), "+Inf"], self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+class MetricsRegistry:
+    """Histograms and counters keyed by metric name and label set."""
+
+    def __init__(self) -> None:
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram()
+            histogram.observe(value)
+
+    def add(self, name: str, labels: Labels, value: float) -> None:
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def prometheus(self) -> str:
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines: List[str] = []
+        previous = None
+        for (name, labels), histogram in histograms:
+            if name != previous:
+                lines.append(f"# TYPE {name} histogram")
+                previous = name
+            for bound, count in histogram.cumulative():
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            if name != previous:
+                lines.append(f"# TYPE {name} counter")
+                previous = name
+            lines.append(f"{name}{_format_labels(labels)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for (name, labels), histogram in histograms:
+            result.setdefault(name, []).append({
+                "labels": dict(labels),
+                "count": histogram.count,
+                "sum": histogram.total,
+                "buckets": dict(histogram.cumulative()),
+            })
+        for (name, labels), value in counters:
+            result.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return result
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and ``IN (?, ?, ...)`` lists so one statement maps to one label."""
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", sql)
+
+registry = MetricsRegistry()
+_enabled = False
+_slow_query_ms = SLOW_QUERY_MS
+_slow_log_path: Optional[str] = None
+_export_path: Optional[str] = None
+_slow_queries: Deque[Dict[str, Any]] = deque(maxlen=SLOW_QUERIES_KEPT)
+_slow_lock = threading.Lock()
+_local = threading.local()
+
+def _counters() -> threading.local:
+    # 스레드별 누적값. 호출 전후의 차이가 그 호출의 행 수와 대기 시간이다.
+    if not hasattr(_local, "rows"):
+        _local.rows = 0
+        _local.wait = 0.0
+        _local.depth = 0
+        _local.rerun = None
+        _local.rerun_started = 0.0
+    return _local
+
+def _record_query(conn: sqlite3.Connection, sql: str, params: Any, seconds: float, rows: int) -> None:
+    query = normalize_sql(sql)
+    labels = (("query", query),)
+    registry.observe("wellness_query_duration_seconds", labels, seconds)
+    if rows:
+        registry.add("wellness_query_rows_total", labels, rows)
+        _counters().rows += rows
+    if seconds * 1000 < _slow_query_ms:
+        return
+    registry.add("wellness_slow_queries_total", labels, 1)
+    plan: List[str] = []
+    if params is not None and query.lstrip("( ").upper().startswith(_EXPLAINABLE):
+        try:
+            # 계측하지 않는 커서로 실행해서 EXPLAIN 자체가 기록되지 않게 한다.
+            plan = [row[3] for row in conn.cursor(sqlite3.Cursor).execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        except sqlite3.Error:
+            pass
+    entry = {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "ms": round(seconds * 1000, 3),
+        "rows": rows,
+        "query": query,
+        "plan": plan,
+    }
+    with _slow_lock:
+        _slow_queries.append(entry)
+        if _slow_log_path:
+            with open(_slow_log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+class _InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times each statement from ``execute`` until its rows are consumed."""
+
+    _sql: Optional[str] = None
+    _params: Any = None
+    _seconds = 0.0
+    _rows = 0
+
+    def _finish(self) -> None:
+        sql, self._sql = self._sql, None
+        if sql is not None:
+            _record_query(self.connection, sql, self._params, self._seconds, self._rows)
+
+    def execute(self, sql: str, parameters: Any = ()) -> "sqlite3.Cursor":
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._sql, self._params = sql, parameters
+            self._seconds, self._rows = time.perf_counter() - started, 0
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> "sqlite3.Cursor":
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_query(self.connection, sql, None, time.perf_counter() - started, 0)
+
+    def _fetched(self, started: float, rows: int, exhausted: bool) -> None:
+        self._seconds += time.perf_counter() - started
+        self._rows += rows
+        if exhausted:
+            self._finish()
+
+    def fetchone(self) -> Any:
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Any]:
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self) -> List[Any]:
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self) -> Any:
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+    def __del__(self) -> None:
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class _InstrumentedConnection(sqlite3.Connection):
+    # Connection.execute는 cursor()를 거치지 않으므로 직접 계측 커서로 돌린다.
+    def cursor(self, factory: Any = None) -> sqlite3.Cursor:
+        return super().cursor(factory or _InstrumentedCursor)
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def _on_connection_wait(stage: str, seconds: float) -> None:
+    registry.observe("wellness_connection_wait_seconds", (("stage", stage),), seconds)
+    _counters().wait += seconds
+
+def _call(kind: str, name: str, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+    local = _counters()
+    rows, wait = local.rows, local.wait
+    depth = local.depth
+    local.depth = depth + 1
+    started = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - started
+        local.depth = depth
+        labels = (("kind", kind), ("name", name))
+        registry.observe("wellness_call_duration_seconds", labels, seconds)
+        registry.add("wellness_call_rows_total", labels, local.rows - rows)
+        registry.add("wellness_call_connection_wait_seconds_total", labels, local.wait - wait)
+        if local.rerun is not None:
+            local.rerun.append({
+                "start_ms": (started - local.rerun_started) * 1000,
+                "kind": kind,
+                "name": name,
+                "depth": depth,
+                "ms": seconds * 1000,
+                "rows": local.rows - rows,
+                "wait_ms": (local.wait - wait) * 1000,
+            })
+
+def timed(kind: str) -> Callable[[F], F]:
+    """Record wall time, rows fetched and connection wait of every call while metrics are on."""
+    def decorator(fn: F) -> F:
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return fn(*args, **kwargs)
+            return _call(kind, name, fn, args, kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+@contextmanager
+def rerun() -> Iterator[List[Dict[str, Any]]]:
+    """Time one Streamlit script run; the yielded list holds its per-call breakdown once the block exits."""
+    breakdown: List[Dict[str, Any]] = []
+    if not _enabled:
+        yield breakdown
+        return
+    local = _counters()
+    local.rerun = []
+    local.rerun_started = started = time.perf_counter()
+    try:
+        yield breakdown
+    finally:
+        registry.observe("wellness_rerun_duration_seconds", (), time.perf_counter() - started)
+        # 호출은 끝나는 순서로 쌓이므로 시작 순서로 다시 정렬한다.
+        breakdown.extend(sorted(local.rerun, key=lambda entry: entry["start_ms"]))
+        local.rerun = None
+        if _export_path:
+            try:
+                write_metrics(_export_path)
+            except OSError:
+                # 측정값 파일을 못 써도 화면은 그린다. 다음 실행에서 다시 쓴다.
+                pass
+
+def enable_metrics(slow_query_ms: Optional[float] = None, slow_log_path: Optional[str] = None,
+                   export_path: Optional[str] = None) -> None:
+    """Turn instrumentation on; new pool connections time every statement from now on."""
+    global _enabled, _slow_query_ms, _slow_log_path, _export_path
+    _slow_query_ms = SLOW_QUERY_MS if slow_query_ms is None else slow_query_ms
+    _slow_log_path = slow_log_path or SLOW_QUERY_LOG
+    _export_path = export_path or METRICS_FILE
+    connection.instrument(_InstrumentedConnection, _on_connection_wait)
+    _enabled = True
+
+def disable_metrics() -> None:
+    global _enabled
+    _enabled = False
+    connection.instrument(None, None)
+
+def metrics_enabled() -> bool:
+    return _enabled
+
+def reset_metrics() -> None:
+    registry.clear()
+    with _slow_lock:
+        _slow_queries.clear()
+
+def get_slow_queries() -> List[Dict[str, Any]]:
+    with _slow_lock:
+        return list(_slow_queries)
+
+def export_prometheus() -> str:
+    return registry.prometheus()
+
+def export_json() -> str:
+    return json.dumps({"metrics": registry.to_dict(), "slow_queries": get_slow_queries()},
+                      ensure_ascii=False, indent=2)
+
+def write_metrics(path: str) -> None:
+    """Write the aggregates to ``path``: JSON for ``*.json``, Prometheus text format otherwise."""
+    text = export_json() if path.endswith(".json") else export_prometheus()
+    # 세션마다 다른 임시 파일에 쓰고 바꿔 넣어서 동시에 쓰는 세션끼리 서로의 임시 파일을 치우지 않는다.
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
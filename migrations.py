@@ -0,0 +1,171 @@
+import sqlite3
+from typing import Callable, List, Optional
+
+from connection import all_pools
+from reflection_search import owner_token
+
+def _create_base_tables(conn: sqlite3.Connection) -> None:
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS users
+                 (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS checklist_items
+                 (id INTEGER PRIMARY KEY, username TEXT, category TEXT, item TEXT,
+                 UNIQUE(username, category, item))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS daily_progress
+                 (id INTEGER PRIMARY KEY, username TEXT, date TEXT, category TEXT,
+                 item TEXT, completed INTEGER)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS reflections
+                 (id INTEGER PRIMARY KEY, username TEXT, date TEXT, achievements TEXT,
+                 improvements TEXT, tomorrow_goals TEXT)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS notifications
+                 (id INTEGER PRIMARY KEY, username TEXT, item TEXT, time TEXT)''')
+
+def _add_unique_keys_and_indexes(conn: sqlite3.Connection) -> None:
+    c = conn.cursor()
+    # 이전 버전의 INSERT OR REPLACE가 쌓아 둔 중복 행은 가장 최근 것만 남긴다.
+    c.execute("""DELETE FROM daily_progress WHERE id NOT IN
+                 (SELECT MAX(id) FROM daily_progress GROUP BY username, date, category, item)""")
+    c.execute("""DELETE FROM reflections WHERE id NOT IN
+                 (SELECT MAX(id) FROM reflections GROUP BY username, date)""")
+    c.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_progress_key
+                 ON daily_progress (username, date, category, item)""")
+    c.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_reflections_key
+                 ON reflections (username, date)""")
+    c.execute("""CREATE INDEX IF NOT EXISTS idx_notifications_user
+                 ON notifications (username, item)""")
+
+def _add_import_checkpoints(conn: sqlite3.Connection) -> None:
+    conn.execute("""CREATE TABLE IF NOT EXISTS import_checkpoints
+                    (username TEXT, import_id TEXT, records_done INTEGER, finished INTEGER,
+                    updated_at TEXT, PRIMARY KEY (username, import_id))""")
+
+def _add_daily_category_rollup(conn: sqlite3.Connection) -> None:
+    conn.execute("""CREATE TABLE IF NOT EXISTS daily_category_rollup
+                    (username TEXT, date TEXT, category TEXT, completed_count INTEGER, total_count INTEGER,
+                    PRIMARY KEY (username, date, category)) WITHOUT ROWID""")
+    conn.execute("""INSERT OR REPLACE INTO daily_category_rollup
+                    SELECT username, date, category, SUM(completed), COUNT(completed)
+                    FROM daily_progress GROUP BY username, date, category""")
+
+def _add_sessions(conn: sqlite3.Connection) -> None:
+    conn.execute("""CREATE TABLE IF NOT EXISTS sessions
+                    (token_hash TEXT PRIMARY KEY, username TEXT, created_at REAL, expires_at REAL)
+                    WITHOUT ROWID""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (username)")
+
+def _add_notification_time_index(conn: sqlite3.Connection) -> None:
+    # 알림 스케줄러가 시작할 때 전체 알림을 시각순으로 읽는다.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notifications_time ON notifications (time)")
+
+def _add_progress_bits(conn: sqlite3.Connection) -> None:
+    # progress_bits.py의 비트마스크 저장 형식. progress_items의 bit가 마스크의 비트 위치다.
+    conn.execute("""CREATE TABLE IF NOT EXISTS progress_items
+                    (bit INTEGER PRIMARY KEY, category TEXT NOT NULL, item TEXT NOT NULL, version INTEGER NOT NULL,
+                    UNIQUE (category, item))""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS daily_progress_bits
+                    (username TEXT, date TEXT, version INTEGER, saved BLOB, completed BLOB,
+                    PRIMARY KEY (username, date)) WITHOUT ROWID""")
+
+def _add_checklist_templates(conn: sqlite3.Connection) -> None:
+    # 항목 문자열은 progress_items에 한 번만 두고, 템플릿과 사용자별 변경분은 그 번호(bit)를 가리킨다.
+    conn.execute("""CREATE TABLE IF NOT EXISTS checklist_templates
+                    (id INTEGER PRIMARY KEY, name TEXT NOT NULL, version INTEGER NOT NULL, UNIQUE (name, version))""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS checklist_template_items
+                    (template_id INTEGER, position INTEGER, item_id INTEGER,
+                    PRIMARY KEY (template_id, position)) WITHOUT ROWID""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS checklist_overrides
+                    (username TEXT, item_id INTEGER, hidden INTEGER NOT NULL, position INTEGER NOT NULL,
+                    PRIMARY KEY (username, item_id)) WITHOUT ROWID""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_checklist_overrides_position
+                    ON checklist_overrides (username, position)""")
+    # 기존 사용자 항목을 한 번에 번호를 매겨 옮긴다. 새 항목은 모두 같은 정의 버전을 받는다.
+    conn.execute("""INSERT INTO progress_items (bit, category, item, version)
+                    SELECT (SELECT COALESCE(MAX(bit), -1) FROM progress_items)
+                           + ROW_NUMBER() OVER (ORDER BY MIN(c.id)),
+                           c.category, c.item,
+                           (SELECT COALESCE(MAX(version), 0) + 1 FROM progress_items)
+                    FROM checklist_items c
+                    WHERE NOT EXISTS (SELECT 1 FROM progress_items p WHERE p.category = c.category AND p.item = c.item)
+                    GROUP BY c.category, c.item""")
+    conn.execute("""INSERT OR IGNORE INTO checklist_overrides (username, item_id, hidden, position)
+                    SELECT c.username, p.bit, 0, c.id
+                    FROM checklist_items c JOIN progress_items p ON p.category = c.category AND p.item = c.item""")
+    conn.execute("DROP TABLE checklist_items")
+
+def _add_cohort_state(conn: sqlite3.Connection) -> None:
+    # cohort.py가 전체 사용자에 대해 합쳐 둔 집계. 디렉터리 DB에만 채워진다.
+    conn.execute("""CREATE TABLE IF NOT EXISTS cohort_category_days
+                    (date TEXT, category TEXT, completed INTEGER, total INTEGER, users INTEGER,
+                    PRIMARY KEY (date, category)) WITHOUT ROWID""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS cohort_user_weeks
+                    (week TEXT, username TEXT, completed INTEGER, total INTEGER, days INTEGER,
+                    PRIMARY KEY (week, username)) WITHOUT ROWID""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS cohort_refresh
+                    (id INTEGER PRIMARY KEY CHECK (id = 1), high_water TEXT, progress_format TEXT,
+                    refreshed_at TEXT)""")
+
+def _add_reflection_search(conn: sqlite3.Connection) -> None:
+    # 성찰 본문의 trigram 전문 색인. owner_token은 사용자마다 한 trigram이라 검색을 그 사용자의 행으로 좁힌다.
+    conn.execute("ALTER TABLE reflections ADD COLUMN owner_token TEXT")
+    conn.create_function("owner_token", 1, owner_token, deterministic=True)
+    conn.execute("UPDATE reflections SET owner_token = owner_token(username)")
+    conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS reflections_fts USING fts5
+                    (owner_token, achievements, improvements, tomorrow_goals,
+                    content='reflections', content_rowid='id', tokenize='trigram')""")
+    # 외부 콘텐츠 테이블이라 색인은 트리거로 맞춘다. INSERT OR REPLACE는 삭제 트리거를 부르지 않으므로
+    # reflections에 쓰는 곳은 모두 ON CONFLICT ... DO UPDATE를 쓴다.
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS reflections_fts_insert AFTER INSERT ON reflections BEGIN
+                        INSERT INTO reflections_fts (rowid, owner_token, achievements, improvements, tomorrow_goals)
+                        VALUES (new.id, new.owner_token, new.achievements, new.improvements, new.tomorrow_goals);
+                    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS reflections_fts_delete AFTER DELETE ON reflections BEGIN
+                        INSERT INTO reflections_fts
+                        (reflections_fts, rowid, owner_token, achievements, improvements, tomorrow_goals)
+                        VALUES ('delete', old.id, old.owner_token, old.achievements, old.improvements, old.tomorrow_goals);
+                    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS reflections_fts_update AFTER UPDATE ON reflections BEGIN
+                        INSERT INTO reflections_fts
+                        (reflections_fts, rowid, owner_token, achievements, improvements, tomorrow_goals)
+                        VALUES ('delete', old.id, old.owner_token, old.achievements, old.improvements, old.tomorrow_goals);
+                        INSERT INTO reflections_fts (rowid, owner_token, achievements, improvements, tomorrow_goals)
+                        VALUES (new.id, new.owner_token, new.achievements, new.improvements, new.tomorrow_goals);
+                    END""")
+    conn.execute("INSERT INTO reflections_fts (reflections_fts) VALUES ('rebuild')")
+
+# 순서가 곧 스키마 버전이다. 새 마이그레이션은 항상 끝에 추가한다.
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _create_base_tables,
+    _add_unique_keys_and_indexes,
+    _add_import_checkpoints,
+    _add_daily_category_rollup,
+    _add_sessions,
+    _add_notification_time_index,
+    _add_progress_bits,
+    _add_checklist_templates,
+    _add_cohort_state,
+    _add_reflection_search,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(target: Optional[int] = None) -> int:
+    """Apply pending migrations up to ``target`` to every database file and return the resulting version."""
+    target = SCHEMA_VERSION if target is None else target
+    # 샤딩 중이면 디렉터리와 샤드 파일 모두 같은 스키마를 가진다.
+    for pool in all_pools():
+        with pool.transaction() as conn:
+            version = get_schema_version(conn)
+            if version > SCHEMA_VERSION:
+                raise RuntimeError(f"데이터베이스 스키마 버전({version})이 애플리케이션({SCHEMA_VERSION})보다 높습니다.")
+            for number in range(version + 1, target + 1):
+                MIGRATIONS[number - 1](conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+            version = get_schema_version(conn)
+    return version
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
@@ -0,0 +1,280 @@
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from cache import read_cache
+from connection import after_commit, configure, data_pools, get_pool
+from migrations import migrate
+from rollup import refresh_rollup
+
+# "bits"이면 daily_progress 대신 daily_progress_bits에 (사용자, 날짜)당 한 행으로 저장한다.
+# 형식을 바꾸기 전에 python progress_bits.py convert --to bits 로 기존 데이터를 옮긴다.
+PROGRESS_FORMAT = os.environ.get("WELLNESS_PROGRESS_FORMAT", "rows")
+FORMATS = ("rows", "bits")
+
+DAY_MASK_SQL = "SELECT version, saved, completed FROM daily_progress_bits WHERE username = ? AND date = ?"
+
+ProgressRow = Tuple[str, str, str, int]
+MaskRow = Tuple[str, int, bytes, bytes]
+
+class ChecklistDefinition(NamedTuple):
+    """Every item ever saved in one database file, in bit order.
+
+    Items are only ever appended, so a mask written under an older version
+    decodes the same way under a newer one.
+    """
+    version: int
+    items: Tuple[Tuple[str, str], ...]
+    bits: Dict[Tuple[str, str], int]
+    category_masks: Dict[str, int]
+
+EMPTY_DEFINITION = ChecklistDefinition(0, (), {}, {})
+
+_definitions: Dict[str, ChecklistDefinition] = {}
+_definitions_lock = threading.Lock()
+
+def bits_enabled() -> bool:
+    return PROGRESS_FORMAT == "bits"
+
+def set_progress_format(fmt: str) -> None:
+    global PROGRESS_FORMAT
+    if fmt not in FORMATS:
+        raise ValueError(f"지원하지 않는 저장 형식입니다: {fmt}")
+    PROGRESS_FORMAT = fmt
+    read_cache.clear()
+
+def pack(mask: int) -> bytes:
+    return mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+def unpack(blob: Optional[bytes]) -> int:
+    return int.from_bytes(blob, "little") if blob else 0
+
+def _set_bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def _build(rows: Iterable[Tuple[int, str, str, int]]) -> ChecklistDefinition:
+    items: List[Tuple[str, str]] = []
+    category_masks: Dict[str, int] = {}
+    version = 0
+    for bit, category, item, item_version in rows:
+        if bit != len(items):
+            raise RuntimeError(f"progress_items의 비트 번호가 비어 있습니다: {len(items)}")
+        items.append((category, item))
+        category_masks[category] = category_masks.get(category, 0) | (1 << bit)
+        version = max(version, item_version)
+    return ChecklistDefinition(version, tuple(items), {key: bit for bit, key in enumerate(items)}, category_masks)
+
+def _publish(key: str, definition: ChecklistDefinition) -> None:
+    with _definitions_lock:
+        current = _definitions.get(key)
+        if current is None or len(current.items) <= len(definition.items):
+            _definitions[key] = definition
+
+def _load(conn: sqlite3.Connection, key: str) -> ChecklistDefinition:
+    definition = _build(conn.execute("SELECT bit, category, item, version FROM progress_items ORDER BY bit"))
+    # 롤백될 수도 있는 트랜잭션 안에서 읽은 정의는 커밋된 뒤에만 다른 호출과 나눠 쓴다.
+    after_commit(lambda: _publish(key, definition))
+    return definition
+
+def definition_for(conn: sqlite3.Connection, key: str, min_version: int = 0) -> ChecklistDefinition:
+    """The item definition of the database file ``key``, reloaded when a row is newer than the cache."""
+    cached = _definitions.get(key, EMPTY_DEFINITION)
+    if cached.version >= min_version and cached is not EMPTY_DEFINITION:
+        return cached
+    return _load(conn, key)
+
+def definition(conn: sqlite3.Connection, username: str, min_version: int = 0) -> ChecklistDefinition:
+    return definition_for(conn, get_pool(username).db_name, min_version)
+
+def intern_items(conn: sqlite3.Connection, key: str, keys: Iterable[Tuple[str, str]]) -> ChecklistDefinition:
+    """Give every ``(category, item)`` in ``keys`` an id (its bit) in file ``key``; the caller owns the transaction."""
+    keys = set(keys)
+    current = definition_for(conn, key)
+    if keys <= current.bits.keys():
+        return current
+    # 쓰기 트랜잭션(BEGIN IMMEDIATE) 안이라 다른 프로세스와 번호가 겹치지 않는다.
+    current = _load(conn, key)
+    missing = sorted(keys - current.bits.keys())
+    if not missing:
+        return current
+    version = current.version + 1
+    conn.executemany("INSERT INTO progress_items (bit, category, item, version) VALUES (?, ?, ?, ?)",
+                     [(len(current.items) + n, category, item, version) for n, (category, item) in enumerate(missing)])
+    return _load(conn, key)
+
+def decode(definition: ChecklistDefinition, saved: int, completed: int) -> Dict[str, Dict[str, bool]]:
+    progress: Dict[str, Dict[str, bool]] = {}
+    for bit in _set_bits(saved):
+        category, item = definition.items[bit]
+        progress.setdefault(category, {})[item] = bool(completed >> bit & 1)
+    return progress
+
+def write_chunk(conn: sqlite3.Connection, username: str, chunk: List[ProgressRow]) -> Tuple[Dict[str, int], Set[str]]:
+    """Merge ``(date, category, item, completed)`` rows into the user's day masks.
+
+    Returns the inserted/updated/skipped counts and the dates whose masks
+    changed. The caller owns the transaction.
+    """
+    current = intern_items(conn, get_pool(username).db_name, ((category, item) for _, category, item, _ in chunk))
+    dates = sorted({row[0] for row in chunk})
+    placeholders = ", ".join("?" * len(dates))
+    existing = {
+        date: (unpack(saved), unpack(completed))
+        for date, saved, completed in conn.execute(
+            f"""SELECT date, saved, completed FROM daily_progress_bits
+                WHERE username = ? AND date IN ({placeholders})""", (username, *dates))
+    }
+    masks = dict(existing)
+    stats = {"inserted": 0, "updated": 0, "skipped": 0}
+    for date, category, item, completed in chunk:
+        bit = 1 << current.bits[(category, item)]
+        saved, done = masks.get(date, (0, 0))
+        if saved & bit:
+            if bool(done & bit) == bool(completed):
+                stats["skipped"] += 1
+                continue
+            stats["updated"] += 1
+        else:
+            stats["inserted"] += 1
+        masks[date] = (saved | bit, done | bit if completed else done & ~bit)
+    changed = {date for date, mask in masks.items() if existing.get(date) != mask}
+    if changed:
+        conn.executemany("""INSERT OR REPLACE INTO daily_progress_bits (username, date, version, saved, completed)
+                            VALUES (?, ?, ?, ?, ?)""",
+                         [(username, date, current.version, pack(masks[date][0]), pack(masks[date][1]))
+                          for date in sorted(changed)])
+    return stats, changed
+
+def masks_sql(start_date: bool, end_date: bool) -> str:
+    """The query ``fetch_masks`` runs, with placeholders for the bounds that are given."""
+    sql = "SELECT date, version, saved, completed FROM daily_progress_bits WHERE username = ?"
+    if start_date:
+        sql += " AND date >= ?"
+    if end_date:
+        sql += " AND date <= ?"
+    return sql + " ORDER BY date"
+
+def fetch_masks(conn: sqlite3.Connection, username: str, start_date: Optional[str] = None,
+                end_date: Optional[str] = None) -> List[MaskRow]:
+    bounds = tuple(date for date in (start_date, end_date) if date is not None)
+    return conn.execute(masks_sql(start_date is not None, end_date is not None), (username, *bounds)).fetchall()
+
+def load_day(conn: sqlite3.Connection, username: str, date: str) -> Dict[str, Dict[str, bool]]:
+    row = conn.execute(DAY_MASK_SQL, (username, date)).fetchone()
+    if row is None:
+        return {}
+    return decode(definition(conn, username, row[0]), unpack(row[1]), unpack(row[2]))
+
+def category_rates(conn: sqlite3.Connection, username: str, start_date: str,
+                   end_date: str) -> List[Tuple[str, str, float]]:
+    """``(date, category, completion_rate)`` like ``daily_category_rollup``, counted with popcount."""
+    rows = fetch_masks(conn, username, start_date, end_date)
+    if not rows:
+        return []
+    current = definition(conn, username, max(row[1] for row in rows))
+    categories = sorted(current.category_masks.items())
+    rates = []
+    for date, _, saved, completed in rows:
+        saved, completed = unpack(saved), unpack(completed)
+        for category, mask in categories:
+            total = (saved & mask).bit_count()
+            if total:
+                rates.append((date, category, (completed & mask).bit_count() / total))
+    return rates
+
+def iter_rows(conn: sqlite3.Connection, username: str, batch_size: int) -> Iterator[ProgressRow]:
+    """Decoded rows in the row format's ``ORDER BY date, category, item`` order."""
+    cursor = conn.execute("""SELECT date, version, saved, completed FROM daily_progress_bits
+                             WHERE username = ? ORDER BY date""", (username,))
+    current = EMPTY_DEFINITION
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        for date, version, saved, completed in rows:
+            if version > current.version or current is EMPTY_DEFINITION:
+                current = definition(conn, username, version)
+            completed = unpack(completed)
+            day = sorted((current.items[bit], completed >> bit & 1) for bit in _set_bits(unpack(saved)))
+            for (category, item), done in day:
+                yield date, category, item, done
+
+def _users(conn: sqlite3.Connection, table: str, username: Optional[str]) -> List[str]:
+    if username is not None:
+        return [username]
+    return [row[0] for row in conn.execute(f"SELECT DISTINCT username FROM {table}")]
+
+def convert(target: str, username: Optional[str] = None, batch_size: int = 5000) -> Dict[str, int]:
+    """Move stored progress into ``target`` format ("bits" or "rows"), one user per transaction.
+
+    Converting a user twice is harmless, and the other format's rows are only
+    deleted in the same transaction that wrote the new ones.
+    """
+    if target not in FORMATS:
+        raise ValueError(f"지원하지 않는 저장 형식입니다: {target}")
+    moved = {"users": 0, "rows": 0}
+    pools = [get_pool(username)] if username else data_pools()
+    for pool in pools:
+        with pool.connect() as conn:
+            users = _users(conn, "daily_progress" if target == "bits" else "daily_progress_bits", username)
+        for user in users:
+            with pool.transaction() as conn:
+                if target == "bits":
+                    cursor = conn.execute("""SELECT date, category, item, completed FROM daily_progress
+                                             WHERE username = ? ORDER BY date""", (user,))
+                    while True:
+                        chunk = cursor.fetchmany(batch_size)
+                        if not chunk:
+                            break
+                        write_chunk(conn, user, chunk)
+                        moved["rows"] += len(chunk)
+                    conn.execute("DELETE FROM daily_progress WHERE username = ?", (user,))
+                    conn.execute("DELETE FROM daily_category_rollup WHERE username = ?", (user,))
+                else:
+                    rows = list(iter_rows(conn, user, batch_size))
+                    conn.executemany("""INSERT OR REPLACE INTO daily_progress (username, date, category, item, completed)
+                                        VALUES (?, ?, ?, ?, ?)""", [(user, *row) for row in rows])
+                    refresh_rollup(conn, user, {row[0] for row in rows})
+                    conn.execute("DELETE FROM daily_progress_bits WHERE username = ?", (user,))
+                    moved["rows"] += len(rows)
+            moved["users"] += 1
+    read_cache.clear()
+    return moved
+
+def status() -> Dict[str, int]:
+    counts = {"daily_progress": 0, "daily_progress_bits": 0, "progress_items": 0}
+    for pool in data_pools():
+        with pool.connect() as conn:
+            for table in counts:
+                counts[table] += conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return counts
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="일일 체크리스트 진행 상황의 저장 형식 변환")
+    parser.add_argument("command", choices=["convert", "status"])
+    parser.add_argument("--to", choices=FORMATS, default="bits")
+    parser.add_argument("--user", help="한 사용자만 변환")
+    parser.add_argument("--db", help="데이터베이스 파일 (기본값: wellness.db)")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        configure(args.db)
+    migrate()
+
+    if args.command == "convert":
+        moved = convert(args.to, args.user)
+        print(f"{moved['users']}명, {moved['rows']}개 항목을 {args.to} 형식으로 옮겼습니다.")
+        print(f"이제 WELLNESS_PROGRESS_FORMAT={args.to}로 실행하세요.")
+        return 0
+    for table, count in status().items():
+        print(f"{table}: {count}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import hashlib
+import math
+import sqlite3
+from typing import List, NamedTuple, Optional, Tuple
+
+# trigram 토크나이저는 세 글자보다 짧은 검색어를 색인으로 찾지 못한다. 두 글자 한국어 단어는 LIKE로 거른다.
+MIN_INDEXED_CHARS = 3
+SEARCH_PAGE_SIZE = 20
+SEARCH_FIELDS = ("achievements", "improvements", "tomorrow_goals")
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 보충 사설 영역 A(U+F0000–U+FFFFD)의 글자. 사용자가 쓰는 텍스트에는 나오지 않는다.
+_OWNER_BASE = 0xF0000
+_OWNER_CHARS = 0xFFFE
+
+class ReflectionHit(NamedTuple):
+    date: str
+    achievements: str
+    improvements: str
+    tomorrow_goals: str
+    score: float
+
+class RankingStats(NamedTuple):
+    """The BM25 statistics of the first page, reused by later pages so every page scores rows alike."""
+    max_id: int
+    doc_count: int
+    average_length: float
+    doc_freq: Tuple[Tuple[str, int], ...]
+
+class SearchCursor(NamedTuple):
+    """The last hit shown, in ``(score, date DESC, id DESC)`` order; the next page starts after it.
+
+    Its size does not depend on how many hits there are, so a cursor stays a
+    cheap cache key however deep the user pages. ``ranking`` is None for
+    queries of short terms only, which are ordered by date alone.
+    """
+    score: float
+    date: str
+    row_id: int
+    ranking: Optional[RankingStats]
+
+class SearchPage(NamedTuple):
+    hits: List[ReflectionHit]
+    next_cursor: Optional[SearchCursor]
+
+def owner_token(username: str) -> str:
+    """Three private-use characters, i.e. exactly one trigram, derived from ``username``.
+
+    It is stored in ``reflections.owner_token`` and indexed with the text, so a
+    search ANDs the user's single trigram with the query and FTS5 only walks
+    that user's postings instead of every user's matches. A hash collision
+    merely adds candidates, which the join on ``username`` drops.
+    """
+    digest = int.from_bytes(hashlib.blake2b(username.encode("utf-8"), digest_size=6).digest(), "big")
+    return "".join(chr(_OWNER_BASE + (digest >> shift & 0xFFFF) % _OWNER_CHARS) for shift in (32, 16, 0))
+
+def _terms(query: str) -> List[str]:
+    return list(dict.fromkeys(query.split()))
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+def _like_pattern(term: str) -> str:
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def _like_filter(terms: List[str]) -> Tuple[str, list]:
+    sql, params = "", []
+    for term in terms:
+        if len(term) < MIN_INDEXED_CHARS:
+            sql += " AND (" + " OR ".join(f"r.{field} LIKE ? ESCAPE '\\'" for field in SEARCH_FIELDS) + ")"
+            params += [_like_pattern(term)] * len(SEARCH_FIELDS)
+    return sql, params
+
+def _lengths(rows: List[tuple]) -> List[int]:
+    return [sum(len(field) for field in row[2:]) for row in rows]
+
+def _rank(rows: List[tuple], terms: List[str], stats: RankingStats) -> List[Tuple[float, tuple]]:
+    """``(score, row)`` by BM25 with the user's own reflections as the collection; lower scores rank first, as in FTS5."""
+    doc_freq = dict(stats.doc_freq)
+    weights = {term: math.log((stats.doc_count - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5) + 1)
+               for term in terms}
+    ranked = []
+    for row, length in zip(rows, _lengths(rows)):
+        fields = [field.lower() for field in row[2:]]
+        score = 0.0
+        for term, weight in weights.items():
+            frequency = sum(field.count(term.lower()) for field in fields)
+            saturation = frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / stats.average_length)
+            score += weight * frequency * (BM25_K1 + 1) / saturation
+        ranked.append((-score, row))
+    # 점수가 같으면 최근 날짜부터 보여 준다. id는 커서 비교를 전순서로 만들기 위한 것이다.
+    ranked.sort(key=lambda entry: (entry[1][1], entry[1][0]), reverse=True)
+    ranked.sort(key=lambda entry: entry[0])
+    return ranked
+
+def _after(score: float, row: tuple, cursor: SearchCursor) -> bool:
+    """Whether ``row`` comes after the cursor's hit in ``(score, date DESC, id DESC)`` order."""
+    return score > cursor.score or (score == cursor.score and (row[1], row[0]) < (cursor.date, cursor.row_id))
+
+def search(conn: sqlite3.Connection, username: str, query: str, limit: int = SEARCH_PAGE_SIZE,
+           after: Optional[SearchCursor] = None) -> SearchPage:
+    """Reflections of ``username`` containing every whitespace-separated term of ``query``.
+
+    Terms of three or more characters are found through the trigram index,
+    restricted to the user's postings by ``owner_token``; shorter ones are
+    checked with LIKE on those rows. Hits are ranked by BM25 computed here
+    over the user's reflections only. FTS5's own bm25() would first count
+    each term's documents across every user, which grows with the whole
+    corpus. Equal scores are ordered newest first. The first page ranks
+    every match once and its ``next_cursor`` carries the remaining ranked
+    ids, so passing it back as ``after`` costs only that page's rows and
+    pages stay consistent while new reflections are saved. A query of only
+    short terms cannot use the index and returns the newest matches first,
+    all scored 0, paged by date.
+
+    Pages are keyset-paged: ``next_cursor`` holds the last hit shown plus
+    the first page's BM25 statistics and highest matching id. Later pages
+    re-run the match over rows up to that id and score them with the same
+    statistics, so reflections saved meanwhile neither appear nor shift the
+    order, and no hit is skipped or repeated.
+    """
+    terms = _terms(query)
+    if not terms or limit <= 0:
+        return SearchPage([], None)
+    indexed = [term for term in terms if len(term) >= MIN_INDEXED_CHARS]
+    like_sql, like_params = _like_filter(terms)
+    if not indexed:
+        # (username, date) 색인을 날짜 역순으로 읽다가 LIMIT에서 멈춘다.
+        sql = ("SELECT r.date, r.achievements, r.improvements, r.tomorrow_goals, 0.0 FROM reflections r "
+               f"WHERE r.username = ?{like_sql}")
+        params = [username, *like_params]
+        if after is not None:
+            sql += " AND r.date < ?"
+            params.append(after.date)
+        hits = [ReflectionHit(*row) for row in
+                conn.execute(sql + " ORDER BY r.date DESC LIMIT ?", params + [limit + 1]).fetchall()]
+        if len(hits) <= limit:
+            return SearchPage(hits, None)
+        return SearchPage(hits[:limit], SearchCursor(0.0, hits[limit - 1].date, 0, None))
+
+    owner = f"owner_token : {_phrase(owner_token(username))} AND {{{' '.join(SEARCH_FIELDS)}}} : "
+    if after is not None:
+        like_sql += " AND r.id <= ?"
+        like_params.append(after.ranking.max_id)
+    # CROSS JOIN으로 색인을 바깥 루프에 고정한다. 그냥 JOIN이면 사용자 행마다 MATCH를 다시 돌리는 계획이 나온다.
+    rows = conn.execute(f"""SELECT r.id, r.date, r.achievements, r.improvements, r.tomorrow_goals
+                            FROM reflections_fts CROSS JOIN reflections r ON r.id = reflections_fts.rowid
+                            WHERE reflections_fts MATCH ? AND r.username = ?{like_sql}""",
+                        [owner + "(" + " AND ".join(_phrase(term) for term in indexed) + ")", username,
+                         *like_params]).fetchall()
+    if not rows:
+        return SearchPage([], None)
+    stats = after.ranking if after is not None else None
+    if stats is None:
+        doc_count = conn.execute("SELECT COUNT(*) FROM reflections WHERE username = ?", (username,)).fetchone()[0]
+        # 짧은 검색어는 색인으로 셀 수 없어서 모든 후보에 들어 있다는 것만 쓴다.
+        doc_freq = {term: len(rows) for term in terms}
+        for term in indexed:
+            doc_freq[term] = conn.execute("SELECT COUNT(*) FROM reflections_fts WHERE reflections_fts MATCH ?",
+                                          (owner + _phrase(term),)).fetchone()[0]
+        lengths = _lengths(rows)
+        stats = RankingStats(max(row[0] for row in rows), doc_count, sum(lengths) / len(lengths) or 1.0,
+                             tuple(sorted(doc_freq.items())))
+    ranked = _rank(rows, terms, stats)
+    if after is not None:
+        ranked = [(score, row) for score, row in ranked if _after(score, row, after)]
+    hits = [ReflectionHit(*row[1:], score) for score, row in ranked[:limit]]
+    if len(ranked) <= limit:
+        return SearchPage(hits, None)
+    score, row = ranked[limit - 1]
+    return SearchPage(hits, SearchCursor(score, row[1], row[0], stats))
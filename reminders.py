@@ -0,0 +1,280 @@
+import heapq
+import itertools
+import threading
+import time as _time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from connection import after_commit, data_pools
+
+LOAD_BATCH_SIZE = 5000
+INBOX_SIZE = 50
+TIME_FORMAT = "%H:%M"
+
+class Reminder(NamedTuple):
+    username: str
+    item: str
+    time: str
+    fire_at: float
+
+Sink = Callable[[Reminder], None]
+_Key = Tuple[str, str, str]
+
+def next_fire_time(time: str, now: float) -> float:
+    """Epoch seconds of the next local ``HH:MM`` strictly after ``now``."""
+    clock = datetime.strptime(time, TIME_FORMAT).time()
+    current = datetime.fromtimestamp(now)
+    fire = datetime.combine(current.date(), clock)
+    if fire.timestamp() <= now:
+        fire += timedelta(days=1)
+    return fire.timestamp()
+
+class InboxSink:
+    """Keep the latest reminders per user in memory until the app picks them up."""
+
+    def __init__(self, size: int = INBOX_SIZE) -> None:
+        self.size = size
+        self._inboxes: Dict[str, Deque[Reminder]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, reminder: Reminder) -> None:
+        with self._lock:
+            inbox = self._inboxes.get(reminder.username)
+            if inbox is None:
+                inbox = self._inboxes[reminder.username] = deque(maxlen=self.size)
+            inbox.append(reminder)
+
+    def drain(self, username: str) -> List[Reminder]:
+        with self._lock:
+            inbox = self._inboxes.pop(username, None)
+        return list(inbox) if inbox else []
+
+class ReminderScheduler:
+    """Fire every stored notification once a day at its ``HH:MM`` through ``sink``.
+
+    Pending reminders sit in a min-heap ordered by next fire time, and the
+    worker thread sleeps until the head is due, so idle cost does not depend
+    on how many reminders exist. Adds and removes update the heap in place;
+    removed entries are skipped lazily and the heap is compacted once they
+    outnumber the live ones.
+    """
+
+    def __init__(self, sink: Sink, clock: Callable[[], float] = _time.time) -> None:
+        self.sink = sink
+        self.clock = clock
+        self._heap: List[Tuple[float, int, _Key]] = []
+        # (username, item, time) -> 힙에 들어 있는 유효한 항목의 일련번호
+        self._live: Dict[_Key, int] = {}
+        self._by_user: Dict[str, List[_Key]] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._fired = 0
+        self._errors = 0
+        self._invalid = 0
+        self._wakeups = 0
+
+    def _track(self, key: _Key) -> int:
+        seq = next(self._seq)
+        self._live[key] = seq
+        keys = self._by_user.get(key[0])
+        if keys is None:
+            self._by_user[key[0]] = [key]
+        else:
+            keys.append(key)
+        return seq
+
+    def load(self) -> int:
+        """Replace the schedule with every row of ``notifications``; returns the number scheduled."""
+        with self._cond:
+            self._heap = []
+            self._live.clear()
+            self._by_user.clear()
+            now = self.clock()
+            entries = []
+            # 시각은 많아야 1440가지라 다음 울릴 시각을 한 번씩만 계산하고, 같은 문자열은 한 객체를 같이 쓴다.
+            fire_times: Dict[str, float] = {}
+            strings: Dict[str, str] = {}
+            for pool in data_pools():
+                with pool.borrow() as conn:
+                    # idx_notifications_time 덕분에 시간순으로 읽는다.
+                    cursor = conn.execute("SELECT username, item, time FROM notifications ORDER BY time")
+                    while True:
+                        rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+                        if not rows:
+                            break
+                        for username, item, time in rows:
+                            fire_at = fire_times.get(time)
+                            if fire_at is None:
+                                try:
+                                    fire_at = fire_times[time] = next_fire_time(time, now)
+                                except (TypeError, ValueError):
+                                    self._invalid += 1
+                                    continue
+                            key = (strings.setdefault(username, username), strings.setdefault(item, item),
+                                   strings.setdefault(time, time))
+                            if key not in self._live:
+                                entries.append((fire_at, self._track(key), key))
+            heapq.heapify(entries)
+            self._heap = entries
+            self._cond.notify_all()
+            return len(entries)
+
+    def add(self, username: str, item: str, time: str) -> None:
+        key = (username, item, time)
+        with self._cond:
+            if key in self._live:
+                return
+            try:
+                fire_at = next_fire_time(time, self.clock())
+            except (TypeError, ValueError):
+                self._invalid += 1
+                return
+            entry = (fire_at, self._track(key), key)
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:
+                # 새 항목이 가장 먼저 울려야 하면 잠든 작업 스레드를 깨운다.
+                self._cond.notify_all()
+
+    def remove(self, username: str, item: Optional[str] = None) -> int:
+        """Unschedule one item of ``username``, or all of the user's reminders when ``item`` is None."""
+        with self._cond:
+            keys = self._by_user.pop(username, None)
+            if not keys:
+                return 0
+            kept = [key for key in keys if item is not None and key[1] != item]
+            if kept:
+                self._by_user[username] = kept
+            for key in keys:
+                if item is None or key[1] == item:
+                    del self._live[key]
+            if len(self._heap) > 2 * len(self._live) + 1024:
+                self._compact()
+            return len(keys) - len(kept)
+
+    def _compact(self) -> None:
+        self._heap = [entry for entry in self._heap if self._live.get(entry[2]) == entry[1]]
+        heapq.heapify(self._heap)
+
+    def _drop_stale_head(self) -> None:
+        # 지워진 항목이 맨 앞에 있으면 그 시각에 헛되이 깨지 않도록 먼저 버린다.
+        while self._heap and self._live.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def _pop_due(self, now: float) -> List[Reminder]:
+        due = []
+        next_times: Dict[str, float] = {}
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, seq, key = heapq.heappop(self._heap)
+            if self._live.get(key) != seq:
+                continue
+            due.append(Reminder(*key, fire_at))
+            # 같은 항목을 다음 날 같은 시각에 다시 예약한다.
+            next_at = next_times.get(key[2])
+            if next_at is None:
+                next_at = next_times[key[2]] = next_fire_time(key[2], now)
+            next_seq = next(self._seq)
+            self._live[key] = next_seq
+            heapq.heappush(self._heap, (next_at, next_seq, key))
+        return due
+
+    def run_pending(self) -> int:
+        """Dispatch every reminder that is due now; returns how many fired."""
+        with self._cond:
+            due = self._pop_due(self.clock())
+        for reminder in due:
+            try:
+                self.sink(reminder)
+            except Exception:
+                with self._cond:
+                    self._errors += 1
+        with self._cond:
+            self._fired += len(due)
+        return len(due)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    self._drop_stale_head()
+                    if not self._heap:
+                        self._cond.wait()
+                    else:
+                        delay = self._heap[0][0] - self.clock()
+                        if delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    self._wakeups += 1
+                if self._stopping:
+                    return
+            self.run_pending()
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+
+    def next_due(self) -> Optional[Reminder]:
+        with self._cond:
+            self._drop_stale_head()
+            if not self._heap:
+                return None
+            fire_at, _, key = self._heap[0]
+            return Reminder(*key, fire_at)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "scheduled": len(self._live),
+                "heap": len(self._heap),
+                "fired": self._fired,
+                "errors": self._errors,
+                "invalid": self._invalid,
+                "wakeups": self._wakeups,
+            }
+
+reminder_inbox = InboxSink()
+_scheduler: Optional[ReminderScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def start_reminder_scheduler(sink: Optional[Sink] = None) -> ReminderScheduler:
+    """Load all reminders and start the scheduler thread; later calls return the running scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            scheduler = ReminderScheduler(sink or reminder_inbox)
+            # 적재 중에 저장·삭제된 알림도 놓치지 않도록 먼저 등록한다.
+            _scheduler = scheduler
+            scheduler.load()
+            scheduler.start()
+        return _scheduler
+
+def stop_reminder_scheduler() -> None:
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.stop()
+
+def reminder_saved(username: str, item: str, time: str) -> None:
+    """Schedule a saved notification once the surrounding transaction commits."""
+    scheduler = _scheduler
+    if scheduler is not None:
+        after_commit(lambda: scheduler.add(username, item, time))
+
+def reminder_removed(username: str, item: Optional[str] = None) -> None:
+    scheduler = _scheduler
+    if scheduler is not None:
+        after_commit(lambda: scheduler.remove(username, item))
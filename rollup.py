@@ -0,0 +1,89 @@
+import argparse
+import sqlite3
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+from connection import configure, data_pools, get_pool
+from migrations import migrate
+
+# IN (...) 목록 하나에 넣을 날짜 수
+DATE_BATCH_SIZE = 500
+
+_AGGREGATE_SQL = """SELECT username, date, category, SUM(completed), COUNT(completed)
+                    FROM daily_progress {where} GROUP BY username, date, category"""
+
+def refresh_rollup(conn: sqlite3.Connection, username: str, dates: Iterable[str]) -> None:
+    """Recompute the rollup rows of ``username`` for ``dates``; runs in the caller's transaction."""
+    dates = sorted(set(dates))
+    for start in range(0, len(dates), DATE_BATCH_SIZE):
+        chunk = dates[start:start + DATE_BATCH_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        conn.execute(f"DELETE FROM daily_category_rollup WHERE username = ? AND date IN ({placeholders})",
+                     (username, *chunk))
+        conn.execute("INSERT INTO daily_category_rollup " +
+                     _AGGREGATE_SQL.format(where=f"WHERE username = ? AND date IN ({placeholders})"),
+                     (username, *chunk))
+
+def delete_rollup(conn: sqlite3.Connection, username: str) -> None:
+    conn.execute("DELETE FROM daily_category_rollup WHERE username = ?", (username,))
+
+def _pools(username: Optional[str]):
+    return [get_pool(username)] if username else data_pools()
+
+def rebuild_rollup(username: Optional[str] = None) -> int:
+    """Rebuild the rollup from ``daily_progress`` for one user or everyone; returns the row count."""
+    where, params = ("WHERE username = ?", (username,)) if username else ("", ())
+    total = 0
+    for pool in _pools(username):
+        with pool.transaction() as conn:
+            conn.execute(f"DELETE FROM daily_category_rollup {where}", params)
+            conn.execute("INSERT INTO daily_category_rollup " + _AGGREGATE_SQL.format(where=where), params)
+            total += conn.execute(f"SELECT COUNT(*) FROM daily_category_rollup {where}", params).fetchone()[0]
+    return total
+
+def check_rollup(username: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Compare the rollup with a fresh aggregation and return every row that differs."""
+    where, params = ("WHERE username = ?", (username,)) if username else ("", ())
+    stored_sql = f"""SELECT username, date, category, completed_count, total_count
+                     FROM daily_category_rollup {where}"""
+    fresh_sql = _AGGREGATE_SQL.format(where=where)
+    mismatches: Dict[tuple, Dict[str, Any]] = {}
+    for pool in _pools(username):
+        with pool.connect() as conn:
+            # 두 방향의 비교를 한 스냅샷에서 한다.
+            conn.execute("BEGIN")
+            try:
+                for side, sql in (("expected", f"{fresh_sql} EXCEPT {stored_sql}"),
+                                  ("actual", f"{stored_sql} EXCEPT {fresh_sql}")):
+                    for row in conn.execute(sql, params + params):
+                        mismatch = mismatches.setdefault(row[:3], {
+                            "username": row[0], "date": row[1], "category": row[2],
+                            "expected": None, "actual": None,
+                        })
+                        mismatch[side] = row[3:]
+            finally:
+                conn.rollback()
+    return [mismatches[key] for key in sorted(mismatches)]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="일별·카테고리별 진행률 집계 테이블 관리")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user", help="한 사용자만 처리")
+    parser.add_argument("--db", help="데이터베이스 파일 (기본값: wellness.db)")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        configure(args.db)
+    migrate()
+
+    if args.command == "rebuild":
+        print(f"{rebuild_rollup(args.user)}개의 집계 행을 다시 만들었습니다.")
+        return 0
+    mismatches = check_rollup(args.user)
+    for mismatch in mismatches:
+        print(mismatch)
+    print(f"불일치 {len(mismatches)}건")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from connection import connect, transaction
+
+SESSION_TTL_SECONDS = 7 * 24 * 3600
+# 만료 시각 연장을 DB에 기록하는 최소 간격. 그 사이에는 메모리에서만 검증한다.
+RENEW_INTERVAL_SECONDS = 300
+HOT_SESSIONS_MAX = 10000
+PURGE_BATCH_SIZE = 500
+SWEEP_INTERVAL_SECONDS = 600
+
+class _HotSession(NamedTuple):
+    username: str
+    expires_at: float
+    synced_at: float
+
+_hot: "OrderedDict[str, _HotSession]" = OrderedDict()
+_hot_lock = threading.Lock()
+
+def _hash_token(token: str) -> str:
+    # 토큰은 충분히 무작위라서 bcrypt 대신 SHA-256이면 된다.
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _remember(token_hash: str, session: _HotSession) -> None:
+    with _hot_lock:
+        _hot[token_hash] = session
+        _hot.move_to_end(token_hash)
+        while len(_hot) > HOT_SESSIONS_MAX:
+            _hot.popitem(last=False)
+
+def _forget(token_hash: str) -> None:
+    with _hot_lock:
+        _hot.pop(token_hash, None)
+
+def create_session(username: str, ttl: float = SESSION_TTL_SECONDS) -> str:
+    token = secrets.token_urlsafe(32)
+    token_hash = _hash_token(token)
+    now = time.time()
+    with transaction() as conn:
+        conn.execute("""INSERT INTO sessions (token_hash, username, created_at, expires_at)
+                        VALUES (?, ?, ?, ?)""", (token_hash, username, now, now + ttl))
+    _remember(token_hash, _HotSession(username, now + ttl, now))
+    return token
+
+def validate_session(token: Optional[str], ttl: float = SESSION_TTL_SECONDS) -> Optional[str]:
+    """Return the username for a live session token and slide its expiry forward.
+
+    Hot tokens are checked in memory; the database is only touched when a
+    token is not cached or its cached state is older than
+    ``RENEW_INTERVAL_SECONDS``, which also bounds how long a session revoked by
+    another process can stay valid here.
+    """
+    if not token:
+        return None
+    token_hash = _hash_token(token)
+    now = time.time()
+    with _hot_lock:
+        session = _hot.get(token_hash)
+        if session is not None:
+            _hot.move_to_end(token_hash)
+    if session is not None and now - session.synced_at < RENEW_INTERVAL_SECONDS:
+        if session.expires_at <= now:
+            _forget(token_hash)
+            return None
+        return session.username
+
+    with transaction() as conn:
+        row = conn.execute("SELECT username, expires_at FROM sessions WHERE token_hash = ?",
+                           (token_hash,)).fetchone()
+        if row is None or row[1] <= now:
+            _forget(token_hash)
+            return None
+        conn.execute("UPDATE sessions SET expires_at = ? WHERE token_hash = ?", (now + ttl, token_hash))
+    _remember(token_hash, _HotSession(row[0], now + ttl, now))
+    return row[0]
+
+def revoke_session(token: str) -> None:
+    token_hash = _hash_token(token)
+    _forget(token_hash)
+    with transaction() as conn:
+        conn.execute("DELETE FROM sessions WHERE token_hash = ?", (token_hash,))
+
+def revoke_user_sessions(username: str, keep_token: Optional[str] = None) -> int:
+    keep_hash = _hash_token(keep_token) if keep_token else ""
+    with _hot_lock:
+        for token_hash in [h for h, s in _hot.items() if s.username == username and h != keep_hash]:
+            del _hot[token_hash]
+    with transaction() as conn:
+        return conn.execute("DELETE FROM sessions WHERE username = ? AND token_hash != ?",
+                            (username, keep_hash)).rowcount
+
+def purge_expired_sessions(batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """Delete expired sessions in short transactions of ``batch_size`` rows each."""
+    now = time.time()
+    purged = 0
+    while True:
+        with transaction() as conn:
+            deleted = conn.execute("""DELETE FROM sessions WHERE token_hash IN
+                                      (SELECT token_hash FROM sessions WHERE expires_at <= ? LIMIT ?)""",
+                                   (now, batch_size)).rowcount
+        purged += deleted
+        if deleted < batch_size:
+            break
+    with _hot_lock:
+        for token_hash in [h for h, s in _hot.items() if s.expires_at <= now]:
+            del _hot[token_hash]
+    return purged
+
+def count_sessions() -> Dict[str, int]:
+    with connect() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    with _hot_lock:
+        return {"stored": total, "hot": len(_hot)}
+
+_sweeper: Optional[threading.Thread] = None
+_sweeper_lock = threading.Lock()
+
+def start_session_sweeper(interval: float = SWEEP_INTERVAL_SECONDS) -> None:
+    """Start the background thread that purges expired sessions; later calls do nothing."""
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is not None:
+            return
+
+        def sweep() -> None:
+            while True:
+                time.sleep(interval)
+                try:
+                    purge_expired_sessions()
+                except Exception:
+                    # 다음 주기에 다시 시도한다.
+                    pass
+
+        _sweeper = threading.Thread(target=sweep, name="session-sweeper", daemon=True)
+        _sweeper.start()
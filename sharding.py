@@ -0,0 +1,163 @@
+import argparse
+import os
+import sqlite3
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import connection
+from checklist_templates import sync_default_template
+from connection import configure, shard_index, shard_path
+from migrations import migrate
+
+# 사용자별 데이터를 담는 테이블. users와 sessions는 항상 디렉터리 DB에 남는다.
+USER_TABLES = ("checklist_overrides", "daily_progress", "daily_category_rollup",
+               "reflections", "notifications", "import_checkpoints")
+
+def _files(db_name: str, shards: int) -> List[str]:
+    return [shard_path(db_name, i) for i in range(shards)] if shards > 1 else [db_name]
+
+def _columns(conn: sqlite3.Connection, table: str) -> Tuple[str, str]:
+    """Columns to copy and the ORDER BY that keeps the rows' original order."""
+    columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+    if "id" not in columns:
+        return ", ".join(columns), ""
+    # id는 옮겨 간 파일에서 새로 매긴다. 같은 순서로 넣으므로 행의 선후 관계는 유지된다.
+    return ", ".join(column for column in columns if column != "id"), " ORDER BY id"
+
+def _move_overrides(conn: sqlite3.Connection, index: int) -> int:
+    """Copy the checklist overrides of shard ``index``'s users, renumbering item ids by name in the target."""
+    # 항목 번호는 파일마다 따로 매기므로 대상 파일에 없는 항목부터 새 번호로 등록한다.
+    conn.execute("""INSERT INTO dest.progress_items (bit, category, item, version)
+                    SELECT (SELECT COALESCE(MAX(bit), -1) FROM dest.progress_items)
+                           + ROW_NUMBER() OVER (ORDER BY p.bit),
+                           p.category, p.item,
+                           (SELECT COALESCE(MAX(version), 0) + 1 FROM dest.progress_items)
+                    FROM main.progress_items p
+                    WHERE p.bit IN (SELECT item_id FROM main.checklist_overrides WHERE shard_of(username) = ?)
+                      AND NOT EXISTS (SELECT 1 FROM dest.progress_items d
+                                      WHERE d.category = p.category AND d.item = p.item)""", (index,))
+    conn.execute("""DELETE FROM dest.checklist_overrides WHERE username IN
+                    (SELECT DISTINCT username FROM main.checklist_overrides WHERE shard_of(username) = ?)""", (index,))
+    cursor = conn.execute("""INSERT INTO dest.checklist_overrides (username, item_id, hidden, position)
+                             SELECT o.username, d.bit, o.hidden, o.position
+                             FROM main.checklist_overrides o
+                             JOIN main.progress_items p ON p.bit = o.item_id
+                             JOIN dest.progress_items d ON d.category = p.category AND d.item = p.item
+                             WHERE shard_of(o.username) = ?""", (index,))
+    conn.execute("DELETE FROM main.checklist_overrides WHERE shard_of(username) = ?", (index,))
+    return cursor.rowcount
+
+def _open(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None, timeout=connection.BUSY_TIMEOUT_MS / 1000)
+    conn.execute(f"PRAGMA busy_timeout={connection.BUSY_TIMEOUT_MS}")
+    return conn
+
+def rebalance(db_name: str, shards: int, from_shards: int = 0) -> Dict[str, int]:
+    """Move every user's rows into the file ``shard_index`` assigns them for ``shards`` shards.
+
+    Sources are the directory database plus the ``from_shards`` shard files of
+    the previous layout. Each (source, target) pair is copied and then deleted
+    from the source in one transaction over both files; in WAL mode SQLite does
+    not make that atomic across files, so the target's rows for the moved users
+    are deleted before copying and an interrupted run can simply be repeated.
+    The application must not be running meanwhile. Returns the rows moved per table.
+    """
+    sources = [db_name] + [path for path in _files(db_name, from_shards) if path != db_name]
+    targets = _files(db_name, shards)
+    # 옛 배치와 새 배치의 파일 모두에 최신 스키마를 만든다.
+    for count in {from_shards, shards}:
+        configure(db_name, shards=count)
+        migrate()
+        sync_default_template()
+
+    # 비트마스크의 비트 번호는 파일마다 progress_items로 따로 매겨져 다른 파일로 그대로 옮길 수 없다.
+    for source in sources:
+        if os.path.exists(source):
+            conn = _open(source)
+            try:
+                packed = conn.execute("SELECT 1 FROM daily_progress_bits LIMIT 1").fetchone()
+            finally:
+                conn.close()
+            if packed:
+                raise RuntimeError(f"{source}에 비트마스크 형식의 진행 기록이 있습니다. "
+                                   "먼저 python progress_bits.py convert --to rows 를 실행하세요.")
+
+    moved = {table: 0 for table in USER_TABLES}
+    for source in sources:
+        if not os.path.exists(source):
+            continue
+        conn = _open(source)
+        try:
+            conn.create_function("shard_of", 1, lambda username: shard_index(username, shards) if shards > 1 else 0,
+                                 deterministic=True)
+            for index, target in enumerate(targets):
+                if os.path.abspath(target) == os.path.abspath(source):
+                    continue
+                conn.execute("ATTACH DATABASE ? AS dest", (target,))
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        for table in USER_TABLES:
+                            if table == "checklist_overrides":
+                                moved[table] += _move_overrides(conn, index)
+                                continue
+                            columns, order = _columns(conn, table)
+                            conn.execute(f"""DELETE FROM dest.{table} WHERE username IN
+                                             (SELECT DISTINCT username FROM main.{table}
+                                              WHERE shard_of(username) = ?)""", (index,))
+                            cursor = conn.execute(f"""INSERT INTO dest.{table} ({columns})
+                                                      SELECT {columns} FROM main.{table}
+                                                      WHERE shard_of(username) = ?{order}""", (index,))
+                            moved[table] += cursor.rowcount
+                            conn.execute(f"DELETE FROM main.{table} WHERE shard_of(username) = ?", (index,))
+                        conn.execute("COMMIT")
+                    except BaseException:
+                        conn.execute("ROLLBACK")
+                        raise
+                finally:
+                    conn.execute("DETACH DATABASE dest")
+        finally:
+            conn.close()
+    configure(db_name, shards=shards)
+    return moved
+
+def status(db_name: str, shards: int) -> List[Dict[str, object]]:
+    """Row counts per user table for the directory database and each shard file."""
+    rows = []
+    for path in [db_name] + [path for path in _files(db_name, shards) if path != db_name]:
+        if not os.path.exists(path):
+            continue
+        conn = _open(path)
+        try:
+            counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in USER_TABLES}
+            users = conn.execute("""SELECT COUNT(*) FROM (SELECT username FROM checklist_overrides
+                                    UNION SELECT username FROM daily_progress
+                                    UNION SELECT username FROM daily_progress_bits)""").fetchone()[0]
+        except sqlite3.OperationalError:
+            continue
+        finally:
+            conn.close()
+        rows.append({"file": path, "users": users, **counts})
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="사용자별 데이터를 샤드 파일로 나누거나 다시 배치")
+    parser.add_argument("command", choices=["rebalance", "status"])
+    parser.add_argument("--shards", type=int, default=connection.SHARD_COUNT,
+                        help="샤드 수 (1 이하이면 디렉터리 DB 하나로 합친다)")
+    parser.add_argument("--from-shards", type=int, default=0, help="지금 쓰고 있는 샤드 수")
+    parser.add_argument("--db", default=connection.DB_NAME, help="디렉터리 데이터베이스 파일 (기본값: wellness.db)")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebalance":
+        moved = rebalance(args.db, args.shards, args.from_shards)
+        for table, count in moved.items():
+            print(f"{table}: {count}개 행을 옮겼습니다.")
+        print(f"이제 WELLNESS_SHARDS={max(args.shards, 0)}로 실행하세요.")
+        return 0
+    for row in status(args.db, max(args.shards, args.from_shards)):
+        print(", ".join(f"{key}={value}" for key, value in row.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import sys
+from typing import Iterator
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import connection
+from cache import read_cache
+from database import init_db
+
+@pytest.fixture
+def db(tmp_path) -> Iterator[str]:
+    """A fresh, migrated database in ``tmp_path`` with an empty read cache."""
+    previous, previous_shards = connection.DB_NAME, connection.SHARD_COUNT
+    path = str(tmp_path / "wellness.db")
+    connection.configure(path, shards=0)
+    read_cache.configure(maxsize=2048, ttl=300)
+    init_db()
+    try:
+        yield path
+    finally:
+        connection.configure(previous, shards=previous_shards)
+        read_cache.clear()
+
+# 마이그레이션이 생기기 전 database.init_db()가 만들던 스키마
+BASELINE_SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT);
+CREATE TABLE checklist_items (id INTEGER PRIMARY KEY, username TEXT, category TEXT, item TEXT,
+                              UNIQUE(username, category, item));
+CREATE TABLE daily_progress (id INTEGER PRIMARY KEY, username TEXT, date TEXT, category TEXT,
+                             item TEXT, completed INTEGER);
+CREATE TABLE reflections (id INTEGER PRIMARY KEY, username TEXT, date TEXT, achievements TEXT,
+                          improvements TEXT, tomorrow_goals TEXT);
+CREATE TABLE notifications (id INTEGER PRIMARY KEY, username TEXT, item TEXT, time TEXT);
+"""
+
+@pytest.fixture
+def legacy_db(tmp_path) -> Iterator[str]:
+    """An unmigrated database with the original schema; fill it with ``sqlite3`` and then call ``init_db()``."""
+    previous, previous_shards = connection.DB_NAME, connection.SHARD_COUNT
+    path = str(tmp_path / "wellness.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.close()
+    connection.configure(path, shards=0)
+    read_cache.configure(maxsize=2048, ttl=300)
+    try:
+        yield path
+    finally:
+        connection.configure(previous, shards=previous_shards)
+        read_cache.clear()
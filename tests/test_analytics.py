@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+import database
+from analytics import daily_totals, load_progress_frame, rolling_completion, streaks
+
+def frame(rows) -> pd.DataFrame:
+    dates, categories, items, completed = zip(*rows)
+    return pd.DataFrame({
+        "date": pd.to_datetime(list(dates)),
+        "category": pd.Categorical(categories),
+        "item": pd.Categorical(items),
+        "completed": np.asarray(completed, dtype=np.uint8),
+    })
+
+def test_daily_totals_fill_the_calendar_to_the_end_date():
+    totals = daily_totals(frame([("2024-03-01", "운동", "걷기", 1), ("2024-03-01", "운동", "달리기", 0),
+                                 ("2024-03-03", "수면", "7시간", 1)]), "2024-03-05")
+    assert list(totals.index.strftime("%Y-%m-%d")) == [f"2024-03-0{day}" for day in range(1, 6)]
+    assert totals["completed"].tolist() == [1, 0, 1, 0, 0]
+    assert totals["total"].tolist() == [2, 0, 1, 0, 0]
+    # 종료일이 마지막 기록보다 앞이면 마지막 기록까지 둔다.
+    assert len(daily_totals(frame([("2024-03-01", "운동", "걷기", 1), ("2024-03-03", "운동", "걷기", 1)]),
+                            "2024-03-02")) == 3
+    empty = daily_totals(frame([("2024-03-01", "운동", "걷기", 1)]).iloc[:0], "2024-03-05")
+    assert empty.empty
+
+    rates = rolling_completion(totals)
+    assert rates["daily"].iloc[0] == 0.5 and np.isnan(rates["daily"].iloc[1]) and rates["daily"].iloc[2] == 1.0
+    assert rates["rolling_7d"].iloc[-1] == 2 / 3
+
+def test_streaks():
+    def run(values):
+        return streaks(pd.Series(values, dtype=float))
+    assert run([1, 0.9, 0.5, 1, 1, 1, np.nan, 1, 0.8]) == {"current": 2, "longest": 3}
+    # 마지막 날은 아직 진행 중일 수 있어 하루 전에 끝난 연속 기록도 이어지는 것으로 본다.
+    assert run([1, 1, 0.2]) == {"current": 2, "longest": 2}
+    assert run([1, 1, 0.2, 0]) == {"current": 0, "longest": 2}
+    assert run([0.79, np.nan]) == {"current": 0, "longest": 0}
+    assert run([]) == {"current": 0, "longest": 0}
+    assert streaks(pd.Series([0.5, 0.5]), threshold=0.5) == {"current": 2, "longest": 2}
+
+def test_totals_from_stored_progress(db):
+    database.save_daily_progress("kim", "2024-03-01", {"운동": {"걷기": True, "달리기": False}})
+    database.save_daily_progress("kim", "2024-03-04", {"운동": {"걷기": True}, "수면": {"7시간": True}})
+    totals = daily_totals(load_progress_frame("kim", "2024-03-01", "2024-03-04"), "2024-03-04")
+    assert totals["completed"].tolist() == [1, 0, 0, 2]
+    assert totals["total"].tolist() == [2, 0, 0, 2]
+    history = {(row["date"], row["category"]): row["completion_rate"]
+               for row in database.get_progress_history("kim", "2024-03-01", "2024-03-04")}
+    assert history == {("2024-03-01", "운동"): 0.5, ("2024-03-04", "운동"): 1.0, ("2024-03-04", "수면"): 1.0}
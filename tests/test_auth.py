@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+import auth
+from auth import AuthBusyError, PasswordHasher, authenticate_user, configure_hasher, register_user
+from connection import connect
+
+def stored_hash(username: str) -> str:
+    with connect() as conn:
+        return conn.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+def test_login_rehashes_with_the_new_cost(db):
+    configure_hasher(rounds=4)
+    register_user("kim", "pw")
+    old = stored_hash("kim")
+    assert old.startswith("$2b$04$")
+
+    hasher = configure_hasher(rounds=5)
+    assert hasher.needs_rehash(old)
+    assert not authenticate_user("kim", "wrong")
+    assert stored_hash("kim") == old
+    assert authenticate_user("kim", "pw")
+    new = stored_hash("kim")
+    assert new.startswith("$2b$05$") and not hasher.needs_rehash(new)
+    assert authenticate_user("kim", "pw")
+    assert stored_hash("kim") == new
+    assert hasher.needs_rehash("plain-text") and hasher.needs_rehash("$2b$xx$abc")
+
+def test_full_queue_raises_auth_busy_after_the_wait(db, monkeypatch):
+    release = threading.Event()
+
+    def blocking_hashpw(password: bytes, rounds: int) -> bytes:
+        release.wait(10)
+        return b"$2b$04$" + password
+    monkeypatch.setattr(auth, "_hashpw", blocking_hashpw)
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=1, wait_timeout=0.05)
+    # 작업자 하나가 해시 중이고 하나가 대기열에 있으면 자리가 다 찬다.
+    callers = [threading.Thread(target=hasher.hash, args=("pw",)) for _ in range(2)]
+    try:
+        for caller in callers:
+            caller.start()
+        deadline = time.monotonic() + 5
+        while hasher.stats()["in_flight"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert hasher.stats()["in_flight"] == 2
+        started = time.monotonic()
+        with pytest.raises(AuthBusyError):
+            hasher.hash("pw")
+        assert time.monotonic() - started >= 0.05
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        release.set()
+        for caller in callers:
+            caller.join()
+    # 자리가 비면 다시 받아 준다.
+    assert hasher.hash("pw") == "$2b$04$pw"
+    assert hasher.stats()["completed"] == 3
+    hasher.shutdown()
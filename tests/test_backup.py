@@ -0,0 +1,105 @@
+import io
+
+import database
+from auth import configure_hasher, delete_user, register_user
+from backup import get_import_checkpoint, import_user_stream
+
+USER = "kim"
+DAY = "2024-03-10"
+
+def export_bytes() -> bytes:
+    database.save_daily_progress(USER, DAY, {"운동": {"걷기": True, "달리기": False}})
+    database.save_reflection(USER, DAY, "산책했다", "수면", "명상하기")
+    return database.export_user_data(USER).encode("utf-8")
+
+def imported(stats) -> int:
+    return sum(int(table["records"]) for table in stats.values())
+
+def test_finished_import_is_skipped_unless_restarted(db):
+    data = export_bytes()
+    assert imported(import_user_stream(USER, io.BytesIO(data), import_id="backup.json")) == 3
+    assert get_import_checkpoint(USER, "backup.json") == (3, True)
+    assert imported(import_user_stream(USER, io.BytesIO(data), import_id="backup.json")) == 0
+    assert imported(import_user_stream(USER, io.BytesIO(data), import_id="backup.json", restart=True)) == 3
+
+def test_deleting_the_account_drops_its_checkpoints(db):
+    configure_hasher(rounds=4)
+    register_user(USER, "pw")
+    data = export_bytes()
+    import_user_stream(USER, io.BytesIO(data), import_id="backup.json")
+    assert delete_user(USER, "pw")[0]
+    assert get_import_checkpoint(USER, "backup.json") == (0, False)
+    register_user(USER, "pw")
+    assert imported(import_user_stream(USER, io.BytesIO(data), import_id="backup.json")) == 3
+    assert database.get_daily_progress(USER, DAY)["운동"]["걷기"] is True
+
+def test_formats_are_detected_without_reading_a_whole_line(db, monkeypatch):
+    import gzip
+    import json
+
+    import backup
+    data = export_bytes()
+    compact = json.dumps(json.loads(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    ndjson = b"".join(backup.iter_export_bytes(USER, fmt="ndjson"))
+    # 첫 읽기가 두 번째 줄 중간에서 끝나도 잘린 줄을 이어 붙이는지 본다.
+    for read_size in (100, backup.IMPORT_READ_SIZE):
+        monkeypatch.setattr(backup, "IMPORT_READ_SIZE", read_size)
+        for payload in (data, compact, ndjson, gzip.compress(ndjson), b"\n\n" + ndjson):
+            records = list(backup._iter_records(io.BytesIO(payload), "auto"))
+            assert sorted(kind for kind, _ in records) == ["daily_progress", "daily_progress", "reflection"]
+
+def test_json_export_matches_the_previous_format(db):
+    import json
+
+    from backup import user_export_bytes
+    database.add_checklist_item(USER, "운동", "스트레칭")
+    database.save_daily_progress(USER, DAY, {"운동": {"걷기": True, "달리기": False}})
+    database.save_reflection(USER, DAY, "산책했다", "수면", "명상하기")
+    database.save_notification(USER, "물 마시기", "09:00")
+    # 예전 export_user_data는 사전을 다 만든 뒤 json.dumps(indent=2)로 한 번에 썼다.
+    expected = json.dumps({
+        "checklist_items": {"운동": ["스트레칭"]},
+        "daily_progress": {DAY: {"운동": {"걷기": True, "달리기": False}}},
+        "reflections": [{"date": DAY, "achievements": "산책했다", "improvements": "수면",
+                         "tomorrow_goals": "명상하기"}],
+        "notifications": [{"item": "물 마시기", "time": "09:00"}],
+    }, indent=2)
+    assert user_export_bytes(USER) == expected.encode("utf-8")
+    assert database.export_user_data(USER) == expected
+
+def test_ndjson_and_gzip_exports_round_trip(db):
+    import gzip
+
+    from backup import user_export_bytes
+    export_bytes()
+    database.save_notification(USER, "물 마시기", "09:00")
+    expected = database.export_user_data(USER)
+    ndjson = user_export_bytes(USER, fmt="ndjson")
+    compressed = user_export_bytes(USER, fmt="ndjson", compress=True)
+    assert gzip.decompress(compressed) == ndjson
+    for target, payload in (("copy", ndjson), ("zipped", compressed)):
+        import_user_stream(target, io.BytesIO(payload))
+        assert database.export_user_data(target) == expected
+
+def test_malformed_ndjson_header_is_a_value_error(db):
+    import pytest
+    for version in ('"2"', "null", "true", "2"):
+        payload = f'{{"type": "header", "version": {version}}}\n'.encode("utf-8")
+        with pytest.raises(ValueError, match="NDJSON 버전"):
+            import_user_stream(USER, io.BytesIO(payload), fmt="ndjson")
+
+def test_unknown_record_types_are_skipped_when_asked(db):
+    import pytest
+
+    from backup import ImportValidationError
+    payload = (b'{"type": "header", "version": 1}\n'
+               b'{"type": "mood", "score": 3}\n'
+               b'{"type": "notification", "item": "\xeb\xac\xbc", "time": "09:00"}\n'
+               b'{"type": "notification", "item": "", "time": "09:00"}\n')
+    with pytest.raises(ImportValidationError) as error:
+        import_user_stream(USER, io.BytesIO(payload))
+    assert (error.value.position, error.value.kind) == (1, "mood")
+    stats = import_user_stream(USER, io.BytesIO(payload), skip_invalid=True)
+    assert stats["unknown"]["rejected"] == 1
+    assert (stats["notifications"]["records"], stats["notifications"]["rejected"]) == (1, 1)
+    assert database.get_notifications(USER) == [{"item": "물", "time": "09:00"}]
@@ -0,0 +1,137 @@
+import threading
+
+import analytics
+import database
+from auth import configure_hasher, delete_user, register_user
+from cache import read_cache
+from connection import get_connection_stats
+
+USER = "kim"
+DAY = "2024-03-10"
+
+def save(day: str, done: bool) -> None:
+    database.save_daily_progress(USER, day, {"운동": {"걷기": done, "달리기": False}})
+
+def test_daily_progress(db):
+    save(DAY, False)
+    assert database.get_daily_progress(USER, DAY) == {"운동": {"걷기": False, "달리기": False}}
+    save(DAY, True)
+    assert database.get_daily_progress(USER, date=DAY)["운동"]["걷기"] is True
+
+def test_progress_history_positional_and_keyword(db):
+    save(DAY, False)
+    assert database.get_progress_history(USER, DAY, DAY)[0]["completion_rate"] == 0.0
+    assert database.get_progress_history(USER, start_date=DAY, end_date=DAY)[0]["completion_rate"] == 0.0
+    save(DAY, True)
+    assert database.get_progress_history(USER, DAY, DAY)[0]["completion_rate"] == 0.5
+    assert database.get_progress_history(USER, start_date=DAY, end_date=DAY)[0]["completion_rate"] == 0.5
+    assert get_connection_stats()["callback_errors"] == 0
+
+def test_keyword_calls_share_the_positional_entry(db):
+    save(DAY, False)
+    database.get_progress_history(USER, DAY, DAY)
+    hits = read_cache.stats()["hits"]
+    database.get_progress_history(username=USER, end_date=DAY, start_date=DAY)
+    assert read_cache.stats()["hits"] == hits + 1
+
+def test_progress_frame(db):
+    save(DAY, False)
+    assert analytics.load_progress_frame(USER, start_date=DAY)["completed"].sum() == 0
+    assert analytics.load_progress_frame(USER)["completed"].sum() == 0
+    save(DAY, True)
+    assert analytics.load_progress_frame(USER, start_date=DAY)["completed"].sum() == 1
+    assert analytics.load_progress_frame(USER)["completed"].sum() == 1
+
+def test_range_outside_the_write_stays_cached(db):
+    save("2024-01-01", True)
+    database.get_progress_history(USER, "2024-01-01", "2024-01-31")
+    save(DAY, True)
+    hits = read_cache.stats()["hits"]
+    database.get_progress_history(USER, start_date="2024-01-01", end_date="2024-01-31")
+    assert read_cache.stats()["hits"] == hits + 1
+
+def test_checklist(db):
+    assert "명상" not in database.get_checklist_items(USER).get("마음", [])
+    before = database.get_user_checklist(USER).as_dict()
+    database.add_checklist_item(USER, "마음", "명상")
+    assert database.get_checklist_items(USER)["마음"] == ["명상"]
+    assert "명상" in database.get_user_checklist(USER).as_dict()["마음"]
+    database.remove_checklist_item(USER, "마음", "명상")
+    assert database.get_user_checklist(USER).as_dict() == before
+
+def test_reflections(db):
+    database.save_reflection(USER, DAY, "산책했다", "수면", "명상하기")
+    assert database.get_recent_reflection(USER)["achievements"] == "산책했다"
+    assert database.search_reflections(USER, "독서하기").hits == []
+    assert database.search_reflections(USER, query="독서하기", limit=5).hits == []
+    database.save_reflection(USER, DAY, "독서하기", "수면", "명상하기")
+    assert database.get_recent_reflection(USER)["achievements"] == "독서하기"
+    assert [hit.date for hit in database.search_reflections(USER, "독서하기").hits] == [DAY]
+    assert [hit.date for hit in database.search_reflections(USER, query="독서하기", limit=5).hits] == [DAY]
+
+def test_notifications(db):
+    assert database.get_notifications(USER) == []
+    database.save_notification(USER, "물 마시기", "09:00")
+    assert database.get_notifications(USER) == [{"item": "물 마시기", "time": "09:00"}]
+    database.remove_notification(USER, "물 마시기")
+    assert database.get_notifications(USER) == []
+
+def test_import(db):
+    save(DAY, False)
+    exported = database.export_user_data(USER)
+    save(DAY, True)
+    assert database.get_daily_progress(USER, DAY)["운동"]["걷기"] is True
+    database.import_user_data(USER, exported)
+    assert database.get_daily_progress(USER, DAY)["운동"]["걷기"] is False
+
+def test_delete_user(db):
+    configure_hasher(rounds=4)
+    register_user(USER, "pw")
+    save(DAY, True)
+    database.save_notification(USER, "물 마시기", "09:00")
+    assert database.get_daily_progress(USER, DAY)
+    assert database.get_notifications(USER)
+    assert delete_user(USER, "pw")[0]
+    assert database.get_daily_progress(USER, DAY) == {}
+    assert database.get_notifications(USER) == []
+
+def test_failing_callback_does_not_skip_later_invalidations(db):
+    from connection import after_commit, transaction
+    save(DAY, False)
+    assert database.get_daily_progress(USER, DAY)["운동"]["걷기"] is False
+
+    def fail() -> None:
+        raise RuntimeError("boom")
+    with transaction(USER):
+        after_commit(fail)
+        save(DAY, True)
+    assert database.get_daily_progress(USER, DAY)["운동"]["걷기"] is True
+    assert get_connection_stats()["callback_errors"] == 1
+
+def test_concurrent_reader_sees_the_last_write(db):
+    days = [f"2024-03-{day:02d}" for day in range(1, 29)]
+    for day in days:
+        save(day, False)
+    done = threading.Event()
+    errors = []
+
+    def reader() -> None:
+        try:
+            while not done.is_set():
+                database.get_progress_history(USER, start_date=days[0], end_date=days[-1])
+                database.get_daily_progress(USER, days[-1])
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for day in days:
+            save(day, True)
+    finally:
+        done.set()
+        thread.join()
+    assert errors == []
+    history = database.get_progress_history(USER, days[0], days[-1])
+    assert [row["completion_rate"] for row in history] == [0.5] * len(days)
+    assert database.get_daily_progress(USER, days[-1])["운동"]["걷기"] is True
@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+import numpy as np
+
+import charts
+import database
+from cache import read_cache
+
+USER = "kim"
+DAY = "2024-03-10"
+
+def save(done: bool) -> None:
+    database.save_daily_progress(USER, DAY, {"운동": {"걷기": done, "달리기": False}})
+
+def rate(fig) -> float:
+    return float(fig.data[0].y[-1])
+
+def test_figure_is_reused_until_a_save(db):
+    charts.clear_figure_cache()
+    save(False)
+    fig = charts.progress_figure(USER, DAY, DAY)
+    assert charts.progress_figure(USER, DAY, DAY) is fig
+    save(True)
+    assert rate(charts.progress_figure(USER, DAY, DAY)) == 0.5
+
+def test_writes_from_another_process_show_after_the_ttl(db):
+    charts.clear_figure_cache()
+    read_cache.configure(ttl=0.05)
+    save(False)
+    assert rate(charts.progress_figure(USER, DAY, DAY)) == 0.0
+    # 다른 프로세스처럼 이 프로세스의 캐시 무효화를 거치지 않고 파일에 직접 쓴다.
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("UPDATE daily_category_rollup SET completed_count = 1 WHERE username = ?", (USER,))
+    conn.close()
+    time.sleep(0.06)
+    assert rate(charts.progress_figure(USER, DAY, DAY)) == 0.5
+
+def test_lttb_keeps_the_ends_and_the_extremes():
+    x = np.arange(2000)
+    y = np.sin(x / 50.0)
+    y[1234] = 10.0
+    picked = charts.lttb(x, y, 400)
+    assert len(picked) == 400 and picked[0] == 0 and picked[-1] == 1999
+    assert np.all(np.diff(picked) > 0)
+    assert 1234 in picked
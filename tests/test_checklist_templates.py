@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+import checklist_templates
+import database
+from checklist_templates import DEFAULT_CHECKLIST
+from connection import connect
+
+HIDDEN = ("건강 관리", "8잔 이상의 물 섭취")
+
+def template_versions() -> list:
+    with connect() as conn:
+        return [row[0] for row in conn.execute("SELECT version FROM checklist_templates ORDER BY version")]
+
+def test_changing_the_default_publishes_a_new_version(db, monkeypatch):
+    assert template_versions() == [1]
+    database.init_db()
+    assert template_versions() == [1]
+    assert database.get_user_checklist("kim").as_dict() == DEFAULT_CHECKLIST
+
+    database.add_checklist_item("kim", "운동", "걷기")
+    database.remove_checklist_item("kim", *HIDDEN)
+    changed = {category: list(items) for category, items in DEFAULT_CHECKLIST.items()}
+    changed["건강 관리"].append("저녁 산책")
+    monkeypatch.setattr(checklist_templates, "DEFAULT_CHECKLIST", changed)
+    database.init_db()
+    assert template_versions() == [1, 2]
+
+    resolved = database.get_user_checklist("kim")
+    assert resolved.template_version == 2
+    assert resolved.as_dict()["건강 관리"][-1] == "저녁 산책"
+    # 사용자의 변경분은 새 버전에도 그대로 적용된다.
+    assert HIDDEN[1] not in resolved.as_dict()["건강 관리"]
+    assert resolved.as_dict()["운동"] == ["걷기"]
+    assert database.get_user_checklist("lee").as_dict() == changed
+
+def test_hiding_and_unhiding_template_items(db):
+    database.remove_checklist_item("kim", *HIDDEN)
+    checklist = database.get_user_checklist("kim").as_dict()
+    assert HIDDEN[1] not in checklist["건강 관리"]
+    assert database.get_checklist_items("kim") == {}
+    assert database.get_user_checklist("lee").as_dict() == DEFAULT_CHECKLIST
+
+    # 다시 추가하면 템플릿의 원래 자리로 돌아온다. 직접 추가한 항목으로도 남아 내보내기에 들어간다.
+    database.add_checklist_item("kim", *HIDDEN)
+    assert database.get_user_checklist("kim").as_dict() == DEFAULT_CHECKLIST
+    assert database.get_checklist_items("kim") == {HIDDEN[0]: [HIDDEN[1]]}
+    database.remove_checklist_item("kim", *HIDDEN)
+    assert HIDDEN[1] not in database.get_user_checklist("kim").as_dict()["건강 관리"]
+    database.add_checklist_item("kim", *HIDDEN)
+
+    database.add_checklist_item("kim", "운동", "걷기")
+    assert database.get_checklist_items("kim") == {HIDDEN[0]: [HIDDEN[1]], "운동": ["걷기"]}
+    # 직접 추가한 항목은 숨기지 않고 지운다.
+    database.remove_checklist_item("kim", "운동", "걷기")
+    database.remove_checklist_item("kim", "운동", "없는 항목")
+    assert database.get_checklist_items("kim") == {HIDDEN[0]: [HIDDEN[1]]}
+    assert database.get_user_checklist("kim").as_dict() == DEFAULT_CHECKLIST
+    with connect("kim") as conn:
+        assert conn.execute("SELECT item_id, hidden FROM checklist_overrides").fetchall() == [
+            (conn.execute("SELECT bit FROM progress_items WHERE category = ? AND item = ?", HIDDEN).fetchone()[0], 0)]
+
+def test_users_with_the_same_overrides_share_one_checklist(db):
+    for username in ("kim", "lee"):
+        database.remove_checklist_item(username, *HIDDEN)
+    assert database.get_user_checklist("kim") is database.get_user_checklist("lee")
+    assert database.get_user_checklist("kim") is not database.get_user_checklist("park")
+
+def test_checklist_items_rows_move_to_overrides(legacy_db):
+    conn = sqlite3.connect(legacy_db)
+    conn.executemany("INSERT INTO checklist_items (username, category, item) VALUES (?, ?, ?)", [
+        ("kim", "운동", "달리기"), ("lee", "운동", "걷기"), ("kim", "운동", "걷기"),
+        ("kim", "건강 관리", "8잔 이상의 물 섭취"), ("kim", "독서", "시 한 편"),
+    ])
+    conn.commit()
+    conn.close()
+    database.init_db()
+
+    assert database.get_checklist_items("kim") == {
+        "건강 관리": ["8잔 이상의 물 섭취"], "독서": ["시 한 편"], "운동": ["달리기", "걷기"]}
+    assert database.get_checklist_items("lee") == {"운동": ["걷기"]}
+    resolved = database.get_user_checklist("kim").as_dict()
+    # 템플릿에 이미 있는 항목은 한 번만 나온다.
+    assert resolved["건강 관리"] == DEFAULT_CHECKLIST["건강 관리"]
+    assert resolved["운동"] == ["달리기", "걷기"] and resolved["독서"] == ["시 한 편"]
+    with connect() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("SELECT 1 FROM checklist_items")
+        assert conn.execute("""SELECT COUNT(*) FROM progress_items
+                               WHERE category = '운동' AND item = '걷기'""").fetchone()[0] == 1
@@ -0,0 +1,51 @@
+import pytest
+
+import cohort
+import database
+import progress_bits
+from benchmarks.datagen import DatasetSpec, generate_dataset, username
+from connection import connect
+
+SPEC = DatasetSpec(users=11, years=1, categories=3, items_per_category=3, reflection_ratio=0.0,
+                   notifications_per_user=0, end_date="2024-03-06")
+
+@pytest.fixture
+def cohort_db(db):
+    generate_dataset(SPEC, password_hash="x")
+    yield db
+    progress_bits.set_progress_format("rows")
+
+def tables() -> tuple:
+    with connect() as conn:
+        return (sorted(conn.execute("SELECT * FROM cohort_category_days").fetchall()),
+                sorted(conn.execute("SELECT * FROM cohort_user_weeks").fetchall()))
+
+def test_bits_aggregates_match_rows(cohort_db):
+    result = cohort.refresh(workers=1, chunk_users=4)
+    assert (result["mode"], result["chunks"], result["high_water"]) == ("full", 3, SPEC.end_date)
+    rows = tables()
+    with connect() as conn:
+        assert rows[0] == sorted(conn.execute("""SELECT date, category, SUM(completed_count), SUM(total_count), COUNT(*)
+                                                 FROM daily_category_rollup GROUP BY date, category""").fetchall())
+    report = cohort.report(weeks=4)
+
+    progress_bits.convert("bits")
+    progress_bits.set_progress_format("bits")
+    # 저장 형식이 바뀌면 증분 갱신 대신 전체를 다시 읽는다.
+    assert cohort.refresh(workers=1, chunk_users=4)["mode"] == "full"
+    assert tables() == rows
+    assert cohort.report(weeks=4) == report
+
+def test_incremental_refresh_matches_a_full_one(cohort_db):
+    for fmt in progress_bits.FORMATS:
+        progress_bits.convert(fmt)
+        progress_bits.set_progress_format(fmt)
+        cohort.refresh(full=True, workers=1, chunk_users=4)
+        # 새 날짜 하나와 되돌아보는 기간 안의 옛 날짜 수정
+        database.save_daily_progress(username(1), "2024-03-07", {"카테고리0": {"항목0-0": True, "항목0-1": False}})
+        database.save_daily_progress(username(2), "2024-03-04", {"카테고리1": {"항목1-0": False, "항목1-1": False}})
+        result = cohort.refresh(workers=1, chunk_users=4)
+        assert (result["mode"], result["from"], result["high_water"]) == ("incremental", "2024-02-26", "2024-03-07")
+        incremental = tables()
+        cohort.refresh(full=True, workers=1, chunk_users=4)
+        assert tables() == incremental
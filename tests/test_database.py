@@ -0,0 +1,44 @@
+import json
+
+import database
+from connection import transaction
+
+USER = "kim"
+DAY = "2024-03-10"
+
+def test_save_daily_progress_counts_each_row(db):
+    progress = {"운동": {"걷기": True, "달리기": False, "수영": False}, "수면": {"7시간": True}}
+    assert database.save_daily_progress(USER, DAY, progress, chunk_size=3) == {
+        "inserted": 4, "updated": 0, "skipped": 0}
+    assert database.save_daily_progress(USER, DAY, progress, chunk_size=3) == {
+        "inserted": 0, "updated": 0, "skipped": 4}
+    progress["운동"]["달리기"] = True
+    progress["수면"]["명상"] = False
+    assert database.save_daily_progress(USER, DAY, progress, chunk_size=2) == {
+        "inserted": 1, "updated": 1, "skipped": 3}
+    assert database.get_daily_progress(USER, DAY) == progress
+    assert database.get_progress_history(USER, DAY, DAY) == [
+        {"date": DAY, "category": "수면", "completion_rate": 0.5},
+        {"date": DAY, "category": "운동", "completion_rate": 2 / 3}]
+
+def test_repeated_rows_in_one_chunk_keep_the_last_value(db):
+    rows = [(DAY, "운동", "걷기", 1), (DAY, "운동", "걷기", 1), (DAY, "운동", "걷기", 0)]
+    with transaction(USER) as conn:
+        stats = database.write_progress_rows(conn, USER, rows)
+    assert stats == {"inserted": 1, "updated": 1, "skipped": 1}
+    assert database.get_daily_progress(USER, DAY) == {"운동": {"걷기": False}}
+
+def test_import_reports_progress_write_counts(db):
+    data = json.dumps({
+        "checklist_items": {},
+        "daily_progress": {DAY: {"운동": {"걷기": True, "달리기": False}}, "2024-03-11": {"운동": {"걷기": False}}},
+        "reflections": [],
+        "notifications": [],
+    })
+    stats = database.import_user_data(USER, data, chunk_size=2)
+    assert {key: stats["daily_progress"][key] for key in ("records", "inserted", "updated", "skipped")} == {
+        "records": 3, "inserted": 3, "updated": 0, "skipped": 0}
+    stats = database.import_user_data(USER, data.replace("false", "true"))
+    assert {key: stats["daily_progress"][key] for key in ("records", "inserted", "updated", "skipped")} == {
+        "records": 3, "inserted": 0, "updated": 2, "skipped": 1}
+    assert database.get_daily_progress(USER, "2024-03-11") == {"운동": {"걷기": True}}
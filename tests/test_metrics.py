@@ -0,0 +1,34 @@
+import json
+import os
+import threading
+
+import metrics
+
+def test_concurrent_writers_do_not_race_on_the_temp_file(tmp_path):
+    path = str(tmp_path / "metrics.json")
+    errors = []
+
+    def write() -> None:
+        try:
+            for _ in range(50):
+                metrics.write_metrics(path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    json.loads(open(path, encoding="utf-8").read())
+    assert os.listdir(tmp_path) == ["metrics.json"]
+
+def test_export_failure_does_not_break_the_rerun(tmp_path):
+    metrics.enable_metrics(export_path=str(tmp_path / "missing" / "metrics.json"))
+    try:
+        with metrics.rerun() as breakdown:
+            pass
+        assert breakdown == []
+    finally:
+        metrics.disable_metrics()
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+import connection
+import database
+import progress_bits
+from migrations import SCHEMA_VERSION, get_schema_version, migrate
+
+def test_migrate_reaches_the_latest_version(db):
+    assert migrate() == SCHEMA_VERSION
+    with connection.connect() as conn:
+        assert get_schema_version(conn) == SCHEMA_VERSION
+
+def test_hot_queries_use_indexes(db):
+    assert database.find_unindexed_queries() == {}
+
+def test_hot_queries_are_the_queries_the_reads_run(db, monkeypatch):
+    monkeypatch.setattr(progress_bits, "PROGRESS_FORMAT", "rows")
+    executed = []
+    with connection.connect() as conn:
+        conn.set_trace_callback(executed.append)
+        try:
+            database.get_daily_progress("kim", "2024-03-10")
+            database.get_progress_history("kim", "2024-03-01", "2024-03-10")
+            database.get_recent_reflection("kim")
+            database.get_notifications("kim")
+            database.get_checklist_items("kim")
+            database.get_user_checklist("kim")
+        finally:
+            conn.set_trace_callback(None)
+    statements = "\n".join(executed)
+    for name in ("get_daily_progress", "get_progress_history", "get_recent_reflection", "get_notifications",
+                 "get_checklist_items", "get_user_checklist", "latest_template"):
+        sql = database.HOT_QUERIES[name]
+        assert sql.split("?")[0] in statements, name
+
+def test_duplicate_rows_from_the_original_schema_keep_the_latest(legacy_db):
+    conn = sqlite3.connect(legacy_db)
+    # 예전 INSERT OR REPLACE는 고유 키가 없어 저장할 때마다 행을 하나씩 더 쌓았다.
+    conn.executemany("INSERT INTO daily_progress (username, date, category, item, completed) VALUES (?, ?, ?, ?, ?)", [
+        ("kim", "2024-03-10", "운동", "걷기", 1),
+        ("kim", "2024-03-10", "운동", "걷기", 0),
+        ("kim", "2024-03-10", "운동", "달리기", 0),
+        ("lee", "2024-03-10", "운동", "걷기", 0),
+        ("kim", "2024-03-10", "운동", "달리기", 1),
+        ("lee", "2024-03-10", "운동", "걷기", 1),
+    ])
+    conn.executemany("INSERT INTO reflections (username, date, achievements, improvements, tomorrow_goals) "
+                     "VALUES (?, ?, ?, ?, ?)", [("kim", "2024-03-10", "처음", "", ""), ("kim", "2024-03-10", "나중", "", "")])
+    conn.commit()
+    conn.close()
+
+    database.init_db()
+    with connection.connect() as conn:
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        assert sorted(conn.execute("SELECT username, item, completed FROM daily_progress").fetchall()) == [
+            ("kim", "걷기", 0), ("kim", "달리기", 1), ("lee", "걷기", 1)]
+        indexes = {row[1]: row[2] for row in conn.execute("PRAGMA index_list(daily_progress)")}
+        assert indexes["idx_daily_progress_key"] == 1
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO daily_progress (username, date, category, item, completed) "
+                         "VALUES ('kim', '2024-03-10', '운동', '걷기', 1)")
+    assert database.get_daily_progress("kim", "2024-03-10") == {"운동": {"걷기": False, "달리기": True}}
+    assert database.get_recent_reflection("kim")["achievements"] == "나중"
+    assert database.get_progress_history("lee", "2024-03-10", "2024-03-10") == [
+        {"date": "2024-03-10", "category": "운동", "completion_rate": 1.0}]
@@ -0,0 +1,118 @@
+from typing import Dict, List
+
+import pytest
+
+import database
+import progress_bits
+from cache import read_cache
+from checklist_templates import DEFAULT_CHECKLIST, DEFAULT_TEMPLATE, publish_template
+from connection import connect, get_pool, transaction
+
+USER = "kim"
+DAYS = [f"2024-03-{day:02d}" for day in range(1, 11)]
+NEW_TEMPLATE_ITEM = ("건강 관리", "저녁 산책")
+ADDED_ITEM = ("운동", "플랭크 1분")
+HIDDEN_ITEM = ("건강 관리", "8잔 이상의 물 섭취")
+
+@pytest.fixture
+def formats(db):
+    yield
+    progress_bits.set_progress_format("rows")
+
+def checklist_day(username: str, day: int) -> Dict[str, Dict[str, bool]]:
+    checklist = database.get_user_checklist(username).as_dict()
+    return {category: {item: (day + n) % 3 != 0 for n, item in enumerate(items)}
+            for category, items in checklist.items()}
+
+def save_range(username: str) -> None:
+    """Ten days of saves while the template gains an item and the user adds one and hides another."""
+    for day, date in enumerate(DAYS):
+        if day == 3:
+            with transaction(username) as conn:
+                checklist = {category: list(items) for category, items in DEFAULT_CHECKLIST.items()}
+                checklist[NEW_TEMPLATE_ITEM[0]].append(NEW_TEMPLATE_ITEM[1])
+                publish_template(conn, get_pool(username).db_name, DEFAULT_TEMPLATE, checklist)
+        if day == 5:
+            database.add_checklist_item(username, *ADDED_ITEM)
+        if day == 7:
+            database.remove_checklist_item(username, *HIDDEN_ITEM)
+        database.save_daily_progress(username, date, checklist_day(username, day))
+
+def reads(username: str) -> tuple:
+    read_cache.clear()
+    return ([database.get_daily_progress(username, date) for date in DAYS],
+            database.get_progress_history(username, DAYS[0], DAYS[-1]),
+            database.get_progress_history(username, DAYS[2], DAYS[6]),
+            database.export_user_data(username))
+
+def test_pack_round_trip():
+    for mask in (0, 1, 0b1011, 1 << 7, 1 << 8, (1 << 130) | 5):
+        assert progress_bits.unpack(progress_bits.pack(mask)) == mask
+    assert progress_bits.pack(0) == b""
+    assert progress_bits.unpack(None) == 0
+
+def test_write_chunk_counts_and_decodes(db):
+    rows: List[progress_bits.ProgressRow] = [(DAYS[0], "운동", "걷기", 1), (DAYS[0], "운동", "달리기", 0),
+                                             (DAYS[1], "수면", "7시간", 1)]
+    with transaction(USER) as conn:
+        stats, changed = progress_bits.write_chunk(conn, USER, rows)
+    assert stats == {"inserted": 3, "updated": 0, "skipped": 0}
+    assert changed == {DAYS[0], DAYS[1]}
+    with transaction(USER) as conn:
+        stats, changed = progress_bits.write_chunk(conn, USER, [(DAYS[0], "운동", "걷기", 1),
+                                                                (DAYS[0], "운동", "달리기", 1),
+                                                                (DAYS[0], "운동", "수영", 0)])
+    assert stats == {"inserted": 1, "updated": 1, "skipped": 1}
+    assert changed == {DAYS[0]}
+    with connect(USER) as conn:
+        assert progress_bits.load_day(conn, USER, DAYS[0]) == {"운동": {"걷기": True, "달리기": True, "수영": False}}
+        assert progress_bits.load_day(conn, USER, DAYS[2]) == {}
+        current = progress_bits.definition(conn, USER)
+        saved, completed = 0, 0
+        for category, item, done in (("운동", "걷기", True), ("수면", "7시간", False)):
+            bit = 1 << current.bits[(category, item)]
+            saved |= bit
+            completed |= bit if done else 0
+        assert progress_bits.decode(current, saved, completed) == {"운동": {"걷기": True}, "수면": {"7시간": False}}
+        assert list(progress_bits.iter_rows(conn, USER, 2)) == [
+            (DAYS[0], "운동", "걷기", 1), (DAYS[0], "운동", "달리기", 1), (DAYS[0], "운동", "수영", 0),
+            (DAYS[1], "수면", "7시간", 1)]
+
+def test_converting_keeps_every_read(formats):
+    save_range(USER)
+    history = database.get_progress_history(USER, DAYS[0], DAYS[-1])
+    # 중간에 생긴 항목과 숨긴 항목이 실제로 범위 안에서 달라졌는지 확인한다.
+    assert NEW_TEMPLATE_ITEM[1] not in database.get_daily_progress(USER, DAYS[2])["건강 관리"]
+    assert NEW_TEMPLATE_ITEM[1] in database.get_daily_progress(USER, DAYS[3])["건강 관리"]
+    assert ADDED_ITEM[0] in database.get_daily_progress(USER, DAYS[5])
+    assert HIDDEN_ITEM[1] not in database.get_daily_progress(USER, DAYS[7])["건강 관리"]
+    assert {row["category"] for row in history} >= {ADDED_ITEM[0]}
+    rows = reads(USER)
+
+    assert progress_bits.convert("bits") == {"users": 1, "rows": sum(
+        len(items) for day in rows[0] for items in day.values())}
+    progress_bits.set_progress_format("bits")
+    assert progress_bits.status()["daily_progress"] == 0
+    assert reads(USER) == rows
+
+    progress_bits.convert("rows")
+    progress_bits.set_progress_format("rows")
+    assert progress_bits.status()["daily_progress_bits"] == 0
+    assert reads(USER) == rows
+
+def test_saves_agree_in_both_formats(formats):
+    stats = {}
+    for fmt in progress_bits.FORMATS:
+        progress_bits.set_progress_format(fmt)
+        username = f"{fmt}_user"
+        first = checklist_day(username, 0)
+        second = {category: {item: not done for item, done in items.items()} for category, items in first.items()}
+        second["건강 관리"]["저녁 산책"] = True
+        stats[fmt] = [database.save_daily_progress(username, DAYS[0], first),
+                      database.save_daily_progress(username, DAYS[0], first),
+                      database.save_daily_progress(username, DAYS[0], second),
+                      database.save_daily_progress(username, DAYS[1], first)]
+        stats[fmt + " reads"] = reads(username)
+    assert stats["rows"] == stats["bits"]
+    assert stats["rows reads"][0][0]["건강 관리"]["저녁 산책"] is True
+    assert stats["rows reads"] == stats["bits reads"]
@@ -0,0 +1,46 @@
+import database
+
+USER = "kim"
+
+def save_days(days, text="아침 산책 명상하기"):
+    for day in days:
+        database.save_reflection(USER, f"2024-01-{day:02d}", f"{text} {'산책 ' * (day % 4)}", "수면", "")
+
+def pages(query, limit, between=None):
+    seen, cursor = [], None
+    while True:
+        page = database.search_reflections(USER, query, limit, cursor)
+        seen += [hit.date for hit in page.hits]
+        if page.next_cursor is None:
+            return seen
+        cursor = page.next_cursor
+        if between is not None:
+            between()
+            between = None
+
+def test_ranked_pages_cover_every_match_once(db):
+    save_days(range(1, 26))
+    assert sorted(pages("산책 명상하기", 4)) == [f"2024-01-{day:02d}" for day in range(1, 26)]
+
+def test_saves_between_pages_do_not_skip_or_repeat(db):
+    save_days(range(1, 26))
+    before = pages("산책 명상하기", 4)
+    # 첫 페이지를 본 뒤 새 성찰이 저장되어 문서 수와 평균 길이가 바뀌어도 같은 순서로 이어진다.
+    after = pages("산책 명상하기", 4, between=lambda: save_days(range(26, 31), "산책 " * 20 + "명상하기"))
+    assert after == before
+
+def test_cursor_size_does_not_grow_with_the_page(db):
+    save_days(range(1, 26))
+    cursors = []
+    page = database.search_reflections(USER, "산책 명상하기", 3)
+    while page.next_cursor is not None:
+        cursors.append(page.next_cursor)
+        page = database.search_reflections(USER, "산책 명상하기", 3, page.next_cursor)
+    assert len(cursors) == 8
+    # 커서는 마지막으로 보인 결과와 첫 페이지의 통계만 가져서 캐시 키도 페이지마다 같은 크기다.
+    assert {cursor.ranking for cursor in cursors} == {cursors[0].ranking}
+    assert len(cursors[0].ranking.doc_freq) == 2
+
+def test_short_terms_page_by_date(db):
+    save_days(range(1, 26))
+    assert pages("수면", 7) == [f"2024-01-{day:02d}" for day in range(25, 0, -1)]
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+
+import database
+import reminders
+from auth import configure_hasher, delete_user, register_user
+from connection import transaction
+from reminders import Reminder, ReminderScheduler
+
+START = datetime(2024, 3, 10, 8, 0).timestamp()
+
+def at(day: int, hour: int, minute: int = 0) -> float:
+    return datetime(2024, 3, day, hour, minute).timestamp()
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = START
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+@pytest.fixture
+def fired() -> list:
+    return []
+
+@pytest.fixture
+def scheduler(db, clock, fired, monkeypatch):
+    scheduler = ReminderScheduler(fired.append, clock=clock)
+    # 저장·삭제 훅이 이 스케줄러로 가게 한다. 작업 스레드는 띄우지 않고 run_pending을 직접 부른다.
+    monkeypatch.setattr(reminders, "_scheduler", scheduler)
+    return scheduler
+
+def test_load_schedules_stored_reminders_and_skips_invalid_times(scheduler, clock):
+    database.save_notification("kim", "물 마시기", "09:00")
+    database.save_notification("kim", "스트레칭", "07:30")
+    database.save_notification("lee", "물 마시기", "09:00")
+    with transaction("kim") as conn:
+        conn.executemany("INSERT INTO notifications (username, item, time) VALUES (?, ?, ?)",
+                         [("kim", "잘못된 시각", "25:99"), ("kim", "형식 오류", "9시"), ("kim", "빈 시각", None)])
+    assert scheduler.load() == 3
+    assert scheduler.stats()["invalid"] == 3
+    assert scheduler.next_due() in (Reminder("kim", "물 마시기", "09:00", at(10, 9)),
+                                    Reminder("lee", "물 마시기", "09:00", at(10, 9)))
+    clock.now = at(10, 9)
+    assert scheduler.run_pending() == 2
+    # 이미 지난 07:30은 다음 날로 잡힌다.
+    assert scheduler.next_due() == Reminder("kim", "스트레칭", "07:30", at(11, 7, 30))
+
+def test_saves_and_removals_update_the_schedule(scheduler):
+    configure_hasher(rounds=4)
+    register_user("kim", "pw")
+    scheduler.load()
+    database.save_notification("kim", "물 마시기", "09:00")
+    database.save_notification("kim", "스트레칭", "08:30")
+    database.save_notification("lee", "독서", "21:00")
+    assert scheduler.stats()["scheduled"] == 3
+    assert scheduler.next_due() == Reminder("kim", "스트레칭", "08:30", at(10, 8, 30))
+
+    database.remove_notification("kim", "스트레칭")
+    assert scheduler.next_due() == Reminder("kim", "물 마시기", "09:00", at(10, 9))
+    assert delete_user("kim", "pw")[0]
+    assert scheduler.next_due() == Reminder("lee", "독서", "21:00", at(10, 21))
+    assert scheduler.stats()["scheduled"] == 1
+
+    # 롤백된 저장은 예약되지 않는다.
+    with pytest.raises(RuntimeError):
+        with transaction("lee") as conn:
+            conn.execute("INSERT INTO notifications (username, item, time) VALUES (?, ?, ?)", ("lee", "산책", "10:00"))
+            reminders.reminder_saved("lee", "산책", "10:00")
+            raise RuntimeError
+    assert scheduler.stats()["scheduled"] == 1
+
+def test_fired_reminders_come_back_the_next_day(scheduler, clock, fired):
+    scheduler.add("kim", "물 마시기", "09:00")
+    scheduler.add("kim", "물 마시기", "09:00")
+    assert scheduler.run_pending() == 0
+    clock.now = at(10, 9, 5)
+    assert scheduler.run_pending() == 1
+    assert fired == [Reminder("kim", "물 마시기", "09:00", at(10, 9))]
+    assert scheduler.run_pending() == 0
+    assert scheduler.next_due() == Reminder("kim", "물 마시기", "09:00", at(11, 9))
+    clock.now = at(11, 9)
+    assert scheduler.run_pending() == 1
+    assert scheduler.stats()["fired"] == 2
+    assert scheduler.stats()["scheduled"] == 1
+
+def test_invalid_times_are_counted_not_scheduled(scheduler):
+    for time in ("24:00", "9시", "", None):
+        scheduler.add("kim", "물 마시기", time)
+    assert scheduler.stats()["invalid"] == 4
+    assert scheduler.next_due() is None
+
+def test_a_failing_sink_does_not_stop_the_others(clock):
+    fired = []
+
+    def sink(reminder: Reminder) -> None:
+        if reminder.username == "kim":
+            raise RuntimeError("전송 실패")
+        fired.append(reminder.username)
+    scheduler = ReminderScheduler(sink, clock=clock)
+    scheduler.add("kim", "물 마시기", "09:00")
+    scheduler.add("lee", "물 마시기", "09:00")
+    clock.now = at(10, 9)
+    assert scheduler.run_pending() == 2
+    assert fired == ["lee"]
+    assert scheduler.stats()["errors"] == 1
@@ -0,0 +1,41 @@
+import database
+from connection import transaction
+from rollup import check_rollup, rebuild_rollup
+
+DAY = "2024-03-10"
+
+def save(username: str) -> None:
+    database.save_daily_progress(username, DAY, {"운동": {"걷기": True, "달리기": False}, "수면": {"7시간": True}})
+    database.save_daily_progress(username, "2024-03-11", {"운동": {"걷기": False}})
+
+def test_writes_keep_the_rollup_in_step(db):
+    save("kim")
+    save("lee")
+    database.save_daily_progress("kim", DAY, {"운동": {"달리기": True}})
+    assert check_rollup() == []
+    assert database.get_progress_history("kim", DAY, "2024-03-11") == [
+        {"date": DAY, "category": "수면", "completion_rate": 1.0},
+        {"date": DAY, "category": "운동", "completion_rate": 1.0},
+        {"date": "2024-03-11", "category": "운동", "completion_rate": 0.0}]
+
+def test_check_finds_and_rebuild_repairs_drift(db):
+    save("kim")
+    save("lee")
+    with transaction() as conn:
+        # 집계를 거치지 않은 직접 수정, 지워진 집계 행, 원본 없는 집계 행
+        conn.execute("UPDATE daily_progress SET completed = 1 WHERE username = 'kim' AND item = '달리기'")
+        conn.execute("DELETE FROM daily_category_rollup WHERE username = 'kim' AND category = '수면'")
+        conn.execute("INSERT INTO daily_category_rollup VALUES ('lee', '2024-01-01', '운동', 1, 1)")
+    mismatches = check_rollup()
+    assert [(m["username"], m["date"], m["category"], m["expected"], m["actual"]) for m in mismatches] == [
+        ("kim", DAY, "수면", (1, 1), None),
+        ("kim", DAY, "운동", (2, 2), (1, 2)),
+        ("lee", "2024-01-01", "운동", None, (1, 1)),
+    ]
+    assert [m["username"] for m in check_rollup("lee")] == ["lee"]
+
+    assert rebuild_rollup("kim") == 3
+    assert check_rollup("kim") == []
+    assert len(check_rollup()) == 1
+    assert rebuild_rollup() == 6
+    assert check_rollup() == []
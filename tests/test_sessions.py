@@ -0,0 +1,130 @@
+import hashlib
+
+import pytest
+
+import auth
+import sessions
+from connection import connect, transaction
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(db, monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(sessions, "time", fake)
+    sessions._hot.clear()
+    yield fake
+    sessions._hot.clear()
+
+def stored_expiry(token: str) -> float:
+    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    with connect() as conn:
+        row = conn.execute("SELECT expires_at FROM sessions WHERE token_hash = ?", (token_hash,)).fetchone()
+    return row[0] if row else None
+
+def test_only_the_token_hash_is_stored(clock):
+    token = sessions.create_session("kim")
+    with connect() as conn:
+        rows = conn.execute("SELECT token_hash, username FROM sessions").fetchall()
+    assert rows == [(hashlib.sha256(token.encode("utf-8")).hexdigest(), "kim")]
+    assert sessions.validate_session(token + "x") is None
+    assert sessions.validate_session("") is None
+
+def test_sessions_expire(clock):
+    token = sessions.create_session("kim", ttl=100)
+    clock.now += 50
+    assert sessions.validate_session(token, ttl=100) == "kim"
+    clock.now += 51
+    assert sessions.validate_session(token, ttl=100) is None
+    # 메모리에 없을 때는 DB의 만료 시각으로 거절한다.
+    other = sessions.create_session("lee", ttl=100)
+    sessions._hot.clear()
+    clock.now += 101
+    assert sessions.validate_session(other, ttl=100) is None
+
+def test_expiry_slides_only_after_the_renew_interval(clock):
+    start = clock.now
+    token = sessions.create_session("kim", ttl=1000)
+    clock.now += sessions.RENEW_INTERVAL_SECONDS - 1
+    assert sessions.validate_session(token, ttl=1000) == "kim"
+    assert stored_expiry(token) == start + 1000
+    clock.now = start + 400
+    assert sessions.validate_session(token, ttl=1000) == "kim"
+    assert stored_expiry(token) == start + 1400
+    clock.now = start + 1200
+    assert sessions.validate_session(token, ttl=1000) == "kim"
+
+def test_revocation_elsewhere_is_seen_within_the_renew_interval(clock):
+    token = sessions.create_session("kim")
+    # 다른 프로세스가 지운 세션은 메모리 상태가 RENEW_INTERVAL_SECONDS보다 오래되면 거절된다.
+    with transaction() as conn:
+        conn.execute("DELETE FROM sessions")
+    clock.now += sessions.RENEW_INTERVAL_SECONDS - 1
+    assert sessions.validate_session(token) == "kim"
+    clock.now += 1
+    assert sessions.validate_session(token) is None
+
+def test_revoke_user_sessions_keeps_one_token(clock):
+    kept, *others = [sessions.create_session("kim") for _ in range(3)]
+    neighbour = sessions.create_session("lee")
+    assert sessions.revoke_user_sessions("kim", keep_token=kept) == 2
+    assert [sessions.validate_session(token) for token in others] == [None, None]
+    sessions._hot.clear()
+    assert sessions.validate_session(kept) == "kim"
+    assert sessions.validate_session(neighbour) == "lee"
+    assert sessions.revoke_user_sessions("kim") == 1
+    assert sessions.validate_session(kept) is None
+
+def test_purge_deletes_expired_sessions_in_batches(clock, monkeypatch):
+    expired = [sessions.create_session(f"user{n}", ttl=10) for n in range(7)]
+    live = [sessions.create_session("kim", ttl=1000) for _ in range(2)]
+    clock.now += 20
+    transactions = []
+
+    def counting_transaction(*args):
+        transactions.append(args)
+        return transaction(*args)
+    monkeypatch.setattr(sessions, "transaction", counting_transaction)
+    assert sessions.purge_expired_sessions(batch_size=3) == 7
+    assert len(transactions) == 3
+    assert sessions.count_sessions() == {"stored": 2, "hot": 2}
+    assert [sessions.validate_session(token) for token in expired] == [None] * 7
+    assert [sessions.validate_session(token) for token in live] == ["kim", "kim"]
+
+def test_confirm_identity_skips_bcrypt_for_the_users_own_session(clock, monkeypatch):
+    auth.configure_hasher(rounds=4)
+    auth.register_user("kim", "pw")
+    token = sessions.create_session("kim", ttl=100)
+    checks = []
+    authenticate = auth.authenticate_user
+
+    def counting_authenticate(username: str, password: str) -> bool:
+        checks.append(username)
+        return authenticate(username, password)
+    monkeypatch.setattr(auth, "authenticate_user", counting_authenticate)
+
+    assert auth._confirm_identity("kim", None, token)
+    assert checks == []
+    # 다른 사용자의 토큰으로는 본인 확인이 되지 않고 비밀번호 검증으로 넘어간다.
+    assert not auth._confirm_identity("lee", None, token)
+    assert not auth._confirm_identity("lee", "pw", token)
+    assert checks == ["lee"]
+    clock.now += 101
+    assert not auth._confirm_identity("kim", None, token)
+    assert not auth._confirm_identity("kim", "wrong", token)
+    assert auth._confirm_identity("kim", "pw", token)
+    assert checks == ["lee", "kim", "kim"]
+
+def test_password_change_by_session_revokes_the_other_sessions(clock):
+    auth.configure_hasher(rounds=4)
+    auth.register_user("kim", "pw")
+    current, other = sessions.create_session("kim"), sessions.create_session("kim")
+    assert auth.change_password("kim", None, "new-pw", session_token=current)[0]
+    assert sessions.validate_session(current) == "kim"
+    assert sessions.validate_session(other) is None
+    assert auth.authenticate_user("kim", "new-pw")
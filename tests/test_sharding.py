@@ -0,0 +1,77 @@
+import io
+import os
+import sqlite3
+
+import database
+import sharding
+from auth import configure_hasher, delete_user, register_user
+from backup import import_user_stream
+from cache import read_cache
+from connection import shard_index, shard_path
+
+USERS = [f"user{n}" for n in range(8)]
+
+def fill(username: str, n: int) -> None:
+    register_user(username, "pw")
+    database.add_checklist_item(username, "운동", f"걷기 {n}")
+    database.remove_checklist_item(username, "건강 관리", "8잔 이상의 물 섭취")
+    database.save_daily_progress(username, "2024-03-01", {"운동": {f"걷기 {n}": True, "달리기": n % 2 == 0}})
+    database.save_daily_progress(username, "2024-03-02", {"운동": {f"걷기 {n}": False}})
+    database.save_reflection(username, "2024-03-01", f"산책 {n}", "수면", "명상")
+    database.save_notification(username, "물 마시기", "09:00")
+    database.save_notification(username, "스트레칭", "21:00")
+    import_user_stream(username, io.StringIO('{"notifications": []}'), import_id="empty.json")
+
+def snapshot() -> dict:
+    read_cache.clear()
+    return {username: (database.export_user_data(username),
+                       database.get_user_checklist(username).as_dict(),
+                       database.get_progress_history(username, "2024-03-01", "2024-03-02"),
+                       [hit.date for hit in database.search_reflections(username, "산책").hits])
+            for username in USERS}
+
+def user_rows(path: str, username: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return sum(conn.execute(f"SELECT COUNT(*) FROM {table} WHERE username = ?", (username,)).fetchone()[0]
+                   for table in sharding.USER_TABLES)
+    finally:
+        conn.close()
+
+def test_rebalancing_keeps_every_export(db):
+    configure_hasher(rounds=4)
+    for n, username in enumerate(USERS):
+        fill(username, n)
+    before = snapshot()
+    assert all(dates == ["2024-03-01"] for *_, dates in before.values())
+
+    moved = sharding.rebalance(db, 4)
+    assert moved["daily_progress"] == 3 * len(USERS)
+    assert moved["notifications"] == 2 * len(USERS)
+    assert all(user_rows(db, username) == 0 for username in USERS)
+    for username in USERS:
+        assert user_rows(shard_path(db, shard_index(username, 4)), username) > 0
+    assert len({shard_index(username, 4) for username in USERS}) > 1
+    assert snapshot() == before
+    assert sum(row["users"] for row in sharding.status(db, 4)) == len(USERS)
+
+    sharding.rebalance(db, 1, from_shards=4)
+    assert all(user_rows(shard_path(db, index), username) == 0 for index in range(4) for username in USERS)
+    assert snapshot() == before
+
+def test_delete_user_empties_the_users_shard(db):
+    configure_hasher(rounds=4)
+    sharding.rebalance(db, 4)
+    for n, username in enumerate(USERS):
+        fill(username, n)
+    victim, survivor = USERS[0], next(u for u in USERS[1:] if shard_index(u, 4) == shard_index(USERS[0], 4))
+    path = shard_path(db, shard_index(victim, 4))
+    assert os.path.exists(path) and user_rows(path, victim) > 0
+
+    assert delete_user(victim, "pw")[0]
+    assert user_rows(path, victim) == 0
+    assert user_rows(path, survivor) > 0
+    assert all(user_rows(shard_path(db, index), victim) == 0 for index in range(4))
+    read_cache.clear()
+    assert database.get_daily_progress(victim, "2024-03-01") == {}
+    assert database.get_daily_progress(survivor, "2024-03-01") != {}
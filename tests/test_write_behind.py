@@ -0,0 +1,22 @@
+import database
+import write_behind
+
+USER = "kim"
+DAY = "2024-03-10"
+
+def test_disable_flushes_queued_saves(db):
+    write_behind.enable_write_behind(interval=60)
+    database.save_daily_progress(USER, DAY, {"운동": {"걷기": True}})
+    assert database.get_daily_progress(USER, DAY) == {"운동": {"걷기": True}}
+    write_behind.disable_write_behind()
+    assert database.get_daily_progress(USER, DAY) == {"운동": {"걷기": True}}
+
+def test_saves_reaching_a_stopped_queue_are_written(db):
+    queue = write_behind.enable_write_behind(interval=60)
+    write_behind.disable_write_behind()
+    # 해제 직전에 저장 함수에 들어와 큐를 잡은 호출을 흉내 낸다.
+    queue.enqueue_progress(USER, DAY, {"운동": {"걷기": True}})
+    queue.enqueue_reflection(USER, DAY, "산책", "", "")
+    assert queue.stats()["queue_depth"] == 0
+    assert database.get_daily_progress(USER, DAY) == {"운동": {"걷기": True}}
+    assert database.get_recent_reflection(USER)["achievements"] == "산책"
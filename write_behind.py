@@ -0,0 +1,248 @@
+import atexit
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import database
+from connection import ConnectionPool, get_pool
+
+FLUSH_MAX_ITEMS = 2000
+FLUSH_INTERVAL_SECONDS = 0.5
+RETRY_DELAY_SECONDS = 1.0
+
+DayKey = Tuple[str, str]
+ItemKey = Tuple[str, str]
+Reflection = Tuple[str, str, str]
+
+class WriteBehindQueue:
+    """Queue progress and reflection saves and write them from one background thread.
+
+    Repeated saves of the same ``(username, date, category, item)`` (or the same
+    reflection day) collapse into the newest value. The writer flushes
+    everything queued in one transaction once ``max_items`` entries are waiting
+    or ``interval`` seconds after the first unflushed save. Entries stay
+    readable through ``queued_progress``/``queued_reflection`` until their
+    transaction has committed.
+    """
+
+    def __init__(self, max_items: int = FLUSH_MAX_ITEMS, interval: float = FLUSH_INTERVAL_SECONDS) -> None:
+        self.max_items = max_items
+        self.interval = interval
+        self._progress: Dict[DayKey, Dict[ItemKey, int]] = {}
+        self._reflections: Dict[DayKey, Reflection] = {}
+        self._flushing_progress: Dict[DayKey, Dict[ItemKey, int]] = {}
+        self._flushing_reflections: Dict[DayKey, Reflection] = {}
+        self._depth = 0
+        self._first_queued_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._enqueued = 0
+        self._coalesced = 0
+        self._flushes = 0
+        self._flushed_items = 0
+        self._errors = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer thread after flushing everything still queued."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def _queued(self) -> bool:
+        """Count an enqueue; True if the queue is already stopped and the caller must flush it itself."""
+        self._enqueued += 1
+        if self._stopping:
+            return True
+        if self._first_queued_at is None:
+            self._first_queued_at = time.monotonic()
+        if self._depth >= self.max_items:
+            self._cond.notify_all()
+        return False
+
+    def enqueue_progress(self, username: str, date: str, progress: Dict[str, Dict[str, bool]]) -> None:
+        with self._cond:
+            day = self._progress.setdefault((username, date), {})
+            for category, items in progress.items():
+                for item, completed in items.items():
+                    if (category, item) in day:
+                        self._coalesced += 1
+                    else:
+                        self._depth += 1
+                    day[(category, item)] = int(completed)
+            stopped = self._queued()
+        if stopped:
+            # stop() 뒤에 도착한 저장(해제 직전에 저장 함수에 들어온 것)은 여기서 바로 쓴다.
+            self.flush()
+
+    def enqueue_reflection(self, username: str, date: str, achievements: str,
+                           improvements: str, tomorrow_goals: str) -> None:
+        with self._cond:
+            if (username, date) in self._reflections:
+                self._coalesced += 1
+            else:
+                self._depth += 1
+            self._reflections[(username, date)] = (achievements, improvements, tomorrow_goals)
+            stopped = self._queued()
+        if stopped:
+            self.flush()
+
+    def queued_progress(self, username: str, date: str) -> Dict[ItemKey, int]:
+        with self._cond:
+            merged = dict(self._flushing_progress.get((username, date), {}))
+            merged.update(self._progress.get((username, date), {}))
+            return merged
+
+    def queued_reflection(self, username: str) -> Optional[Dict[str, str]]:
+        with self._cond:
+            latest: Dict[str, Reflection] = {}
+            for source in (self._flushing_reflections, self._reflections):
+                for (name, date), reflection in source.items():
+                    if name == username:
+                        latest[date] = reflection
+        if not latest:
+            return None
+        date = max(latest)
+        achievements, improvements, tomorrow_goals = latest[date]
+        return {
+            "date": date,
+            "achievements": achievements,
+            "improvements": improvements,
+            "tomorrow_goals": tomorrow_goals
+        }
+
+    def flush(self) -> int:
+        """Write everything queued so far in one transaction per shard; returns the number of entries written."""
+        with self._flush_lock:
+            with self._cond:
+                if not self._progress and not self._reflections:
+                    return 0
+                self._flushing_progress, self._progress = self._progress, {}
+                self._flushing_reflections, self._reflections = self._reflections, {}
+                items, self._depth = self._depth, 0
+                self._first_queued_at = None
+            started = time.perf_counter()
+            try:
+                # 샤드를 쓰면 샤드마다 트랜잭션 하나씩 쓴다.
+                batches: Dict[ConnectionPool, Tuple[list, list]] = {}
+                for key, day in self._flushing_progress.items():
+                    batches.setdefault(get_pool(key[0]), ([], []))[0].append((key, day))
+                for key, reflection in self._flushing_reflections.items():
+                    batches.setdefault(get_pool(key[0]), ([], []))[1].append((key, reflection))
+                for pool, (progress, reflections) in batches.items():
+                    with pool.transaction() as conn:
+                        for (username, date), day in progress:
+                            database.write_progress_rows(
+                                conn, username,
+                                ((date, category, item, completed) for (category, item), completed in day.items()))
+                        for (username, date), reflection in reflections:
+                            database.write_reflection(conn, username, date, *reflection)
+            except Exception:
+                self._requeue()
+                raise
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._cond:
+                self._flushing_progress = {}
+                self._flushing_reflections = {}
+                self._flushes += 1
+                self._flushed_items += items
+                self._last_flush_ms = elapsed_ms
+                self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+            return items
+
+    def _requeue(self) -> None:
+        # 실패한 배치를 큐에 되돌리되, 그 사이 들어온 더 새 값은 덮어쓰지 않는다.
+        with self._cond:
+            self._errors += 1
+            for key, day in self._flushing_progress.items():
+                pending = self._progress.setdefault(key, {})
+                for item_key, completed in day.items():
+                    if item_key not in pending:
+                        pending[item_key] = completed
+                        self._depth += 1
+            for key, reflection in self._flushing_reflections.items():
+                if key not in self._reflections:
+                    self._reflections[key] = reflection
+                    self._depth += 1
+            self._flushing_progress = {}
+            self._flushing_reflections = {}
+            if self._depth and self._first_queued_at is None:
+                self._first_queued_at = time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if self._first_queued_at is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._first_queued_at + self.interval - time.monotonic()
+                    if self._depth >= self.max_items or remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(RETRY_DELAY_SECONDS)
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            in_flight = sum(len(day) for day in self._flushing_progress.values()) + len(self._flushing_reflections)
+            return {
+                "queue_depth": self._depth,
+                "in_flight": in_flight,
+                "enqueued": self._enqueued,
+                "coalesced": self._coalesced,
+                "flushes": self._flushes,
+                "flushed_items": self._flushed_items,
+                "errors": self._errors,
+                "last_flush_ms": self._last_flush_ms,
+                "max_flush_ms": self._max_flush_ms,
+                "avg_flush_ms": self._total_flush_ms / self._flushes if self._flushes else 0.0,
+            }
+
+_queue: Optional[WriteBehindQueue] = None
+_queue_lock = threading.Lock()
+
+def enable_write_behind(max_items: int = FLUSH_MAX_ITEMS, interval: float = FLUSH_INTERVAL_SECONDS) -> WriteBehindQueue:
+    """Route progress/reflection saves through a write-behind queue; later calls return the same queue."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WriteBehindQueue(max_items, interval)
+            _queue.start()
+            database.set_write_behind(_queue)
+            atexit.register(disable_write_behind)
+        return _queue
+
+def disable_write_behind() -> None:
+    """Flush the queue and go back to synchronous saves."""
+    global _queue
+    with _queue_lock:
+        queue, _queue = _queue, None
+        if queue is None:
+            return
+        # 저장 함수가 더는 큐를 고르지 않게 한 다음 멈추고 남은 항목을 쓴다.
+        database.set_write_behind(None)
+        queue.stop()
+
+def get_write_behind_stats() -> Optional[Dict[str, float]]:
+    return _queue.stats() if _queue is not None else None